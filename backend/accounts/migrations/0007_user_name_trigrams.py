@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from accounts.normalization import normalize_text, trigrams
+
+
+def backfill_name_index(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    UserTrigram = apps.get_model('accounts', 'UserTrigram')
+    for user in User.objects.all().iterator():
+        full_name = f'{user.first_name} {user.last_name}'.strip()
+        user.name_normalized = normalize_text(f'{full_name} {user.username}')
+        user.save(update_fields=['name_normalized'])
+        UserTrigram.objects.bulk_create(
+            UserTrigram(user=user, trigram=trigram) for trigram in trigrams(user.name_normalized)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_user_permissions_alter_profile_role_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='name_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=300),
+        ),
+        migrations.CreateModel(
+            name='UserTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Trigram',
+                'verbose_name_plural': 'User Trigrams',
+                'db_table': 'user_trigrams',
+                'indexes': [models.Index(fields=['trigram', 'user'], name='user_trigram_idx')],
+                'unique_together': {('user', 'trigram')},
+            },
+        ),
+        migrations.RunPython(backfill_name_index, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
 from django.utils.translation import gettext_lazy as _
+from .normalization import normalize_text, trigrams
 
 
 class UserManager(BaseUserManager):
@@ -38,6 +39,8 @@ class User(AbstractUser):
     permissions = models.JSONField(default=dict, blank=True, help_text="User page permissions")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Normalized full name and username used by the fuzzy participant picker
+    name_normalized = models.CharField(max_length=300, blank=True, default='', editable=False)
     
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = []
@@ -52,6 +55,26 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.get_full_name()} ({self.email})"
     
+    NAME_FIELDS = {'first_name', 'last_name', 'username'}
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        name_changed = update_fields is None or bool(self.NAME_FIELDS & set(update_fields))
+        if name_changed:
+            self.name_normalized = normalize_text(f'{self.get_full_name()} {self.username}')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'name_normalized'}
+        super().save(*args, **kwargs)
+        if name_changed:
+            self.index_trigrams()
+    
+    def index_trigrams(self):
+        """Rebuild this user's trigram postings from the normalized name"""
+        UserTrigram.objects.filter(user=self).delete()
+        UserTrigram.objects.bulk_create(
+            UserTrigram(user=self, trigram=trigram) for trigram in trigrams(self.name_normalized)
+        )
+    
     @property
     def name(self):
         return self.get_full_name()
@@ -69,6 +92,24 @@ class User(AbstractUser):
         return self.role == 'participant'
 
 
+class UserTrigram(models.Model):
+    """Trigram postings of a user's normalized name"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='trigrams')
+    trigram = models.CharField(max_length=3)
+    
+    class Meta:
+        db_table = 'user_trigrams'
+        verbose_name = 'User Trigram'
+        verbose_name_plural = 'User Trigrams'
+        unique_together = ['user', 'trigram']
+        indexes = [
+            models.Index(fields=['trigram', 'user'], name='user_trigram_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.trigram} - {self.user_id}"
+
+
 class Profile(models.Model):
     """User profile with additional information"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
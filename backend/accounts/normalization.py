@@ -0,0 +1,53 @@
+"""
+Text normalization and trigram helpers for Arabic/English fuzzy matching.
+
+Pure Python, with no Django imports, so both apps, their migrations and the
+spawned import workers (which never set up Django) can use it. The queryset
+helpers built on these live in accounts.trigram_queries.
+"""
+import re
+import unicodedata
+
+# Tatweel and Quranic annotation marks that survive NFKD decomposition
+ARABIC_MARKS = re.compile('[\u0610-\u061a\u0640\u06d6-\u06ed]')
+ARABIC_LETTERS = str.maketrans({
+    'ٱ': 'ا',  # alef wasla -> alef
+    'ى': 'ي',  # alef maksura -> yeh
+    'ة': 'ه',  # teh marbuta -> heh
+    'ی': 'ي',  # farsi yeh -> yeh
+    'ک': 'ك',  # keheh -> kaf
+})
+ARABIC_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩', '0123456789')
+NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_text(text):
+    """
+    Fold text to a comparable form: case-folded, without diacritics or
+    tashkeel, with hamza/alef variants and similar letters unified.
+    """
+    if not text:
+        return ''
+    # NFKD splits hamza and madda off alef, waw and yeh so they drop out with other marks
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = ARABIC_MARKS.sub('', text)
+    text = text.translate(ARABIC_LETTERS).translate(ARABIC_DIGITS)
+    return NON_WORD.sub(' ', text.casefold()).strip()
+
+
+def trigrams(normalized):
+    """Set of padded word trigrams of already normalized text"""
+    grams = set()
+    for word in normalized.split():
+        padded = f'  {word} '
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return grams
+
+
+def similarity(left, right):
+    """Jaccard similarity of two trigram sets"""
+    if not left or not right:
+        return 0.0
+    shared = len(left & right)
+    return shared / (len(left) + len(right) - shared)
@@ -1,3 +1,32 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import User
+
+
+class UserSearchTests(TestCase):
+    """Typo tolerant ?search= of the participant picker"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.latin = User.objects.create_user('mabdullah', 'password', first_name='Mohammed', last_name='Abdullah')
+        cls.arabic = User.objects.create_user('yusuf', 'password', first_name='يوسف', last_name='الأحمد')
+        cls.other = User.objects.create_user('khalid', 'password', first_name='Khalid', last_name='Saleh')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.other)
+
+    def search(self, text):
+        response = self.client.get('/api/users/', {'search': text})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_misspelled_names_rank_their_user_first(self):
+        self.assertEqual(self.search('Mohamed Abdulla')[0], self.latin.pk)
+        # Hamza and diacritics are normalized away, the typo is tolerated
+        self.assertEqual(self.search('يُوسف الاحمدد')[0], self.arabic.pk)
+
+    def test_dissimilar_users_are_left_out(self):
+        self.assertNotIn(self.other.pk, self.search('Mohamed Abdulla'))
+        self.assertEqual(self.search('zzzz'), [])
@@ -0,0 +1,53 @@
+"""
+Queryset helpers for trigram fuzzy matching, shared by users and events.
+"""
+from django.db.models import Case, Count, FloatField, Value, When
+
+from .normalization import normalize_text, similarity, trigrams
+
+
+def top_trigram_matches(trigram_queryset, owner_field, grams, limit):
+    """
+    Ids of the owners sharing the most trigrams with `grams`. Only the
+    postings of the query's own trigrams are read, never every row.
+    """
+    return list(
+        trigram_queryset.filter(trigram__in=grams)
+        .values(owner_field)
+        .annotate(shared=Count('pk'))
+        .order_by('-shared', owner_field)
+        .values_list(owner_field, flat=True)[:limit]
+    )
+
+
+def annotate_similarity(queryset, scores):
+    """Restrict `queryset` to the scored ids, annotated and ordered by `similarity`"""
+    if not scores:
+        return queryset.none()
+    return queryset.filter(pk__in=scores).annotate(
+        similarity=Case(
+            *[When(pk=pk, then=Value(score)) for pk, score in scores.items()],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    ).order_by('-similarity', 'pk')
+
+
+def similar_rows(queryset, text, trigram_queryset, owner_field, normalized_fields, candidate_limit, min_similarity):
+    """
+    Restrict `queryset` to the rows resembling `text`, best first. The
+    trigram index supplies up to `candidate_limit` candidates, each scored
+    by its most similar normalized field; scores under `min_similarity` are
+    left out.
+    """
+    grams = trigrams(normalize_text(text))
+    if not grams:
+        return queryset.none()
+
+    candidate_ids = top_trigram_matches(trigram_queryset, owner_field, grams, candidate_limit)
+    scores = {}
+    for pk, *values in queryset.model.objects.filter(pk__in=candidate_ids).values_list('pk', *normalized_fields):
+        score = max(similarity(grams, trigrams(value)) for value in values)
+        if score >= min_similarity:
+            scores[pk] = round(score, 4)
+    return annotate_similarity(queryset, scores)
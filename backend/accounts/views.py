@@ -7,7 +7,8 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import authenticate
 from django.db import transaction
-from .models import User, Profile
+from .models import User, Profile, UserTrigram
+from .trigram_queries import similar_rows
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, UserSerializer,
     ProfileSerializer, UserUpdateSerializer, UserCreateSerializer
@@ -145,10 +146,22 @@ class UserListView(generics.ListAPIView):
     """List all users for participant selection"""
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    candidate_limit = 200
+    min_similarity = 0.2
     
     def get_queryset(self):
         # All authenticated users can view the user list for participant selection
-        return User.objects.filter(is_active=True).order_by('-created_at')
+        queryset = User.objects.filter(is_active=True)
+        
+        # Typo tolerant, Arabic-aware name lookup for the participant picker
+        search = self.request.query_params.get('search')
+        if search:
+            return similar_rows(
+                queryset, search, UserTrigram.objects.all(), 'user_id', ['name_normalized'],
+                self.candidate_limit, self.min_similarity,
+            )
+        
+        return queryset.order_by('-created_at')
 
 
 class UserCreateView(generics.CreateAPIView):
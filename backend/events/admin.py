@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Event, Song, EventParticipant, EventStats
+from .models import Event, Song, EventParticipant, EventStats, ImportJob
 
 
 @admin.register(Event)
@@ -78,4 +78,16 @@ class EventStatsAdmin(admin.ModelAdmin):
         return False
     
     def has_delete_permission(self, request, obj=None):
-        return False
\ No newline at end of file
+        return False
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    """Import job admin"""
+    list_display = ('original_name', 'status', 'processed_rows', 'failed_rows', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    readonly_fields = ('file', 'original_name', 'status', 'total_rows', 'processed_rows', 'failed_rows', 'errors', 'message', 'created_by', 'created_at', 'started_at', 'finished_at')
+    ordering = ('-created_at',)
+    
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,304 @@
+"""
+Batch event mutations.
+
+A batch is a list of create, update and delete operations. All of them are
+validated first, with the same serializers as the single-event endpoints,
+and nothing is written unless every one is valid. They are then applied in
+one transaction with one bulk statement per table, and the stats, search
+index and cache side effects that per-row signals would have had are
+applied once for the whole batch.
+
+bulk_set_status() moves any number of events to one status the same way,
+for the bulk status endpoint and the complete_past_events command, and
+update_roster() adds, removes and confirms many participants of an event.
+"""
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache
+from .fast_serializers import FastEventSerializer
+from .import_parsing import IMPORTED_FIELDS
+from .importing import assign_import_keys, bulk_insert_events
+from .models import DressDetail, Event, EventDeletion, EventParticipant, EventStats, Song
+from .search import index_events
+from .serializers import (
+    DRESS_DETAIL_FIELDS, SONG_FIELDS, EventCreateSerializer, EventUpdateSerializer,
+    dress_detail_items, song_items, sync_ordered_children, sync_participants,
+)
+from .signals import bulk_event_writes
+
+BATCH_OPERATIONS = ('create', 'update', 'delete')
+MAX_BATCH_OPERATIONS = 500
+CHILD_LISTS = ('songs_data', 'dress_details_data', 'participants_data')
+ROSTER_ACTIONS = ('add', 'remove', 'confirm')
+
+User = get_user_model()
+
+
+def bulk_set_status(queryset, new_status):
+    """
+    Move the events of `queryset` to `new_status` with one UPDATE per status
+    they leave, so the stats counters can be adjusted by the exact row
+    counts. Returns the number of events that changed.
+    """
+    changed = 0
+    deltas = Counter()
+    now = timezone.now()
+    with transaction.atomic():
+        for old_status in queryset.exclude(status=new_status).order_by().values_list('status', flat=True).distinct():
+            # The status is imported, so upserts must no longer skip these events
+            count = queryset.filter(status=old_status).update(status=new_status, updated_at=now, content_hash='')
+            deltas[EventStats.status_counter(old_status)] -= count
+            deltas[EventStats.status_counter(new_status)] += count
+            changed += count
+        if changed:
+            # update() skips the save() signals that keep the stats and cache in step
+            EventStats.apply_delta(deltas)
+            cache.schedule_bump()
+    return changed
+
+
+def roster_changed(event_id, reindex=True):
+    """The side effects the participant signals would have had, once per write"""
+    Event.objects.filter(pk=event_id).update(updated_at=timezone.now(), **Event.participant_counts())
+    if reindex:
+        # Participant names are part of the event's search text
+        index_events([event_id])
+    cache.schedule_bump()
+
+
+def remove_participants(event_id, user_ids):
+    """Delete the participations of `user_ids` with one bulk delete. Returns the number removed"""
+    with transaction.atomic():
+        with bulk_event_writes():
+            removed, _ = EventParticipant.objects.filter(event_id=event_id, user_id__in=user_ids).delete()
+        if removed:
+            roster_changed(event_id)
+    return removed
+
+
+def update_roster(event_id, add=(), remove=(), confirm=()):
+    """
+    Add, remove and confirm participants of one event with one statement per
+    action. Users already taking part, even if they joined concurrently,
+    are not added again or counted as added, and unknown user ids are
+    skipped and reported back.
+    """
+    result = {'added': 0, 'removed': 0, 'confirmed': 0, 'unknown_users': []}
+    with transaction.atomic():
+        if remove:
+            with bulk_event_writes():
+                result['removed'], _ = EventParticipant.objects.filter(event_id=event_id, user_id__in=remove).delete()
+
+        if add:
+            existing = set(
+                EventParticipant.objects.filter(event_id=event_id, user_id__in=add).values_list('user_id', flat=True)
+            )
+            new_ids = [user_id for user_id in dict.fromkeys(add) if user_id not in existing]
+            users = set(User.objects.filter(pk__in=new_ids).values_list('pk', flat=True))
+            result['unknown_users'] = [user_id for user_id in new_ids if user_id not in users]
+            created = [
+                EventParticipant(event_id=event_id, user_id=user_id, is_confirmed=False)
+                for user_id in new_ids if user_id in users
+            ]
+            # ignore_conflicts leaves users who joined concurrently as they are, but
+            # reports no row count, so the added rows are counted back by join time
+            started = timezone.now()
+            EventParticipant.objects.bulk_create(created, ignore_conflicts=True)
+            if created:
+                result['added'] = EventParticipant.objects.filter(
+                    event_id=event_id,
+                    user_id__in=[participant.user_id for participant in created],
+                    joined_at__gte=started,
+                ).count()
+
+        if confirm:
+            result['confirmed'] = EventParticipant.objects.filter(
+                event_id=event_id, user_id__in=confirm, is_confirmed=False
+            ).update(is_confirmed=True)
+
+        if result['added'] or result['removed'] or result['confirmed']:
+            roster_changed(event_id, reindex=bool(result['added'] or result['removed']))
+    return result
+
+
+class EventBatch:
+    """Validate, then apply, a list of {'op', 'id', 'data'} operations"""
+
+    def __init__(self, operations, request):
+        self.operations = operations
+        self.request = request
+        self.errors = []
+        self.validated = []
+
+    def is_valid(self):
+        """Validate every operation, collecting one error (or None) per operation"""
+        target_ids = [
+            operation.get('id') for operation in self.operations
+            if isinstance(operation, dict) and operation.get('op') in ('update', 'delete')
+        ]
+        targets = Event.objects.in_bulk([pk for pk in target_ids if isinstance(pk, int)])
+        repeated = {pk for pk, count in Counter(target_ids).items() if count > 1}
+
+        for operation in self.operations:
+            error, validated = self.validate_operation(operation, targets, repeated)
+            self.errors.append(error)
+            self.validated.append(validated)
+        return not any(self.errors)
+
+    def validate_operation(self, operation, targets, repeated):
+        if not isinstance(operation, dict) or operation.get('op') not in BATCH_OPERATIONS:
+            return {'op': [f'Choose from {", ".join(BATCH_OPERATIONS)}']}, None
+        op = operation['op']
+        data = operation.get('data', {})
+
+        if op == 'create':
+            serializer = EventCreateSerializer(data=data, context={'request': self.request})
+            if not serializer.is_valid():
+                return serializer.errors, None
+            return None, (op, None, serializer.validated_data)
+
+        event = targets.get(operation.get('id'))
+        if event is None:
+            return {'id': ['Event not found']}, None
+        if event.pk in repeated:
+            return {'id': ['Event appears in more than one operation']}, None
+        if op == 'delete':
+            return None, (op, event, None)
+
+        serializer = EventUpdateSerializer(event, data=data, partial=True, context={'request': self.request})
+        if not serializer.is_valid():
+            return serializer.errors, None
+        return None, (op, event, serializer.validated_data)
+
+    def save(self):
+        """Apply the validated operations. Returns one result per operation"""
+        creates = [data for op, _, data in self.validated if op == 'create']
+        updates = [(event, data) for op, event, data in self.validated if op == 'update']
+        with transaction.atomic():
+            self.delete_events([event for op, event, _ in self.validated if op == 'delete'])
+            # Updates first, so creates can take import keys the updates give up
+            updated = self.update_events(updates)
+            created = self.create_events(creates)
+            children_changed = self.sync_children(list(zip(created, creates)) + updates)
+
+            Event.objects.filter(pk__in=children_changed - updated).update(updated_at=timezone.now())
+            changed = {event.pk for event in created} | updated | children_changed
+            index_events(changed)
+            cache.schedule_bump()
+
+        # Created and updated events are returned as the event endpoints render them
+        rendered = {
+            event['id']: event
+            for event in FastEventSerializer().serialize_queryset(
+                Event.objects.filter(pk__in=[event.pk for event in created] + [event.pk for event, _ in updates])
+            )
+        }
+        created = iter(created)
+        results = []
+        for op, event, _ in self.validated:
+            if op == 'delete':
+                results.append({'op': op, 'id': event.pk, 'status': 'deleted'})
+                continue
+            if op == 'create':
+                event = next(created)
+                status = 'created'
+            else:
+                status = 'updated' if event.pk in changed else 'unchanged'
+            results.append({'op': op, 'id': event.pk, 'status': status, 'event': rendered[event.pk]})
+        return results
+
+    def delete_events(self, events):
+        if not events:
+            return
+        statuses = Counter(event.status for event in events)
+        # The event signals would adjust the stats and leave a tombstone per row
+        with bulk_event_writes():
+            Event.objects.filter(pk__in=[event.pk for event in events]).delete()
+        EventDeletion.objects.bulk_create([EventDeletion(event_id=event.pk) for event in events])
+        EventStats.apply_delta({
+            'total_events': -len(events),
+            **{EventStats.status_counter(status): -count for status, count in statuses.items()},
+        })
+
+    def create_events(self, creates):
+        """
+        Insert the new events in one statement, returning them with their ids.
+        bulk_insert_events sets and checks the pk of every event, so children
+        are never synced to a guessed id.
+        """
+        events = [
+            Event(
+                created_by=self.request.user,
+                **{field: value for field, value in data.items() if field not in CHILD_LISTS}
+            )
+            for data in creates
+        ]
+        for event in events:
+            event.import_key = event.natural_import_key()
+            event.refresh_content_hash()
+        assign_import_keys(events)
+        bulk_insert_events(events, index=False)
+        return events
+
+    def update_events(self, updates):
+        """Write changed event fields with one bulk_update. Returns the ids of the changed events"""
+        changed, rekeyed, fields = [], [], set()
+        deltas = Counter()
+        now = timezone.now()
+        for event, data in updates:
+            changes = {
+                field: value for field, value in data.items()
+                if field not in CHILD_LISTS and getattr(event, field) != value
+            }
+            if not changes:
+                continue
+            if 'status' in changes:
+                deltas[EventStats.status_counter(event.status)] -= 1
+                deltas[EventStats.status_counter(changes['status'])] += 1
+            for field, value in changes.items():
+                setattr(event, field, value)
+            event.normalize_fields()
+            if set(changes) & set(Event.IMPORT_KEY_FIELDS):
+                event.import_key = event.natural_import_key()
+                rekeyed.append(event)
+            if set(changes) & set(IMPORTED_FIELDS):
+                event.refresh_content_hash()
+                fields.add('content_hash')
+            event.updated_at = now
+            fields.update(changes)
+            changed.append(event)
+
+        if rekeyed:
+            assign_import_keys(rekeyed)
+            fields.add('import_key')
+        if changed:
+            fields.update(
+                target for source, target in Event.NORMALIZED_FIELDS.items() if source in fields
+            )
+            Event.objects.bulk_update(changed, [*sorted(fields), 'updated_at'])
+            EventStats.apply_delta(deltas)
+        return {event.pk for event in changed}
+
+    def sync_children(self, children):
+        """Sync the songs, dress details and participants lists given. Returns the ids of the changed events"""
+        songs, dress_details, participants = {}, {}, {}
+        for event, data in children:
+            if data.get('songs_data') is not None:
+                songs[event.pk] = song_items(data['songs_data'])
+            if data.get('dress_details_data') is not None:
+                dress_details[event.pk] = dress_detail_items(data['dress_details_data'])
+            if data.get('participants_data') is not None:
+                participants[event.pk] = data['participants_data']
+
+        changed = set()
+        if songs:
+            changed |= sync_ordered_children(Song, SONG_FIELDS, songs)
+        if dress_details:
+            changed |= sync_ordered_children(DressDetail, DRESS_DETAIL_FIELDS, dress_details)
+        if participants:
+            changed |= sync_participants(participants)
+        return changed
@@ -0,0 +1,95 @@
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.http import parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .conditional import not_modified_response, set_validator_headers
+
+GENERATION_KEY = 'events:generation'
+
+
+def get_generation():
+    """Current events generation, shared by every worker through the cache"""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Seed from the clock so a lost key never reuses an old generation
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    """Invalidate every cached event response"""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def schedule_bump():
+    """Bump the generation once the current transaction commits"""
+    transaction.on_commit(bump_generation)
+
+
+def response_cache_key(request):
+    """Key a response on host, path, normalized query params and generation"""
+    params = sorted(
+        (key, value)
+        for key in request.query_params
+        for value in request.query_params.getlist(key)
+    )
+    raw = '|'.join([
+        request.get_host(),
+        request.path,
+        '&'.join(f'{key}={value}' for key, value in params),
+        # Upcoming/past splits and is_upcoming flags change with the date
+        timezone.now().date().isoformat(),
+    ])
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'events:response:{get_generation()}:{digest}'
+
+
+def parse_last_modified(response):
+    timestamp = parse_http_date_safe(response.get('Last-Modified'))
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+def cached_response(view_func):
+    """Serve successful GET responses from the cache until events change"""
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        # Works for function views and for methods wrapped with method_decorator
+        request = args[0]
+        if request.method != 'GET' or not settings.EVENT_RESPONSE_CACHE:
+            return view_func(*args, **kwargs)
+
+        key = response_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            etag = cached.get('etag')
+            last_modified = cached.get('last_modified')
+            if etag or last_modified:
+                not_modified = not_modified_response(request, etag, last_modified)
+                if not_modified is not None:
+                    return not_modified
+            return set_validator_headers(Response(cached['data']), etag, last_modified)
+
+        response = view_func(*args, **kwargs)
+        if response.status_code == status.HTTP_200_OK and hasattr(response, 'data'):
+            cache.set(key, {
+                'data': response.data,
+                'etag': response.get('ETag'),
+                'last_modified': parse_last_modified(response),
+            })
+        return response
+    return wrapper
@@ -0,0 +1,105 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+
+def make_etag(*parts):
+    """Weak ETag built from the given validator parts"""
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return 'W/' + quote_etag(digest)
+
+
+def render_context():
+    """
+    ETag parts for what a response embeds beyond its events' own columns:
+    is_upcoming/is_past change with the date, and user names with the
+    events generation, which user saves bump.
+    """
+    from .cache import get_generation
+    return timezone.now().date().isoformat(), get_generation()
+
+
+def queryset_validators(view):
+    """
+    Validators for a list view: row count and newest `updated_at` of the
+    filtered queryset. The count changes on deletes, which never touch
+    `updated_at`, and child writes touch their event's `updated_at`.
+    """
+    queryset = view.filter_queryset(view.get_queryset())
+    summary = queryset.order_by().aggregate(count=Count('id'), last_modified=Max('updated_at'))
+    etag = make_etag(
+        view.request.get_full_path(),
+        summary['count'],
+        summary['last_modified'].isoformat() if summary['last_modified'] else '',
+        *render_context(),
+    )
+    return etag, None
+
+
+def object_validators(view):
+    """Validators for a detail view: the object's `updated_at`"""
+    queryset = view.get_queryset().model._default_manager.all()
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    updated_at = queryset.filter(
+        **{view.lookup_field: view.kwargs[lookup_url_kwarg]}
+    ).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None, None
+    return make_etag(view.request.get_full_path(), updated_at.isoformat(), *render_context()), updated_at
+
+
+def set_validator_headers(response, etag, last_modified):
+    # Let browsers keep the body but revalidate it on every fetch
+    patch_cache_control(response, private=True, no_cache=True)
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(int(last_modified.timestamp()))
+    return response
+
+
+def not_modified_response(request, etag, last_modified):
+    """A 304 response if the request's conditional headers match, else None"""
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        set_validator_headers(response, etag, last_modified)
+    return response
+
+
+def conditional_response(validators):
+    """
+    Answer GET requests with 304 Not Modified when the client's validators
+    still match, before any prefetching or serialization happens.
+
+    Meant to be applied with method_decorator, the view instance is taken
+    from the DRF request's parser context.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view_func(request, *args, **kwargs)
+
+            etag, last_modified = validators(request.parser_context['view'])
+            if etag is None and last_modified is None:
+                return view_func(request, *args, **kwargs)
+
+            not_modified = not_modified_response(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                set_validator_headers(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,261 @@
+"""
+Event export as CSV or Excel.
+
+Events are read with keyset batches of values() rows, so memory stays flat
+however many events match (MySQL clients buffer whole result sets, so
+.iterator() alone would not). CSV is produced row by row into a streaming
+response. Excel uses openpyxl's write-only mode, which spools each sheet
+to disk rather than keeping cells in memory.
+
+Columns match the import template, so an export can be edited and
+re-imported in upsert mode. The template itself is built from the same
+column definition, once per schema version.
+"""
+import csv
+import hashlib
+import io
+import json
+from collections import defaultdict
+from functools import lru_cache
+
+from django.utils import timezone
+
+from .models import DressDetail, EventParticipant, Song
+from .pagination import get_ordering, iter_keyset_batches
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.comments import Comment
+    from openpyxl.styles import Alignment, Font, PatternFill
+except ImportError:
+    Workbook = None
+
+EXPORT_BATCH_SIZE = 2000
+
+EVENT_COLUMNS = [
+    ('Event ID', 'id'),
+    ('Day', 'day'),
+    ('Date', 'date'),
+    ('Time', 'time'),
+    ('Duration (minutes)', 'duration'),
+    ('Place', 'place'),
+    ('Number of Participants', 'number_of_participants'),
+    ('Status', 'status'),
+    ('Meeting Time', 'meeting_time'),
+    ('Meeting Date', 'meeting_date'),
+    ('Place of Meeting', 'place_of_meeting'),
+    ('Vehicle', 'vehicle'),
+    ('Camera Man', 'camera_man'),
+    ('Participation Type', 'participation_type'),
+    ('Event Reason', 'event_reason'),
+    ('External ID', 'external_id'),
+]
+
+TEMPLATE_HEADERS = [header for header, field in EVENT_COLUMNS if field != 'id']
+TEMPLATE_SAMPLE_ROWS = [
+    ['Friday', '2024-01-15', '18:00', '120', 'Masjid Al-Noor', '25',
+     'pending', '17:30', '2024-01-15', 'Main Hall', 'Bus #123',
+     'Ahmed Ali', 'Recitation', 'Weekly Quran Recitation Session', ''],
+    ['Saturday', '2024-01-20', '19:30', '90', 'Community Center', '15',
+     'confirmed', '19:00', '2024-01-20', 'Conference Room', 'Van #456',
+     'Omar Hassan', 'Listening', 'Special Event for New Muslims', ''],
+]
+TEMPLATE_CACHE_SECONDS = 60 * 60 * 24
+# Child rows name their event by its row in the events sheet, or by External ID
+TEMPLATE_CHILD_SHEETS = [
+    ('Songs', ['Event Row', 'External ID', 'Title', 'Artist', 'Duration', 'Order'], [
+        ['2', '', 'Surah Al-Fatiha', 'Ahmed Ali', '180', '1'],
+        ['2', '', 'Surah Al-Ikhlas', 'Ahmed Ali', '60', '2'],
+    ]),
+    ('Dress Details', ['Event Row', 'External ID', 'Description', 'Order'], [
+        ['2', '', 'White thobe', '1'],
+        ['3', '', 'Formal attire', '1'],
+    ]),
+    # No sample rows: usernames must be those of existing accounts, which no sample can know
+    ('Participants', ['Event Row', 'External ID', 'Username', 'Confirmed'], []),
+]
+# Comments on template headers whose values the import checks against the database
+TEMPLATE_HEADER_NOTES = {
+    'Username': 'Username of an existing account. Rows naming unknown usernames are not imported.',
+}
+# Changes whenever the template columns or samples do, so cached copies are rebuilt
+TEMPLATE_VERSION = hashlib.sha256(
+    json.dumps([TEMPLATE_HEADERS, TEMPLATE_SAMPLE_ROWS, TEMPLATE_CHILD_SHEETS, TEMPLATE_HEADER_NOTES]).encode('utf-8')
+).hexdigest()[:16]
+
+# Child sheets repeat the columns that identify their event on re-import
+EVENT_REFERENCE_COLUMNS = [
+    ('Event ID', 'id'),
+    ('External ID', 'external_id'),
+    ('Date', 'date'),
+    ('Time', 'time'),
+    ('Place', 'place'),
+]
+
+CHILD_SHEETS = {
+    'songs': (
+        'Songs',
+        Song,
+        [('Title', 'title'), ('Artist', 'artist'), ('Duration', 'duration'), ('Order', 'order')],
+    ),
+    'dress_details': (
+        'Dress Details',
+        DressDetail,
+        [('Description', 'description'), ('Order', 'order')],
+    ),
+    'participants': (
+        'Participants',
+        EventParticipant,
+        [
+            ('Username', 'user__username'),
+            ('First Name', 'user__first_name'),
+            ('Last Name', 'user__last_name'),
+            ('Email', 'user__email'),
+            ('Confirmed', 'is_confirmed'),
+            ('Joined At', 'joined_at'),
+        ],
+    ),
+}
+
+
+def csv_value(value):
+    """Render a value the way the importer parses it back"""
+    if value is None:
+        return ''
+    if hasattr(value, 'hour') and not hasattr(value, 'year'):
+        return value.strftime('%H:%M')
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def excel_value(value):
+    # Excel cannot store timezone aware datetimes, so they are written in local time
+    if getattr(value, 'tzinfo', None) is not None and hasattr(value, 'year'):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+class Echo:
+    """File-like object that hands back what is written, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+class EventExporter:
+    """Write the events of a queryset, and optionally their children, to CSV or Excel"""
+
+    def __init__(self, queryset, include=()):
+        self.queryset = queryset
+        self.include = [name for name in CHILD_SHEETS if name in include]
+
+    def event_batches(self):
+        fields = {field: None for _, field in EVENT_COLUMNS}
+        # Keyset batching reads the sort key from each row
+        for field in get_ordering(self.queryset):
+            name = field.lstrip('-')
+            fields['id' if name == 'pk' else name] = None
+        queryset = self.queryset.prefetch_related(None).values(*fields)
+        return iter_keyset_batches(queryset, EXPORT_BATCH_SIZE)
+
+    def event_rows(self, batch):
+        return [[row[field] for _, field in EVENT_COLUMNS] for row in batch]
+
+    def child_rows(self, name, batch):
+        """Rows of one child sheet for a batch of events, in event order"""
+        _, model, columns = CHILD_SHEETS[name]
+        children = defaultdict(list)
+        for row in model.objects.filter(event_id__in=[event['id'] for event in batch]).values(
+            'event_id', *[field for _, field in columns]
+        ):
+            children[row['event_id']].append([row[field] for _, field in columns])
+
+        rows = []
+        for event in batch:
+            reference = [event[field] for _, field in EVENT_REFERENCE_COLUMNS]
+            rows.extend(reference + child for child in children.get(event['id'], []))
+        return rows
+
+    def iter_csv(self):
+        """Yield the CSV export as bytes, one batch at a time"""
+        writer = csv.writer(Echo())
+        # BOM so Excel opens Arabic text as UTF-8; the importer strips it
+        yield '\ufeff'.encode('utf-8') + writer.writerow([header for header, _ in EVENT_COLUMNS]).encode('utf-8')
+        for batch in self.event_batches():
+            yield ''.join(
+                writer.writerow([csv_value(value) for value in row]) for row in self.event_rows(batch)
+            ).encode('utf-8')
+
+    def write_xlsx(self, target):
+        """Save the export as a workbook, one sheet per included relation"""
+        workbook = Workbook(write_only=True)
+        header_font = Font(bold=True)
+
+        def add_sheet(title, headers):
+            sheet = workbook.create_sheet(title)
+            sheet.freeze_panes = 'A2'
+            cells = []
+            for header in headers:
+                cell = WriteOnlyCell(sheet, value=header)
+                cell.font = header_font
+                cells.append(cell)
+            sheet.append(cells)
+            return sheet
+
+        events_sheet = add_sheet('Events', [header for header, _ in EVENT_COLUMNS])
+        child_sheets = {
+            name: add_sheet(
+                CHILD_SHEETS[name][0],
+                [header for header, _ in EVENT_REFERENCE_COLUMNS + CHILD_SHEETS[name][2]],
+            )
+            for name in self.include
+        }
+
+        # Write-only sheets each spool to their own file, so they can be filled side by side
+        for batch in self.event_batches():
+            for row in self.event_rows(batch):
+                events_sheet.append([excel_value(value) for value in row])
+            for name, sheet in child_sheets.items():
+                for row in self.child_rows(name, batch):
+                    sheet.append([excel_value(value) for value in row])
+
+        workbook.save(target)
+
+
+@lru_cache(maxsize=None)
+def build_import_template(version=TEMPLATE_VERSION):
+    """
+    The import template workbook as bytes, built once per version. Its
+    headers are the ones the importer reads, so it is the same in every language.
+    """
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = 'Events Import Template'
+
+    header_font = Font(bold=True, color='FFFFFF')
+    header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+    header_alignment = Alignment(horizontal='center', vertical='center')
+
+    sheets = [(sheet, TEMPLATE_HEADERS, TEMPLATE_SAMPLE_ROWS)]
+    sheets += [
+        (workbook.create_sheet(title), headers, rows) for title, headers, rows in TEMPLATE_CHILD_SHEETS
+    ]
+    for sheet, headers, rows in sheets:
+        for col, header in enumerate(headers, 1):
+            cell = sheet.cell(row=1, column=col, value=header)
+            cell.font = header_font
+            cell.fill = header_fill
+            cell.alignment = header_alignment
+            if header in TEMPLATE_HEADER_NOTES:
+                cell.comment = Comment(TEMPLATE_HEADER_NOTES[header], 'Quran Events')
+        for row in rows:
+            sheet.append(row)
+        for column in sheet.columns:
+            width = max(len(str(cell.value or '')) for cell in column)
+            sheet.column_dimensions[column[0].column_letter].width = min(width + 2, 50)
+
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
@@ -0,0 +1,222 @@
+"""
+Compiled rendering path for event lists.
+
+Produces exactly what EventSerializer(many=True).data renders, but reads
+columns with values() instead of building model instances and nested
+serializers, fetches each child table in one query per page, and works out
+"today" once per call instead of once per row.
+
+Clients can ask for less with `?fields=` (top-level fields) and
+`?expand=` (nested relations); only the columns and child tables needed
+for the requested fields are then queried. Lists leave the roster out
+unless it is asked for, as it can be long: they carry participant_count,
+and the detail and /participants/ endpoints return the roster itself.
+"""
+from collections import defaultdict
+from operator import itemgetter
+
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .models import DressDetail, EventParticipant, Song
+from .pagination import get_ordering
+
+OUTPUT_FIELDS = (
+    'id', 'day', 'date', 'time', 'duration', 'place', 'number_of_participants',
+    'participant_count', 'confirmed_count', 'status', 'meeting_time', 'meeting_date',
+    'place_of_meeting', 'vehicle', 'camera_man', 'participation_type', 'event_reason',
+    'created_by', 'created_by_name', 'created_at', 'updated_at', 'songs', 'dress_details',
+    'participants', 'is_upcoming', 'is_past',
+)
+NESTED_FIELDS = ('songs', 'dress_details', 'participants')
+# Relations list responses expand when the request names none
+LIST_EXPAND = ('songs', 'dress_details')
+TOP_LEVEL_FIELDS = tuple(name for name in OUTPUT_FIELDS if name not in NESTED_FIELDS)
+
+PLAIN_FIELDS = (
+    'id', 'day', 'duration', 'place', 'number_of_participants', 'participant_count', 'confirmed_count',
+    'status', 'place_of_meeting', 'vehicle', 'camera_man', 'participation_type', 'event_reason', 'created_by',
+)
+ISO_FIELDS = ('date', 'time', 'meeting_time', 'meeting_date')
+DATETIME_FIELDS = ('created_at', 'updated_at')
+
+# Columns read for output fields that are not plain columns of their own
+FIELD_COLUMNS = {
+    'created_by_name': ('created_by__first_name', 'created_by__last_name'),
+    'is_upcoming': ('date',),
+    'is_past': ('date',),
+}
+
+
+def full_name(first_name, last_name):
+    """Same result as AbstractUser.get_full_name()"""
+    return f'{first_name} {last_name}'.strip()
+
+
+def iso_or_none(value):
+    return value.isoformat() if value else None
+
+
+def split_param(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def parse_field_selection(request):
+    """
+    Read `?fields=` and `?expand=` into (fields, expand). Without either
+    parameter both are None, and the caller's defaults apply.
+    """
+    params = request.query_params
+    if 'fields' not in params and 'expand' not in params:
+        return None, None
+
+    fields = split_param(params.get('fields', ''))
+    expand = split_param(params.get('expand', ''))
+    unknown = [name for name in fields if name not in OUTPUT_FIELDS]
+    if unknown:
+        raise serializers.ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}"})
+    unknown = [name for name in expand if name not in NESTED_FIELDS]
+    if unknown:
+        raise serializers.ValidationError({
+            'expand': f"Unknown relation(s): {', '.join(unknown)}. Choose from {', '.join(NESTED_FIELDS)}"
+        })
+
+    # Naming a relation in ?fields= expands it too
+    expand += [name for name in fields if name in NESTED_FIELDS and name not in expand]
+    fields = [name for name in fields if name not in NESTED_FIELDS] or list(TOP_LEVEL_FIELDS)
+    return fields, expand
+
+
+class FastEventSerializer:
+    """Renders event rows from values() querysets, byte-identical to EventSerializer"""
+
+    def __init__(self, fields=None, expand=None):
+        # DRF's own field keeps timezone handling and the trailing "Z" identical
+        self.datetime_field = serializers.DateTimeField()
+        self.today = timezone.now().date()
+        fields = TOP_LEVEL_FIELDS if fields is None else fields
+        self.expand = NESTED_FIELDS if expand is None else tuple(expand)
+        self.fields = [name for name in OUTPUT_FIELDS if name in fields or name in self.expand]
+
+    @classmethod
+    def from_request(cls, request, default_expand=None):
+        fields, expand = parse_field_selection(request)
+        if fields is None and expand is None:
+            expand = default_expand
+        return cls(fields, expand)
+
+    def columns(self, queryset):
+        """Columns to read: the requested fields, the id, and the sort key"""
+        columns = {'id': None}
+        for name in self.fields:
+            if name not in NESTED_FIELDS:
+                columns.update(dict.fromkeys(FIELD_COLUMNS.get(name, (name,))))
+        # Keyset pagination reads the sort key from the rows
+        for field in get_ordering(queryset):
+            name = field.lstrip('-')
+            columns['id' if name == 'pk' else name] = None
+        columns.update(dict.fromkeys(queryset.query.annotations))
+        return list(columns)
+
+    def values(self, queryset):
+        """Turn an Event queryset into a values() queryset with the needed columns"""
+        return queryset.prefetch_related(None).values(*self.columns(queryset))
+
+    def render_datetime(self, value):
+        return self.datetime_field.to_representation(value) if value else None
+
+    def fetch_songs(self, event_ids):
+        songs = defaultdict(list)
+        for row in Song.objects.filter(event_id__in=event_ids).values(
+            'event_id', 'id', 'title', 'artist', 'duration', 'order', 'created_at'
+        ):
+            songs[row['event_id']].append({
+                'id': row['id'],
+                'title': row['title'],
+                'artist': row['artist'],
+                'duration': row['duration'],
+                'order': row['order'],
+                'created_at': self.render_datetime(row['created_at']),
+            })
+        return songs
+
+    def fetch_dress_details(self, event_ids):
+        dress_details = defaultdict(list)
+        for row in DressDetail.objects.filter(event_id__in=event_ids).values(
+            'event_id', 'id', 'description', 'order', 'created_at'
+        ):
+            dress_details[row['event_id']].append({
+                'id': row['id'],
+                'description': row['description'],
+                'order': row['order'],
+                'created_at': self.render_datetime(row['created_at']),
+            })
+        return dress_details
+
+    def fetch_participants(self, event_ids):
+        participants = defaultdict(list)
+        for row in EventParticipant.objects.filter(event_id__in=event_ids).values(
+            'event_id', 'id', 'user_id', 'user__first_name', 'user__last_name', 'user__email',
+            'joined_at', 'is_confirmed',
+        ):
+            name = full_name(row['user__first_name'], row['user__last_name'])
+            participants[row['event_id']].append({
+                'id': row['id'],
+                'user': f"{name} ({row['user__email']})",
+                'user_id': row['user_id'],
+                'user_name': name,
+                'joined_at': self.render_datetime(row['joined_at']),
+                'is_confirmed': row['is_confirmed'],
+            })
+        return participants
+
+    def fetch_children(self, event_ids):
+        """One query per expanded relation, mapping event id to rendered children"""
+        return {name: getattr(self, f'fetch_{name}')(event_ids) for name in self.expand}
+
+    def renderers(self, children):
+        """(name, function of a row) for every output field, in output order"""
+        render_datetime = self.render_datetime
+        today = self.today
+        renderers = []
+        for name in self.fields:
+            if name in PLAIN_FIELDS:
+                render = itemgetter(name)
+            elif name in ISO_FIELDS:
+                render = lambda row, name=name: iso_or_none(row[name])
+            elif name in DATETIME_FIELDS:
+                render = lambda row, name=name: render_datetime(row[name])
+            elif name in NESTED_FIELDS:
+                render = lambda row, related=children[name]: related.get(row['id'], [])
+            elif name == 'created_by_name':
+                render = lambda row: full_name(row['created_by__first_name'], row['created_by__last_name'])
+            elif name == 'is_upcoming':
+                render = lambda row: row['date'] >= today
+            else:
+                render = lambda row: row['date'] < today
+            renderers.append((name, render))
+        return renderers
+
+    def serialize(self, rows):
+        """Render a page of rows produced by values()"""
+        rows = list(rows)
+        children = self.fetch_children([row['id'] for row in rows])
+        renderers = self.renderers(children)
+        return [{name: render(row) for name, render in renderers} for row in rows]
+
+    def serialize_queryset(self, queryset):
+        return self.serialize(self.values(queryset))
+
+
+class FastEventListMixin:
+    """List GET responses through FastEventSerializer instead of EventSerializer"""
+
+    def list(self, request, *args, **kwargs):
+        fast = FastEventSerializer.from_request(request, default_expand=LIST_EXPAND)
+        queryset = fast.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fast.serialize(page))
+        return Response(fast.serialize(queryset))
@@ -0,0 +1,32 @@
+"""
+Fuzzy, Arabic-aware matching of event places, meeting places and camera men.
+"""
+from accounts.normalization import trigrams
+from accounts.trigram_queries import similar_rows
+
+from .models import Event, EventTrigram
+
+# Candidates fetched from the trigram index before exact scoring
+CANDIDATE_LIMIT = 200
+MIN_SIMILARITY = 0.2
+
+
+def index_event_trigrams(event_ids):
+    """Rebuild the trigram postings of the given events"""
+    normalized_fields = list(Event.NORMALIZED_FIELDS.values())
+    postings = []
+    for event_id, *values in Event.objects.filter(pk__in=event_ids).values_list('pk', *normalized_fields):
+        grams = set()
+        for value in values:
+            grams |= trigrams(value)
+        postings.extend(EventTrigram(event_id=event_id, trigram=trigram) for trigram in grams)
+    EventTrigram.objects.filter(event_id__in=event_ids).delete()
+    EventTrigram.objects.bulk_create(postings, batch_size=1000)
+
+
+def similar_events(queryset, text, min_similarity=MIN_SIMILARITY):
+    """Events whose place, meeting place or camera man resemble `text`, best first"""
+    return similar_rows(
+        queryset, text, EventTrigram.objects.all(), 'event_id',
+        list(Event.NORMALIZED_FIELDS.values()), CANDIDATE_LIMIT, min_similarity,
+    )
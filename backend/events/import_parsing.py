@@ -0,0 +1,270 @@
+"""
+Parsing and validation of import rows.
+
+Deliberately free of Django model imports, so process pool workers can
+import it without setting up Django.
+"""
+import hashlib
+import json
+from datetime import date, datetime, time
+
+from accounts.normalization import normalize_text
+
+STATUS_VALUES = ['pending', 'confirmed', 'completed', 'cancelled']
+# Event fields an import row sets, and so the fields its content hash covers
+IMPORTED_FIELDS = (
+    'day', 'date', 'time', 'duration', 'place', 'number_of_participants', 'status',
+    'meeting_time', 'meeting_date', 'place_of_meeting', 'vehicle', 'camera_man',
+    'participation_type', 'event_reason', 'external_id',
+)
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'confirmed')
+
+
+class RowError(Exception):
+    """A single row is invalid and is skipped. Holds (column, message) pairs"""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+    def __str__(self):
+        return '; '.join(message for _, message in self.errors)
+
+
+def cell_text(value, default=''):
+    return str(value).strip() if value is not None else default
+
+
+def parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(cell_text(value), '%Y-%m-%d').date()
+
+
+def parse_time(value):
+    if isinstance(value, datetime):
+        return value.time()
+    if isinstance(value, time):
+        return value
+    return datetime.strptime(cell_text(value), '%H:%M').time()
+
+
+def parse_int(value):
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return int(cell_text(value))
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return cell_text(value).lower() in TRUE_VALUES
+
+
+def row_getter(values, columns):
+    """Cell lookup by header name; blank cells read as None"""
+    def get(column_name):
+        index = columns.get(column_name)
+        if index is None or index >= len(values):
+            return None
+        value = values[index]
+        return None if isinstance(value, str) and not value.strip() else value
+    return get
+
+
+def parse_event_row(values, columns, warnings=None):
+    """
+    Turn one row of cell values into Event field values. `columns` maps
+    header names to positions in `values`. Raises RowError listing every
+    invalid column when the row cannot be imported. Values that are replaced
+    by a default instead are reported as (column, message) in `warnings`.
+    """
+    get = row_getter(values, columns)
+    errors = []
+    warnings = warnings if warnings is not None else []
+
+    day = cell_text(get('Day'))
+    if not day:
+        errors.append(('Day', 'Day is required'))
+
+    try:
+        event_date = parse_date(get('Date'))
+    except (TypeError, ValueError):
+        errors.append(('Date', 'Invalid date format. Use YYYY-MM-DD'))
+
+    try:
+        event_time = parse_time(get('Time'))
+    except (TypeError, ValueError):
+        errors.append(('Time', 'Invalid time format. Use HH:MM'))
+
+    try:
+        duration = parse_int(get('Duration (minutes)'))
+    except (TypeError, ValueError):
+        errors.append(('Duration (minutes)', 'Invalid duration. Must be a number'))
+
+    place = cell_text(get('Place'))
+    if not place:
+        errors.append(('Place', 'Place is required'))
+
+    if errors:
+        raise RowError(errors)
+
+    try:
+        participants = parse_int(get('Number of Participants'))
+    except (TypeError, ValueError):
+        participants = 0
+        if get('Number of Participants') is not None:
+            warnings.append(('Number of Participants', 'Invalid number of participants, using 0'))
+
+    status = cell_text(get('Status'), 'pending').lower()
+    if status not in STATUS_VALUES:
+        warnings.append(('Status', f'Unknown status "{cell_text(get("Status"))}", using pending'))
+        status = 'pending'
+
+    # Invalid optional meeting values are left empty
+    meeting_time = None
+    if get('Meeting Time') is not None:
+        try:
+            meeting_time = parse_time(get('Meeting Time'))
+        except (TypeError, ValueError):
+            warnings.append(('Meeting Time', 'Invalid meeting time, left empty'))
+    meeting_date = None
+    if get('Meeting Date') is not None:
+        try:
+            meeting_date = parse_date(get('Meeting Date'))
+        except (TypeError, ValueError):
+            warnings.append(('Meeting Date', 'Invalid meeting date, left empty'))
+
+    fields = {
+        'day': day,
+        'date': event_date,
+        'time': event_time,
+        'duration': duration,
+        'place': place,
+        'number_of_participants': participants,
+        'status': status,
+        'meeting_time': meeting_time,
+        'meeting_date': meeting_date,
+        'place_of_meeting': cell_text(get('Place of Meeting')) or None,
+        'vehicle': cell_text(get('Vehicle')) or None,
+        'camera_man': cell_text(get('Camera Man')) or None,
+        'participation_type': cell_text(get('Participation Type')) or None,
+        'event_reason': cell_text(get('Event Reason')) or None,
+        'external_id': cell_text(get('External ID')) or None,
+    }
+    fields['content_hash'] = content_hash(fields)
+    fields['import_key'] = import_key(fields['external_id'], event_date, event_time, place)
+    return fields
+
+
+def import_key(external_id, event_date, event_time, place):
+    """Upsert key of an imported event: its external ID, else date + time + place"""
+    if external_id:
+        source = f'ext:{external_id}'
+    else:
+        source = f'nk:{event_date.isoformat()}|{event_time.isoformat()}|{normalize_text(place)}'
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def content_hash(fields):
+    """Hash of the imported values of a row, to detect rows that did not change"""
+    values = json.dumps(
+        [[name, value.isoformat() if hasattr(value, 'isoformat') else value] for name, value in sorted(fields.items())],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(values.encode('utf-8')).hexdigest()
+
+
+def parse_event_reference(get):
+    """
+    The event a child row belongs to: ('row', n) for a row of the Events
+    sheet, else ('key', import key) from the External ID or date, time and place.
+    """
+    if get('Event Row') is not None:
+        try:
+            return 'row', parse_int(get('Event Row'))
+        except (TypeError, ValueError):
+            raise RowError([('Event Row', 'Invalid event row. Must be a row number of the Events sheet')])
+
+    external_id = cell_text(get('External ID'))
+    if external_id:
+        return 'key', import_key(external_id, None, None, None)
+    try:
+        event_date = parse_date(get('Date'))
+        event_time = parse_time(get('Time'))
+    except (TypeError, ValueError):
+        event_date = event_time = None
+    place = cell_text(get('Place'))
+    if event_date is None or not place:
+        raise RowError([('Event Row', 'Give the Event Row, the External ID, or the Date, Time and Place of the event')])
+    return 'key', import_key(None, event_date, event_time, place)
+
+
+def parse_child_row(kind, values, columns):
+    """
+    Turn one row of a Songs, Dress Details or Participants sheet into
+    (event reference, fields). Order is None when the column is empty.
+    """
+    get = row_getter(values, columns)
+    errors = []
+    try:
+        reference = parse_event_reference(get)
+    except RowError as e:
+        errors.extend(e.errors)
+
+    fields = {}
+    if kind in ('songs', 'dress_details'):
+        text_column = 'Title' if kind == 'songs' else 'Description'
+        fields[text_column.lower()] = cell_text(get(text_column))
+        if not fields[text_column.lower()]:
+            errors.append((text_column, f'{text_column} is required'))
+        fields['order'] = None
+        if get('Order') is not None:
+            try:
+                fields['order'] = parse_int(get('Order'))
+                if fields['order'] < 1:
+                    raise ValueError
+            except (TypeError, ValueError):
+                errors.append(('Order', 'Invalid order. Must be a positive number'))
+    if kind == 'songs':
+        fields['artist'] = cell_text(get('Artist')) or None
+        fields['duration'] = None
+        if get('Duration') is not None:
+            try:
+                fields['duration'] = parse_int(get('Duration'))
+            except (TypeError, ValueError):
+                errors.append(('Duration', 'Invalid duration. Must be a number of seconds'))
+    if kind == 'participants':
+        fields['username'] = cell_text(get('Username'))
+        if not fields['username']:
+            errors.append(('Username', 'Username is required'))
+        fields['is_confirmed'] = parse_bool(get('Confirmed'))
+
+    if errors:
+        raise RowError(errors)
+    return reference, fields
+
+
+def parse_child_rows(kind, rows, columns):
+    """Yield (row number, (reference, fields), error) for (row number, values) pairs"""
+    for row_num, values in rows:
+        try:
+            yield row_num, parse_child_row(kind, values, columns), None
+        except RowError as e:
+            yield row_num, None, str(e)
+
+
+def parse_rows(rows, columns):
+    """Yield (row number, fields, error) for (row number, values) pairs"""
+    for row_num, values in rows:
+        try:
+            yield row_num, parse_event_row(values, columns), None
+        except RowError as e:
+            yield row_num, None, str(e)
+
+
+def parse_batch(rows, columns):
+    """Process pool entry point: parse a list of rows"""
+    return list(parse_rows(rows, columns))
@@ -0,0 +1,300 @@
+"""
+Validation-only import runs.
+
+A dry run checks every row of an upload exactly as the import would but
+writes nothing to the database. Event rows are parsed, then validated
+against the model, so over-long text and out of range numbers are caught
+before the import. Rows of the Songs, Dress Details and Participants sheets
+are parsed and validated the same way, and their event and username
+references resolved against the upload and the database. Every row is
+reported, with every invalid cell, either as NDJSON lines streamed while
+the file is read or as a copy of the sheets with the failing cells highlighted.
+"""
+import json
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+
+from .exporting import CHILD_SHEETS, EVENT_COLUMNS
+from .import_parsing import RowError, parse_child_row, parse_event_row
+from .importing import (
+    CHILD_REQUIRED_COLUMNS, IMPORT_CHUNK_SIZE, ImportFileError, iter_data_rows, open_child_sheets, read_header,
+)
+from .models import Event
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill
+except ImportError:
+    Workbook = None
+
+REPORT_FORMATS = ('ndjson', 'xlsx')
+NDJSON_FLUSH_ROWS = 500
+EVENT_FIELD_COLUMNS = {field: header for header, field in EVENT_COLUMNS}
+
+
+def issues(pairs):
+    return [{'column': column, 'message': message} for column, message in pairs]
+
+
+def row_report(row_num, errors, warnings, sheet=None):
+    report = {'sheet': sheet} if sheet else {}
+    report.update({
+        'row': row_num,
+        'status': 'error' if errors else 'warning' if warnings else 'ok',
+        'errors': issues(errors),
+        'warnings': issues(warnings),
+    })
+    return report
+
+
+def model_errors(instance, field_columns, exclude):
+    """
+    (column, message) pairs for what full_clean() rejects. Uniqueness is
+    left out, the import resolves repeated import keys itself.
+    """
+    try:
+        instance.full_clean(exclude=exclude, validate_unique=False, validate_constraints=False)
+    except ValidationError as e:
+        return [
+            (field_columns.get(field), message)
+            for field, messages in e.message_dict.items() for message in messages
+        ]
+    return []
+
+
+def chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class DryRun:
+    """
+    Validate the rows of an upload the way EventImporter would import them.
+    The events sheet must be checked first, child rows refer to its rows.
+    """
+
+    def __init__(self, mode='create', chunk_size=IMPORT_CHUNK_SIZE):
+        self.mode = mode
+        self.chunk_size = chunk_size
+        # Valid events sheet rows by number, and the first row of each import key
+        self.row_keys = {}
+        self.first_rows = {}
+
+    def check_event_row(self, row_num, values, columns):
+        """(row number, values, errors, warnings, import key) of one events sheet row"""
+        warnings = []
+        try:
+            fields = parse_event_row(values, columns, warnings)
+        except RowError as e:
+            return row_num, values, e.errors, warnings, None
+        errors = model_errors(Event(**fields), EVENT_FIELD_COLUMNS, exclude=['created_by'])
+        return row_num, values, errors, warnings, fields['import_key']
+
+    def event_reports(self, rows, columns):
+        """Yield (row number, values, report) for every events sheet row"""
+        checked = (self.check_event_row(row_num, values, columns) for row_num, values in rows)
+        for chunk in chunked(checked, self.chunk_size):
+            existing = set()
+            if self.mode == 'create':
+                existing = set(Event.objects.filter(
+                    import_key__in=[key for *_, key in chunk if key]
+                ).values_list('import_key', flat=True))
+
+            for row_num, values, errors, warnings, key in chunk:
+                if not errors:
+                    self.row_keys[row_num] = key
+                    first_row = self.first_rows.setdefault(key, row_num)
+                    if self.mode == 'upsert' and first_row != row_num:
+                        # An upsert keeps only the last of several rows for the same event
+                        warnings.append((None, f'Same event as row {first_row}, the last of these rows is imported'))
+                    elif self.mode == 'create' and first_row != row_num:
+                        warnings.append((None, f'Same event as row {first_row}, this row creates another one'))
+                    elif self.mode == 'create' and key in existing:
+                        warnings.append((None, 'An event with this External ID or date, time and place '
+                                               'already exists, this row creates another one'))
+                yield row_num, values, row_report(row_num, errors, warnings)
+
+    def child_sheets(self, source):
+        """
+        Yield (title, headers, reports) for each child sheet of an opened
+        workbook, where reports yields (row number, values, report).
+        """
+        for kind, title, rows in open_child_sheets(source):
+            header_values = next(rows, ())
+            try:
+                columns = read_header(header_values, CHILD_REQUIRED_COLUMNS[kind])
+            except ImportFileError as e:
+                yield title, list(header_values), iter([(1, header_values, row_report(1, [(None, str(e))], [], title))])
+                continue
+            yield title, list(header_values), self.child_reports(kind, title, iter_data_rows(rows), columns)
+
+    def child_reports(self, kind, title, rows, columns):
+        field_columns = {field: header for header, field in CHILD_SHEETS[kind][2]}
+        model = CHILD_SHEETS[kind][1]
+        for chunk in chunked(rows, self.chunk_size):
+            parsed = []
+            for row_num, values in chunk:
+                try:
+                    parsed.append((row_num, values, parse_child_row(kind, values, columns), []))
+                except RowError as e:
+                    parsed.append((row_num, values, None, e.errors))
+
+            references = [result for _, _, result, _ in parsed if result is not None]
+            keys = {reference for (by, reference), _ in references if by == 'key'}
+            known_keys = set(Event.objects.filter(import_key__in=keys).values_list('import_key', flat=True))
+            usernames = set(get_user_model().objects.filter(
+                username__in={fields['username'] for _, fields in references}
+            ).values_list('username', flat=True)) if kind == 'participants' else set()
+
+            for row_num, values, result, errors in parsed:
+                if result is not None:
+                    (by, reference), fields = result
+                    if by == 'row' and reference not in self.row_keys:
+                        errors.append(('Event Row', f'Event row {reference} is missing or invalid, so it is not imported'))
+                    elif by == 'key' and reference not in known_keys and reference not in self.first_rows:
+                        errors.append((None, 'No event matches this External ID or date, time and place'))
+                    if kind == 'participants':
+                        if fields['username'] not in usernames:
+                            errors.append(('Username', f'Unknown username "{fields["username"]}"'))
+                    else:
+                        # An empty order is filled in by the import
+                        exclude = ['event'] if fields['order'] is not None else ['event', 'order']
+                        errors.extend(model_errors(model(**fields), field_columns, exclude))
+                yield row_num, values, row_report(row_num, errors, [], title)
+
+
+def summary(counts):
+    return {
+        'total_rows': sum(counts.values()),
+        'valid_rows': counts['ok'] + counts['warning'],
+        'warning_rows': counts['warning'],
+        'failed_rows': counts['error'],
+    }
+
+
+def headers_of(columns):
+    """Header row of a sheet, from its header name to position map"""
+    headers = [''] * (max(columns.values()) + 1)
+    for header, index in columns.items():
+        headers[index] = header
+    return headers
+
+
+def iter_sheet_reports(rows, columns, mode, source):
+    """
+    Yield (child sheet title or None, headers, reports) for the events
+    sheet, then each child sheet. Each sheet's reports must be consumed
+    before the next sheet is taken, child rows depend on the event rows.
+    """
+    dry_run = DryRun(mode)
+    yield None, headers_of(columns), dry_run.event_reports(rows, columns)
+    yield from dry_run.child_sheets(source)
+
+
+def sheet_summaries(counts):
+    """Summary of the events sheet, with one per child sheet under 'sheets'"""
+    result = summary(counts.pop(None))
+    if counts:
+        result['sheets'] = {title: summary(sheet_counts) for title, sheet_counts in counts.items()}
+    return result
+
+
+def iter_ndjson_report(rows, columns, mode, source):
+    """One JSON line per row, then a summary line. Closes `source` when done"""
+    counts = {}
+    lines = []
+    try:
+        for title, _, reports in iter_sheet_reports(rows, columns, mode, source):
+            sheet_counts = counts.setdefault(title, Counter())
+            for _, _, report in reports:
+                sheet_counts[report['status']] += 1
+                lines.append(json.dumps(report, ensure_ascii=False))
+                if len(lines) >= NDJSON_FLUSH_ROWS:
+                    yield ('\n'.join(lines) + '\n').encode('utf-8')
+                    lines = []
+    finally:
+        source.close()
+    lines.append(json.dumps({'summary': sheet_summaries(counts)}, ensure_ascii=False))
+    yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def write_report_sheet(sheet, headers, reports, fills):
+    """
+    Copy the rows of one uploaded sheet with an import status and messages
+    column. Returns the count of rows by status.
+    """
+    sheet.freeze_panes = 'A2'
+    header_font = Font(bold=True)
+    header_cells = []
+    for header in headers + ['Import Status', 'Import Messages']:
+        cell = WriteOnlyCell(sheet, value=header)
+        cell.font = header_font
+        header_cells.append(cell)
+    sheet.append(header_cells)
+
+    counts = Counter()
+    next_row = 2
+    for row_num, values, report in reports:
+        counts[report['status']] += 1
+        while next_row < row_num:
+            sheet.append([])
+            next_row += 1
+
+        flagged = {issue['column']: 'warning' for issue in report['warnings']}
+        flagged.update((issue['column'], 'error') for issue in report['errors'])
+        cells = []
+        # Columns past the header are ignored by the import and left out here
+        for index, header in enumerate(headers):
+            value = values[index] if index < len(values) else None
+            level = flagged.get(header)
+            if level:
+                value = WriteOnlyCell(sheet, value=value)
+                value.fill = fills[level]
+            cells.append(value)
+
+        messages = [
+            f'{issue["column"]}: {issue["message"]}' if issue['column'] else issue['message']
+            for issue in report['errors'] + report['warnings']
+        ]
+        status_cell = WriteOnlyCell(sheet, value=report['status'])
+        if report['status'] in fills:
+            status_cell.fill = fills[report['status']]
+        sheet.append(cells + [status_cell, '; '.join(messages)])
+        next_row += 1
+    return counts
+
+
+def write_xlsx_report(rows, columns, mode, target, source):
+    """
+    Save a copy of the uploaded sheets with an import status and messages
+    column. Cells that fail validation are red, cells that fall back to a
+    default are yellow, and blank rows are kept so row numbers still match.
+    """
+    workbook = Workbook(write_only=True)
+    fills = {
+        'error': PatternFill(start_color='F8CBAD', end_color='F8CBAD', fill_type='solid'),
+        'warning': PatternFill(start_color='FFE699', end_color='FFE699', fill_type='solid'),
+    }
+    counts = {}
+    for title, headers, reports in iter_sheet_reports(rows, columns, mode, source):
+        # Excel limits sheet titles to 31 characters
+        sheet = workbook.create_sheet('Import Report' if title is None else f'{title} Report'[:31])
+        counts[title] = write_report_sheet(sheet, headers, reports, fills)
+
+    summary_sheet = workbook.create_sheet('Summary')
+    result = sheet_summaries(counts)
+    for title, sheet_summary in [(None, result)] + list(result.pop('sheets', {}).items()):
+        for name, value in sheet_summary.items():
+            label = name.replace('_', ' ').capitalize()
+            summary_sheet.append([f'{title}: {label}' if title else label, value])
+
+    workbook.save(target)
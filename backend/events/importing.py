@@ -0,0 +1,587 @@
+"""
+Streaming event import.
+
+Rows are read one at a time from a read-only workbook or a CSV/TSV
+stream, parsed into Event
+objects and written with one bulk_create per chunk, so memory stays bounded
+by the chunk size rather than the file size. bulk_create skips save() and
+its signals, so each chunk also applies the stats, search index and cache
+side effects itself.
+
+Workbooks may also carry Songs, Dress Details and Participants sheets.
+Their rows name an event by its row in the Events sheet or by its import
+key, and are written after the events with one bulk statement per chunk
+that updates rows already holding the same (event, order) or (event, user).
+
+In upsert mode rows are matched to existing events by import key (the
+External ID column, else date + time + place). New keys are inserted,
+changed rows are updated in the same bulk statement, and rows whose content
+hash is unchanged are not written at all.
+
+Parsing can optionally be spread over a process pool: row batches are
+parsed in worker processes and merged back in row order, while inserts
+stay in the main process.
+"""
+import csv
+import io
+import multiprocessing
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+from . import cache
+from .import_parsing import IMPORTED_FIELDS, cell_text, parse_batch, parse_child_rows, parse_rows
+from .models import DressDetail, Event, EventParticipant, EventStats, Song
+from .search import index_events
+
+REQUIRED_COLUMNS = [
+    'Day', 'Date', 'Time', 'Duration (minutes)', 'Place', 'Number of Participants'
+]
+# Child sheets by lower-cased title, and the columns each one needs
+CHILD_SHEET_KINDS = {
+    'songs': 'songs',
+    'dress details': 'dress_details',
+    'dress': 'dress_details',
+    'participants': 'participants',
+}
+CHILD_REQUIRED_COLUMNS = {
+    'songs': ['Title'],
+    'dress_details': ['Description'],
+    'participants': ['Username'],
+}
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+TEXT_EXTENSIONS = ('.csv', '.tsv', '.txt')
+CSV_DELIMITERS = (',', '\t', ';')
+SNIFF_SIZE = 8192
+IMPORT_MODES = ('create', 'upsert')
+IMPORT_CHUNK_SIZE = 1000
+PARSE_BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 10
+
+
+class ImportFileError(Exception):
+    """The file as a whole cannot be imported"""
+
+
+def read_header(header_values, required=REQUIRED_COLUMNS):
+    """Map header names to column positions, checking the required ones are present"""
+    headers = [cell_text(value) for value in header_values]
+    missing_columns = [column for column in required if column not in headers]
+    if missing_columns:
+        raise ImportFileError(f'Missing required columns: {", ".join(missing_columns)}')
+    columns = {}
+    for index, header in enumerate(headers):
+        columns.setdefault(header, index)
+    return columns
+
+
+def iter_data_rows(rows, first_row_num=2):
+    """Yield (row number, values) for every row that has any content"""
+    for row_num, values in enumerate(rows, first_row_num):
+        if any(value is not None and cell_text(value) for value in values):
+            yield row_num, values
+
+
+def open_excel_rows(excel_file):
+    """
+    Open a workbook in read-only mode. Returns (columns, rows, workbook);
+    close the workbook once the rows have been consumed.
+    """
+    try:
+        workbook = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFileError(f'Failed to read Excel file: {str(e)}')
+
+    # The events are on the first sheet that is not a child sheet
+    sheet = next(
+        (sheet for sheet in workbook.worksheets if child_sheet_kind(sheet.title) is None),
+        workbook.active
+    )
+    rows = sheet.iter_rows(values_only=True)
+    try:
+        columns = read_header(next(rows, ()))
+    except ImportFileError:
+        workbook.close()
+        raise
+    return columns, iter_data_rows(rows), workbook
+
+
+def child_sheet_kind(title):
+    return CHILD_SHEET_KINDS.get(title.strip().lower())
+
+
+def open_child_sheets(source):
+    """
+    Yield (kind, title, rows) for the child sheets of an opened workbook,
+    where rows still starts with the header row. CSV sources have none.
+    """
+    if openpyxl is None or not isinstance(source, openpyxl.Workbook):
+        return
+    for sheet in source.worksheets:
+        kind = child_sheet_kind(sheet.title)
+        if kind:
+            yield kind, sheet.title, sheet.iter_rows(values_only=True)
+
+
+def detect_import_format(upload, name):
+    """'excel' or 'csv' from the file extension, else from the first bytes; None if neither"""
+    name = name.lower()
+    if name.endswith(EXCEL_EXTENSIONS):
+        return 'excel'
+    if name.endswith(TEXT_EXTENSIONS):
+        return 'csv'
+
+    head = upload.read(SNIFF_SIZE)
+    upload.seek(0)
+    if head.startswith(b'PK\x03\x04'):
+        # .xlsx files are zip archives
+        return 'excel'
+    if head and b'\x00' not in head and sniff_delimiter(head.decode('utf-8', errors='ignore')):
+        return 'csv'
+    return None
+
+
+def sniff_delimiter(text):
+    """The delimiter used most in the first line of `text`, or None"""
+    header_line = text.splitlines()[0] if text else ''
+    delimiter = max(CSV_DELIMITERS, key=header_line.count)
+    return delimiter if header_line.count(delimiter) else None
+
+
+def check_encoding(rows):
+    try:
+        yield from rows
+    except UnicodeDecodeError:
+        raise ImportFileError('CSV files must be UTF-8 encoded')
+
+
+def open_csv_rows(upload, name=''):
+    """
+    Stream a CSV or TSV upload with the same columns as the Excel template.
+    Returns (columns, rows, stream); close the stream once the rows have
+    been consumed.
+    """
+    stream = io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
+    try:
+        try:
+            header_line = stream.readline()
+        except UnicodeDecodeError:
+            raise ImportFileError('CSV files must be UTF-8 encoded')
+        if name.lower().endswith('.tsv'):
+            delimiter = '\t'
+        else:
+            delimiter = sniff_delimiter(header_line) or ','
+        columns = read_header(next(csv.reader([header_line], delimiter=delimiter), []))
+    except ImportFileError:
+        stream.close()
+        raise
+    rows = check_encoding(csv.reader(stream, delimiter=delimiter))
+    return columns, iter_data_rows(rows), stream
+
+
+def open_import_rows(upload, name):
+    """Open an Excel, CSV or TSV upload. Returns (columns, rows, closable source)"""
+    import_format = detect_import_format(upload, name)
+    if import_format == 'excel':
+        return open_excel_rows(upload)
+    if import_format == 'csv':
+        return open_csv_rows(upload, name)
+    raise ImportFileError('Invalid file type. Please upload an Excel (.xlsx) or CSV/TSV file')
+
+
+def parse_rows_parallel(rows, columns, processes, batch_size=PARSE_BATCH_SIZE):
+    """
+    parse_rows() on a process pool. Results come back in row order, and at
+    most two batches per process are in flight so memory stays bounded.
+    """
+    rows = iter(rows)
+    # Spawned workers only import import_parsing, never Django or open connections
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        pending = deque()
+        while True:
+            batch = list(islice(rows, batch_size))
+            if batch:
+                pending.append(executor.submit(parse_batch, batch, columns))
+            if pending and (not batch or len(pending) >= processes * 2):
+                yield from pending.popleft().result()
+            elif not batch:
+                return
+
+
+def read_back_ids(events):
+    """
+    bulk_create events on a backend that returns no primary keys. Each row
+    carries a token unique to this call, and the ids are read back by token.
+    Concurrent inserts by other sessions, and gaps in auto-increment values,
+    cannot mix other rows in.
+    """
+    batch = uuid.uuid4().hex
+    tokens = {}
+    for index, event in enumerate(events):
+        event.insert_token = f'{batch}:{index}'
+        tokens[event.insert_token] = event
+
+    # New ids are above the current maximum, which keeps the lookup a primary key range scan
+    last_id = Event.objects.aggregate(last=Max('id'))['last'] or 0
+    Event.objects.bulk_create(events)
+    inserted = Event.objects.filter(id__gt=last_id, insert_token__startswith=f'{batch}:')
+    for token, pk in inserted.values_list('insert_token', 'id'):
+        event = tokens.pop(token)
+        event.pk = pk
+        event._state.adding = False
+        event.insert_token = None
+    inserted.update(insert_token=None)
+
+
+def bulk_insert_events(events, index=True):
+    """
+    bulk_create events and apply what their save() signals would have done:
+    normalized fields, stats counters, search index and cache generation.
+    Sets the pk of every event and returns the ids in the same order.
+    Pass index=False to index them later, e.g. once their children are in.
+    """
+    if not events:
+        return []
+    for event in events:
+        event.normalize_fields()
+
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            Event.objects.bulk_create(events)
+        else:
+            read_back_ids(events)
+        ids = [event.pk for event in events]
+        if len(ids) != len(events) or not all(ids):
+            raise DatabaseError('Could not read back the ids of bulk inserted events')
+
+        statuses = Counter(event.status for event in events)
+        EventStats.apply_delta({
+            'total_events': len(events),
+            **{EventStats.status_counter(status): count for status, count in statuses.items()},
+        })
+        if index:
+            index_events(ids)
+        cache.schedule_bump()
+    return ids
+
+
+def assign_import_keys(events):
+    """
+    Keep the import key only on events whose key is not taken yet, by
+    another event or an earlier one of `events`, so plain imports still
+    create duplicates but later upserts can find the first one.
+    """
+    taken = set(Event.objects.filter(
+        import_key__in=[event.import_key for event in events if event.import_key]
+    ).exclude(
+        pk__in=[event.pk for event in events if event.pk]
+    ).values_list('import_key', flat=True))
+    for event in events:
+        if event.import_key in taken:
+            event.import_key = None
+        else:
+            taken.add(event.import_key)
+
+
+def bulk_upsert_events(events):
+    """
+    Insert or update events by import key in one bulk statement, skipping
+    events whose content hash is unchanged, then apply the side effects
+    their save() signals would have. Returns (created, updated, unchanged,
+    duplicates), where duplicates counts events replaced by a later one of
+    `events` with the same key.
+    """
+    # When a file repeats a key the last row wins
+    by_key = {event.import_key: event for event in events}
+    duplicates = len(events) - len(by_key)
+    existing = {
+        key: (status, stored_hash)
+        for key, status, stored_hash in Event.objects.filter(import_key__in=by_key).values_list(
+            'import_key', 'status', 'content_hash'
+        )
+    }
+    changed = [
+        event for key, event in by_key.items()
+        if key not in existing or existing[key][1] != event.content_hash
+    ]
+    unchanged = len(by_key) - len(changed)
+    if not changed:
+        return 0, 0, unchanged, duplicates
+
+    deltas = Counter()
+    for event in changed:
+        if event.import_key in existing:
+            old_status = existing[event.import_key][0]
+            if old_status != event.status:
+                deltas[EventStats.status_counter(old_status)] -= 1
+                deltas[EventStats.status_counter(event.status)] += 1
+        else:
+            deltas['total_events'] += 1
+            deltas[EventStats.status_counter(event.status)] += 1
+    for event in changed:
+        event.normalize_fields()
+
+    options = {
+        'update_conflicts': True,
+        'update_fields': [*IMPORTED_FIELDS, *Event.NORMALIZED_FIELDS.values(), 'content_hash', 'updated_at'],
+    }
+    # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['import_key']
+
+    with transaction.atomic():
+        Event.objects.bulk_create(changed, **options)
+        ids = Event.objects.filter(
+            import_key__in=[event.import_key for event in changed]
+        ).values_list('id', flat=True)
+        EventStats.apply_delta(deltas)
+        index_events(ids)
+        cache.schedule_bump()
+
+    created = sum(1 for event in changed if event.import_key not in existing)
+    return created, len(changed) - created, unchanged, duplicates
+
+
+def bulk_upsert_children(kind, rows):
+    """
+    Write (event id, fields) child rows with one bulk statement, updating
+    rows that already hold the same (event, order) or (event, user), then
+    apply what the children's save() signals would have: touch and reindex
+    their events and bump the cache generation.
+    """
+    if kind == 'participants':
+        model, unique_fields, update_fields = EventParticipant, ['event', 'user'], ['is_confirmed']
+        objects = {
+            (event_id, fields['user_id']): EventParticipant(
+                event_id=event_id, user_id=fields['user_id'], is_confirmed=fields['is_confirmed']
+            )
+            for event_id, fields in rows
+        }
+    else:
+        model = Song if kind == 'songs' else DressDetail
+        unique_fields = ['event', 'order']
+        update_fields = ['title', 'artist', 'duration'] if kind == 'songs' else ['description']
+        # A statement may not update the same row twice, so the last duplicate wins
+        objects = {(event_id, fields['order']): model(event_id=event_id, **fields) for event_id, fields in rows}
+
+    options = {'update_conflicts': True, 'update_fields': update_fields}
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = unique_fields
+
+    event_ids = {event_id for event_id, _ in objects}
+    with transaction.atomic():
+        model.objects.bulk_create(objects.values(), **options)
+        updates = {'updated_at': timezone.now()}
+        if kind == 'participants':
+            updates.update(Event.participant_counts())
+        Event.objects.filter(pk__in=event_ids).update(**updates)
+        if kind != 'dress_details':
+            # Song titles and participant names are part of the search text
+            index_events(event_ids)
+        cache.schedule_bump()
+    return len(objects)
+
+
+class EventImporter:
+    """Parse rows and insert them in chunks, collecting per-row errors"""
+
+    def __init__(self, user, chunk_size=IMPORT_CHUNK_SIZE, max_errors=MAX_REPORTED_ERRORS,
+                 on_progress=None, processes=1, mode='create'):
+        self.user = user
+        self.mode = mode
+        self.chunk_size = chunk_size
+        self.processes = processes
+        self.max_errors = max_errors
+        self.on_progress = on_progress
+        self.imported_count = 0
+        self.updated_count = 0
+        self.unchanged_count = 0
+        self.duplicate_count = 0
+        self.total_rows = 0
+        self.error_count = 0
+        self.errors = []
+        # Events sheet rows, for child rows that refer to them by row number
+        self.row_ids = {}
+        self.row_keys = {}
+        self.child_counts = Counter()
+        self.last_orders = {}
+
+    def add_error(self, row_num, message, sheet=None):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(f'{sheet} row {row_num}: {message}' if sheet else f'Row {row_num}: {message}')
+
+    def run(self, rows, columns):
+        """Import (row number, values) pairs"""
+        if self.processes > 1:
+            parsed = parse_rows_parallel(rows, columns, self.processes)
+        else:
+            parsed = parse_rows(rows, columns)
+
+        chunk = []
+        for row_num, fields, error in parsed:
+            self.total_rows += 1
+            if error:
+                self.add_error(row_num, error)
+                continue
+            chunk.append((row_num, Event(created_by=self.user, **fields)))
+            if len(chunk) >= self.chunk_size:
+                self.flush(chunk)
+                chunk = []
+        self.flush(chunk)
+        return self
+
+    def flush(self, chunk):
+        if chunk:
+            self.insert(chunk)
+        if self.on_progress:
+            self.on_progress(self)
+
+    def insert(self, chunk):
+        try:
+            self.write(chunk)
+        except DatabaseError:
+            # Retry row by row so the failing rows are reported individually
+            for row_num, event in chunk:
+                try:
+                    event.pk = None
+                    event._state.adding = True
+                    self.write([(row_num, event)])
+                except DatabaseError as e:
+                    self.add_error(row_num, str(e))
+
+    def write(self, chunk):
+        events = [event for _, event in chunk]
+        if self.mode == 'upsert':
+            created, updated, unchanged, duplicates = bulk_upsert_events(events)
+            self.imported_count += created
+            self.updated_count += updated
+            self.unchanged_count += unchanged
+            self.duplicate_count += duplicates
+            self.row_keys.update((row_num, event.import_key) for row_num, event in chunk)
+        else:
+            assign_import_keys(events)
+            bulk_insert_events(events)
+            self.imported_count += len(events)
+            # bulk_insert_events checked that every event got its own id back
+            self.row_ids.update((row_num, event.pk) for row_num, event in chunk)
+
+    def run_children(self, source):
+        """Import the child sheets of a workbook, once its events are in"""
+        for kind, title, rows in open_child_sheets(source):
+            try:
+                columns = read_header(next(rows, ()), CHILD_REQUIRED_COLUMNS[kind])
+            except ImportFileError as e:
+                self.add_error(1, str(e), title)
+                continue
+
+            chunk = []
+            for row_num, parsed, error in parse_child_rows(kind, iter_data_rows(rows), columns):
+                if error:
+                    self.add_error(row_num, error, title)
+                    continue
+                chunk.append((row_num, parsed))
+                if len(chunk) >= self.chunk_size:
+                    self.flush_children(kind, title, chunk)
+                    chunk = []
+            self.flush_children(kind, title, chunk)
+        return self
+
+    def flush_children(self, kind, title, chunk):
+        if chunk:
+            self.insert_children(kind, title, self.resolve_children(kind, title, chunk))
+        if self.on_progress:
+            self.on_progress(self)
+
+    def resolve_children(self, kind, title, chunk):
+        """
+        Replace the event reference of parsed child rows with an event id,
+        and participant usernames with user ids, in one query each.
+        Returns (row number, event id, fields) for the rows that resolve.
+        """
+        keys = set()
+        for _, ((by, reference), _) in chunk:
+            if by == 'key':
+                keys.add(reference)
+            elif reference not in self.row_ids and reference in self.row_keys:
+                keys.add(self.row_keys[reference])
+        key_ids = dict(
+            Event.objects.filter(import_key__in=keys).values_list('import_key', 'id')
+        ) if keys else {}
+        users = get_user_model().objects.in_bulk(
+            {fields['username'] for _, (_, fields) in chunk}, field_name='username'
+        ) if kind == 'participants' else {}
+
+        resolved = []
+        for row_num, ((by, reference), fields) in chunk:
+            if by == 'row':
+                event_id = self.row_ids.get(reference) or key_ids.get(self.row_keys.get(reference))
+                if event_id is None:
+                    self.add_error(row_num, f'Event row {reference} was not imported', title)
+                    continue
+            else:
+                event_id = key_ids.get(reference)
+                if event_id is None:
+                    self.add_error(row_num, 'No event matches this External ID or date, time and place', title)
+                    continue
+
+            if kind == 'participants':
+                user = users.get(fields['username'])
+                if user is None:
+                    self.add_error(row_num, f'Unknown username "{fields["username"]}"', title)
+                    continue
+                fields = {'user_id': user.pk, 'is_confirmed': fields['is_confirmed']}
+            else:
+                # Rows without an order follow the last one given for the event
+                last_order = self.last_orders.get((kind, event_id), 0)
+                if fields['order'] is None:
+                    fields = {**fields, 'order': last_order + 1}
+                self.last_orders[(kind, event_id)] = max(last_order, fields['order'])
+            resolved.append((row_num, event_id, fields))
+        return resolved
+
+    def insert_children(self, kind, title, rows):
+        try:
+            self.child_counts[kind] += bulk_upsert_children(kind, [(event_id, fields) for _, event_id, fields in rows])
+        except DatabaseError:
+            for row_num, event_id, fields in rows:
+                try:
+                    self.child_counts[kind] += bulk_upsert_children(kind, [(event_id, fields)])
+                except DatabaseError as e:
+                    self.add_error(row_num, str(e), title)
+
+    def result(self):
+        data = {
+            'message': f'Successfully imported {self.imported_count} events',
+            'imported_count': self.imported_count,
+            'total_rows': self.total_rows,
+        }
+        if self.mode == 'upsert':
+            data['message'] += f', updated {self.updated_count}, {self.unchanged_count} unchanged'
+            data['updated_count'] = self.updated_count
+            data['unchanged_count'] = self.unchanged_count
+            if self.duplicate_count:
+                data['message'] += f', {self.duplicate_count} replaced by a later row for the same event'
+                data['duplicate_count'] = self.duplicate_count
+        if self.child_counts:
+            data['message'] += ', with ' + ', '.join(
+                f'{count} {kind.replace("_", " ")}' for kind, count in self.child_counts.items()
+            )
+            for kind, count in self.child_counts.items():
+                data[f'{kind}_count'] = count
+        if self.errors:
+            data['errors'] = self.errors
+            data['error_count'] = self.error_count
+        return data
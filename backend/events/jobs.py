@@ -0,0 +1,186 @@
+"""
+Background processing of event import jobs.
+
+The upload view only stores the file and queues an ImportJob. With the
+'thread' worker the job runs on a small in-process pool once the job row
+is committed; with 'command' (the production default) it waits for
+`manage.py process_import_jobs`. Either way a job is claimed with a
+single conditional UPDATE, so it is never processed twice. The command
+can also parse rows on several processes (--processes).
+
+A claim is a lease: the worker stamps a heartbeat with every progress
+update, and a running job whose heartbeat is older than the lease is
+taken to have lost its worker (a recycled or killed uWSGI process, say).
+Upsert jobs are then queued again, since rerunning them is harmless;
+create jobs would insert their first rows twice, so they fail instead.
+"""
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .importing import EventImporter, ImportFileError, open_import_rows
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+IMPORT_WORKER = getattr(settings, 'EVENT_IMPORT_WORKER', 'thread')
+IMPORT_THREADS = getattr(settings, 'EVENT_IMPORT_THREADS', 1)
+IMPORT_LEASE = timedelta(seconds=getattr(settings, 'EVENT_IMPORT_LEASE_SECONDS', 300))
+# A queued job left this long with the thread worker is started by the next status poll
+QUEUED_GRACE = timedelta(seconds=30)
+JOB_MAX_ATTEMPTS = 3
+JOB_MAX_ERRORS = 100
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=IMPORT_THREADS, thread_name_prefix='event-import')
+    return _executor
+
+
+def enqueue_import_job(job):
+    """Start a queued job on the in-process pool once it is committed"""
+    if IMPORT_WORKER == 'thread':
+        transaction.on_commit(lambda: get_executor().submit(run_in_thread, job.pk))
+
+
+def run_in_thread(job_id):
+    close_old_connections()
+    try:
+        process_import_job(job_id)
+    finally:
+        close_old_connections()
+
+
+class LeaseLost(Exception):
+    """The job was requeued or failed while this worker was still running it"""
+
+
+def claim_job(job_id):
+    """Move a queued job to running under a new lease. Returns its token, or None if another worker got it first"""
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    claimed = ImportJob.objects.filter(pk=job_id, status='queued').update(
+        status='running', started_at=now, heartbeat_at=now, lease_token=token, attempts=F('attempts') + 1
+    )
+    return token if claimed else None
+
+
+def save_progress(job, importer, token, **extra):
+    """Record progress and renew the lease, or raise LeaseLost if it expired"""
+    updated = ImportJob.objects.filter(pk=job.pk, lease_token=token).update(
+        total_rows=importer.total_rows,
+        processed_rows=importer.imported_count,
+        updated_rows=importer.updated_count,
+        unchanged_rows=importer.unchanged_count,
+        duplicate_rows=importer.duplicate_count,
+        failed_rows=importer.error_count,
+        errors=importer.errors,
+        heartbeat_at=timezone.now(),
+        **extra
+    )
+    if not updated:
+        raise LeaseLost(f'Import job {job.pk} lost its lease')
+
+
+def recover_stale_jobs(jobs=None):
+    """
+    Requeue or fail running jobs whose lease expired. Returns the number of
+    (requeued, failed) jobs.
+    """
+    cutoff = timezone.now() - IMPORT_LEASE
+    stale = (jobs if jobs is not None else ImportJob.objects.all()).filter(status='running').filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    requeued = stale.filter(mode='upsert', attempts__lt=JOB_MAX_ATTEMPTS).update(
+        status='queued', lease_token=None, message='Requeued after its worker stopped responding'
+    )
+    failed = stale.update(
+        status='failed',
+        lease_token=None,
+        finished_at=timezone.now(),
+        message='The import stopped responding. Rows imported before that were kept; '
+                'upload the file again in upsert mode to finish it.',
+    )
+    return requeued, failed
+
+
+def revive_job(job):
+    """
+    With the thread worker nothing else drains the queue, so a status poll
+    recovers a stale job and restarts one whose process went away before
+    starting it. Claims are conditional, so a job is still run only once.
+    """
+    if IMPORT_WORKER != 'thread':
+        return
+    recover_stale_jobs(ImportJob.objects.filter(pk=job.pk))
+    waiting = ImportJob.objects.filter(
+        pk=job.pk, status='queued', created_at__lt=timezone.now() - QUEUED_GRACE
+    ).exists()
+    if waiting:
+        get_executor().submit(run_in_thread, job.pk)
+
+
+def lease_lost(job_id):
+    # The job was recovered and may run again, so its upload is kept
+    logger.warning('Import job %s outlived its lease and was recovered, stopping', job_id)
+    return True
+
+
+def process_import_job(job_id, processes=1):
+    """
+    Run one queued job to completion. Returns False if it was not claimed.
+    `processes` > 1 parses rows on a process pool, which needs a real
+    Python executable and so is only offered by the management command.
+    """
+    token = claim_job(job_id)
+    if token is None:
+        return False
+
+    job = ImportJob.objects.select_related('created_by').get(pk=job_id)
+    importer = EventImporter(
+        job.created_by,
+        max_errors=JOB_MAX_ERRORS,
+        on_progress=lambda importer: save_progress(job, importer, token),
+        processes=processes,
+        mode=job.mode,
+    )
+    try:
+        with job.file.open('rb') as upload:
+            columns, rows, source = open_import_rows(upload, job.original_name)
+            try:
+                importer.run(rows, columns)
+                importer.run_children(source)
+            finally:
+                source.close()
+        status, message = 'completed', importer.result()['message']
+    except LeaseLost:
+        return lease_lost(job_id)
+    except ImportFileError as e:
+        status, message = 'failed', str(e)
+    except Exception as e:
+        logger.exception('Import job %s failed', job_id)
+        status, message = 'failed', f'Import failed: {str(e)}'
+
+    try:
+        save_progress(
+            job, importer, token, status=status, message=message, finished_at=timezone.now(), lease_token=None
+        )
+    except LeaseLost:
+        return lease_lost(job_id)
+    # The rows are in the database now, the upload is no longer needed
+    job.file.delete(save=False)
+    return True
+
+
+def queued_job_ids():
+    return list(ImportJob.objects.filter(status='queued').order_by('created_at').values_list('pk', flat=True))
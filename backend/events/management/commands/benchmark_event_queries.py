@@ -0,0 +1,150 @@
+import random
+import time as timer
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.request import Request
+
+from events.models import Event
+from events.views import EventListView, EventSearchView
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a large set of events and print EXPLAIN output and timings for '
+        'the queries behind each event endpoint. Runs in a transaction that is '
+        'rolled back unless --keep is given.'
+    )
+
+    statuses = ['pending', 'confirmed', 'completed', 'cancelled']
+    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=50000, help='Number of events to seed (default 50000)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query (default 5)')
+        parser.add_argument('--page-size', type=int, default=20, help='Rows fetched per timed query (default 20)')
+        parser.add_argument('--keep', action='store_true', help='Commit the seeded events instead of rolling back')
+        parser.add_argument('--no-explain', action='store_true', help='Only print timings')
+
+    def handle(self, *args, **options):
+        self.options = options
+        try:
+            with transaction.atomic():
+                self.seed(options['events'])
+                self.run_benchmarks()
+                if not options['keep']:
+                    raise Rollback
+        except Rollback:
+            self.stdout.write(self.style.WARNING('Rolled back seeded events'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                'Seeded events were kept; run recompute_stats to refresh the dashboard counters'
+            ))
+
+    def seed(self, count):
+        user = User.objects.order_by('pk').first()
+        if user is None:
+            user = User.objects.create_user('benchmark', password=None)
+
+        today = timezone.now().date()
+        rng = random.Random(42)
+        started = timer.perf_counter()
+        batch = []
+        for index in range(count):
+            event_date = today + timedelta(days=rng.randint(-730, 730))
+            event = Event(
+                day=self.days[event_date.weekday()],
+                date=event_date,
+                time=time(rng.randint(6, 22), rng.choice([0, 15, 30, 45])),
+                duration=rng.randint(30, 240),
+                place=f'Benchmark Hall {rng.randint(1, 500)}',
+                status=rng.choice(self.statuses),
+                created_by=user,
+            )
+            # bulk_create skips save(), and ?place= matches the normalized column
+            event.normalize_fields()
+            batch.append(event)
+            if len(batch) >= 1000:
+                Event.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Event.objects.bulk_create(batch)
+
+        elapsed = timer.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Seeded {count} events in {elapsed:.2f}s'))
+
+    def list_queryset(self, view_class, params):
+        view = view_class()
+        view.request = Request(RequestFactory().get('/', params))
+        view.kwargs = {}
+        view.format_kwarg = None
+        return view.get_queryset()
+
+    def get_cases(self):
+        today = timezone.now().date()
+        recent = (today - timedelta(days=30)).isoformat()
+        soon = (today + timedelta(days=30)).isoformat()
+        base = Event.objects.select_related('created_by')
+        return [
+            ('list: default sort (date, time)', self.list_queryset(EventListView, {})),
+            ('list: status=confirmed', self.list_queryset(EventListView, {'status': 'confirmed'})),
+            ('list: date range', self.list_queryset(EventListView, {'start_date': recent, 'end_date': soon})),
+            ('list: status + date range', self.list_queryset(
+                EventListView, {'status': 'pending', 'start_date': recent, 'end_date': soon}
+            )),
+            ('list: sort_by=time', self.list_queryset(EventListView, {'sort_by': 'time'})),
+            ('list: sort_by=created desc', self.list_queryset(
+                EventListView, {'sort_by': 'created', 'sort_order': 'desc'}
+            )),
+            ('by status: pending', base.filter(status='pending').order_by('-created_at')),
+            ('upcoming', base.filter(
+                date__gte=today, status__in=['pending', 'confirmed']
+            ).order_by('date', 'time')),
+            ('past', base.filter(date__lt=today).order_by('-date', '-time')),
+            ('dashboard: next event', Event.objects.filter(date__gte=today).order_by('date', 'time')),
+            ('dashboard: recent events', base.order_by('-created_at')),
+            ('search: place', self.list_queryset(EventSearchView, {'place': 'Hall 42'})),
+        ]
+
+    def run_benchmarks(self):
+        repeat = max(self.options['repeat'], 1)
+        page_size = self.options['page_size']
+        self.stdout.write(f'Database vendor: {connection.vendor}')
+
+        for label, queryset in self.get_cases():
+            self.stdout.write('')
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            page = queryset[:page_size]
+
+            if not self.options['no_explain']:
+                try:
+                    self.stdout.write(page.explain())
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f'EXPLAIN failed: {e}'))
+
+            timings = []
+            for _ in range(repeat):
+                started = timer.perf_counter()
+                list(page)
+                timings.append(timer.perf_counter() - started)
+                page = queryset[:page_size]
+
+            started = timer.perf_counter()
+            total = queryset.count()
+            count_time = timer.perf_counter() - started
+
+            self.stdout.write(
+                f'first {page_size} rows: best {min(timings) * 1000:.2f}ms, '
+                f'mean {sum(timings) / len(timings) * 1000:.2f}ms; '
+                f'count={total} in {count_time * 1000:.2f}ms'
+            )
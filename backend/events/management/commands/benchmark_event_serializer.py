@@ -0,0 +1,108 @@
+import random
+import time as timer
+from datetime import time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from events.fast_serializers import FastEventSerializer
+from events.models import DressDetail, Event, EventParticipant, Song
+from events.serializers import EventSerializer
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed events with songs, dress details and participants, check that the '
+        'fast list renderer produces the same bytes as EventSerializer and print '
+        'rows/sec for both. Runs in a transaction that is always rolled back.'
+    )
+
+    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=2000, help='Number of events to seed (default 2000)')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per renderer (default 3)')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['events'])
+                self.run_benchmark(max(options['repeat'], 1))
+                raise Rollback
+        except Rollback:
+            self.stdout.write(self.style.WARNING('Rolled back seeded events'))
+
+    def seed(self, count):
+        rng = random.Random(42)
+        users = [
+            User.objects.create_user(f'serializer-bench-{index}', first_name='Bench', last_name=str(index))
+            for index in range(10)
+        ]
+        today = timezone.now().date()
+        events = []
+        for index in range(count):
+            event_date = today + timedelta(days=rng.randint(-365, 365))
+            event = Event(
+                day=self.days[event_date.weekday()],
+                date=event_date,
+                time=time(rng.randint(6, 22), rng.choice([0, 15, 30, 45])),
+                duration=rng.randint(30, 240),
+                place=f'Benchmark Hall {rng.randint(1, 500)}',
+                participant_count=2,
+                created_by=users[0],
+            )
+            event.normalize_fields()
+            events.append(event)
+        events = Event.objects.bulk_create(events, batch_size=1000)
+
+        songs, dress_details, participants = [], [], []
+        for event in events:
+            for order in range(3):
+                songs.append(Song(event=event, title=f'Song {order}', artist='Benchmark', order=order))
+            dress_details.append(DressDetail(event=event, description='White thobe', order=0))
+            for user in rng.sample(users, 2):
+                participants.append(EventParticipant(event=event, user=user))
+        Song.objects.bulk_create(songs, batch_size=1000)
+        DressDetail.objects.bulk_create(dress_details, batch_size=1000)
+        EventParticipant.objects.bulk_create(participants, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(f'Seeded {count} events'))
+
+    def render_serializer(self, queryset):
+        queryset = queryset.select_related('created_by').prefetch_related(
+            'songs', 'dress_details', 'participants__user'
+        )
+        return JSONRenderer().render(EventSerializer(queryset, many=True).data)
+
+    def render_fast(self, queryset):
+        return JSONRenderer().render(FastEventSerializer().serialize_queryset(queryset))
+
+    def time_renderer(self, render, queryset, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = timer.perf_counter()
+            output = render(queryset)
+            timings.append(timer.perf_counter() - started)
+        return output, min(timings)
+
+    def run_benchmark(self, repeat):
+        queryset = Event.objects.order_by('date', 'time', 'id')
+        rows = queryset.count()
+
+        expected, serializer_time = self.time_renderer(self.render_serializer, queryset, repeat)
+        output, fast_time = self.time_renderer(self.render_fast, queryset, repeat)
+        if output != expected:
+            raise CommandError('Fast renderer output differs from EventSerializer')
+        self.stdout.write(self.style.SUCCESS(f'Output is byte-identical ({len(output)} bytes)'))
+
+        for label, elapsed in (('EventSerializer', serializer_time), ('FastEventSerializer', fast_time)):
+            self.stdout.write(f'{label}: {rows / elapsed:,.0f} rows/sec (best of {repeat}, {elapsed * 1000:.1f}ms)')
+        self.stdout.write(f'Speedup: {serializer_time / fast_time:.1f}x')
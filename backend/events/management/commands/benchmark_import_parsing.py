@@ -0,0 +1,83 @@
+import os
+import random
+import time as timer
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from events.import_parsing import parse_rows
+from events.importing import PARSE_BATCH_SIZE, parse_rows_parallel
+
+HEADERS = [
+    'Day', 'Date', 'Time', 'Duration (minutes)', 'Place', 'Number of Participants',
+    'Status', 'Meeting Time', 'Meeting Date', 'Place of Meeting', 'Vehicle',
+    'Camera Man', 'Participation Type', 'Event Reason',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time import row parsing and validation with different process counts '
+        'and print rows/sec for each. Uses generated rows, no database access.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000, help='Rows to parse (default 200000)')
+        parser.add_argument(
+            '--processes', default=None,
+            help='Comma separated process counts (default 1,2,4,... up to the CPU count)'
+        )
+        parser.add_argument('--batch-size', type=int, default=PARSE_BATCH_SIZE, help='Rows per worker batch')
+
+    def handle(self, *args, **options):
+        if options['processes']:
+            counts = [int(count) for count in options['processes'].split(',')]
+        else:
+            counts = [1]
+            while counts[-1] * 2 <= (os.cpu_count() or 1):
+                counts.append(counts[-1] * 2)
+
+        rows = self.generate_rows(options['rows'])
+        columns = {header: index for index, header in enumerate(HEADERS)}
+        expected = None
+        self.stdout.write(f'Parsing {len(rows)} rows, {os.cpu_count()} CPUs available')
+
+        for processes in counts:
+            started = timer.perf_counter()
+            if processes > 1:
+                parsed = list(parse_rows_parallel(rows, columns, processes, options['batch_size']))
+            else:
+                parsed = list(parse_rows(rows, columns))
+            elapsed = timer.perf_counter() - started
+
+            if expected is None:
+                expected = parsed
+            elif parsed != expected:
+                raise CommandError(f'Results with {processes} processes differ from the serial parse')
+            self.stdout.write(f'{processes} process(es): {len(rows) / elapsed:,.0f} rows/sec ({elapsed:.2f}s)')
+
+    def generate_rows(self, count):
+        rng = random.Random(42)
+        start = date.today()
+        statuses = ['pending', 'confirmed', 'completed', 'cancelled', 'Confirmed', 'unknown']
+        rows = []
+        for index in range(count):
+            event_date = start + timedelta(days=rng.randint(-365, 365))
+            values = (
+                event_date.strftime('%A'),
+                event_date.isoformat() if index % 50 else 'not a date',
+                f'{rng.randint(6, 22):02d}:{rng.choice([0, 15, 30, 45]):02d}',
+                str(rng.randint(30, 240)),
+                f'Masjid Hall {rng.randint(1, 500)}',
+                str(rng.randint(1, 60)),
+                rng.choice(statuses),
+                f'{rng.randint(5, 21):02d}:30',
+                event_date.isoformat(),
+                'Main Gate',
+                f'Bus #{rng.randint(1, 99)}',
+                'Ahmed Ali',
+                'Recitation',
+                'Weekly Quran Recitation Session',
+            )
+            rows.append((index + 2, values))
+        return rows
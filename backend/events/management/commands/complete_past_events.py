@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from events.batch import bulk_set_status
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Mark every confirmed event dated before today as completed, for running from cron'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many events would be completed',
+        )
+
+    def handle(self, *args, **options):
+        past = Event.objects.filter(status='confirmed', date__lt=timezone.localdate())
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Dry run, {past.count()} event(s) would be completed'))
+            return
+
+        # One UPDATE, since every matching event leaves the same status
+        completed = bulk_set_status(past, 'completed')
+        self.stdout.write(self.style.SUCCESS(f'Completed {completed} past event(s)'))
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from events.jobs import process_import_job, queued_job_ids, recover_stale_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Process queued event import jobs. Runs until stopped, or drains the '
+        'queue once with --once. Jobs whose worker stopped responding are '
+        'requeued or failed first. Use with EVENT_IMPORT_WORKER=command.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the current queue and exit')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between queue polls (default 2)')
+        parser.add_argument(
+            '--processes', type=int, default=getattr(settings, 'EVENT_IMPORT_PROCESSES', 1),
+            help='Processes used to parse and validate rows (default EVENT_IMPORT_PROCESSES or 1)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            requeued, failed = recover_stale_jobs()
+            if requeued or failed:
+                self.stdout.write(self.style.WARNING(
+                    f'Recovered stale import jobs: {requeued} requeued, {failed} failed'
+                ))
+            for job_id in queued_job_ids():
+                if process_import_job(job_id, processes=options['processes']):
+                    self.stdout.write(f'Processed import job {job_id}')
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from events import sync
+from events.models import EventDeletion
+
+
+class Command(BaseCommand):
+    help = 'Delete event tombstones older than the sync retention window'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - sync.DELETION_RETENTION
+        deleted, _ = EventDeletion.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} event tombstone(s) older than {cutoff:%Y-%m-%d %H:%M}'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from events.models import Event
+from events.search import get_search_engine, index_events
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the event full-text and trigram search indexes from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Events indexed per batch (default 500)')
+
+    def handle(self, *args, **options):
+        engine = get_search_engine()
+        batch_size = max(options['batch_size'], 1)
+        event_ids = list(Event.objects.order_by('pk').values_list('pk', flat=True))
+
+        for start in range(0, len(event_ids), batch_size):
+            index_events(event_ids[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {len(event_ids)} events with {type(engine).__name__}'
+        ))
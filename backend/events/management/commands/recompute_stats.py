@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from events.models import EventStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the dashboard statistics counters from the database and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drift, do not write the rebuilt counters',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stats = EventStats.get_or_create_stats()
+            stats = EventStats.objects.select_for_update().get(pk=stats.pk)
+            actual = stats.compute_stats()
+
+            drift = {
+                field: (getattr(stats, field), value)
+                for field, value in actual.items()
+                if getattr(stats, field) != value
+            }
+
+            if not drift:
+                self.stdout.write(self.style.SUCCESS('Statistics are up to date, no drift found'))
+                return
+
+            for field, (stored, value) in drift.items():
+                self.stdout.write(f'{field}: stored {stored}, actual {value} ({value - stored:+d})')
+
+            if options['dry_run']:
+                self.stdout.write(self.style.WARNING('Dry run, counters were not changed'))
+                return
+
+            for field, value in actual.items():
+                setattr(stats, field, value)
+            stats.save()
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics, corrected {len(drift)} counter(s)'))
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_alter_event_duration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.BigIntegerField(help_text='ID of the deleted event')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Event Deletion',
+                'verbose_name_plural': 'Event Deletions',
+                'db_table': 'event_deletions',
+                'ordering': ['deleted_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['updated_at'], name='events_updated_at_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def add_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE event_search_documents '
+            'ADD FULLTEXT INDEX event_search_documents_content_ft (content)'
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE event_search_documents '
+            'DROP INDEX event_search_documents_content_ft'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_event_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventSearchDocument',
+            fields=[
+                ('event', models.OneToOneField(help_text='Indexed event', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='events.event')),
+                ('content', models.TextField(help_text='Event, song and participant text')),
+            ],
+            options={
+                'verbose_name': 'Event Search Document',
+                'verbose_name_plural': 'Event Search Documents',
+                'db_table': 'event_search_documents',
+            },
+        ),
+        migrations.CreateModel(
+            name='EventSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(help_text='Normalized search token', max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1, help_text='Ranking weight of the token')),
+                ('event', models.ForeignKey(help_text='Indexed event', on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='events.event')),
+            ],
+            options={
+                'verbose_name': 'Event Search Token',
+                'verbose_name_plural': 'Event Search Tokens',
+                'db_table': 'event_search_tokens',
+                'indexes': [models.Index(fields=['token', 'event'], name='event_search_token_idx')],
+                'unique_together': {('event', 'token')},
+            },
+        ),
+        migrations.RunPython(add_fulltext_index, drop_fulltext_index),
+    ]
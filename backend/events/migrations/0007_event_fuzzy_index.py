@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from accounts.normalization import normalize_text, trigrams
+
+NORMALIZED_FIELDS = {
+    'place': 'place_normalized',
+    'place_of_meeting': 'place_of_meeting_normalized',
+    'camera_man': 'camera_man_normalized',
+}
+
+
+def backfill_fuzzy_index(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    EventTrigram = apps.get_model('events', 'EventTrigram')
+    for event in Event.objects.all().iterator():
+        grams = set()
+        for source, target in NORMALIZED_FIELDS.items():
+            normalized = normalize_text(getattr(event, source))
+            setattr(event, target, normalized)
+            grams |= trigrams(normalized)
+        event.save(update_fields=list(NORMALIZED_FIELDS.values()))
+        EventTrigram.objects.bulk_create(EventTrigram(event=event, trigram=trigram) for trigram in grams)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_event_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='camera_man_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='place_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='place_of_meeting_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.CreateModel(
+            name='EventTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('event', models.ForeignKey(help_text='Indexed event', on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='events.event')),
+            ],
+            options={
+                'verbose_name': 'Event Trigram',
+                'verbose_name_plural': 'Event Trigrams',
+                'db_table': 'event_trigrams',
+                'indexes': [models.Index(fields=['trigram', 'event'], name='event_trigram_idx')],
+                'unique_together': {('event', 'trigram')},
+            },
+        ),
+        migrations.RunPython(backfill_fuzzy_index, migrations.RunPython.noop),
+    ]
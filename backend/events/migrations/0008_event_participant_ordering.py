@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:38
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_event_fuzzy_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='eventparticipant',
+            options={'ordering': ['id'], 'verbose_name': 'Event Participant', 'verbose_name_plural': 'Event Participants'},
+        ),
+    ]
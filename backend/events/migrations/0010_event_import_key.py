@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:53
+
+from django.db import migrations, models
+
+from events.import_parsing import IMPORTED_FIELDS, content_hash, import_key
+
+
+def backfill_import_keys(apps, schema_editor):
+    """Key existing events by date + time + place so re-imports update them"""
+    Event = apps.get_model('events', 'Event')
+    seen = set()
+    batch = []
+    for event in Event.objects.order_by('id').iterator():
+        key = import_key(None, event.date, event.time, event.place)
+        # Events sharing a natural key stay unkeyed apart from the oldest one
+        if key in seen:
+            continue
+        seen.add(key)
+        event.import_key = key
+        event.content_hash = content_hash({name: getattr(event, name) for name in IMPORTED_FIELDS})
+        batch.append(event)
+        if len(batch) >= 1000:
+            Event.objects.bulk_update(batch, ['import_key', 'content_hash'])
+            batch = []
+    Event.objects.bulk_update(batch, ['import_key', 'content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_import_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='external_id',
+            field=models.CharField(blank=True, help_text='ID of the event in the scheduler it was imported from', max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='import_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='mode',
+            field=models.CharField(choices=[('create', 'Create'), ('upsert', 'Upsert')], default='create', help_text='Create every row, or insert/update rows by external ID or date, time and place', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='unchanged_rows',
+            field=models.PositiveIntegerField(default=0, help_text='Rows matching an unchanged event (upsert)'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='updated_rows',
+            field=models.PositiveIntegerField(default=0, help_text='Existing events updated so far (upsert)'),
+        ),
+        migrations.RunPython(backfill_import_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:15
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_participants(apps, schema_editor):
+    """Fill the counters of existing events with one UPDATE"""
+    Event = apps.get_model('events', 'Event')
+    EventParticipant = apps.get_model('events', 'EventParticipant')
+    participants = EventParticipant.objects.filter(event=OuterRef('pk')).order_by().values('event')
+    Event.objects.update(
+        participant_count=Coalesce(Subquery(participants.annotate(count=Count('pk')).values('count')), 0),
+        confirmed_count=Coalesce(
+            Subquery(participants.annotate(count=Count('pk', filter=Q(is_confirmed=True))).values('count')), 0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0010_event_import_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='confirmed_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='participant_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_participants, migrations.RunPython.noop),
+    ]
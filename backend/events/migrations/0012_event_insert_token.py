@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0011_event_participant_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='insert_token',
+            field=models.CharField(blank=True, editable=False, max_length=48, null=True),
+        ),
+    ]
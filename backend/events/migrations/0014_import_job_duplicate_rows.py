@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0013_import_job_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='duplicate_rows',
+            field=models.PositiveIntegerField(default=0, help_text='Rows replaced by a later row for the same event (upsert)'),
+        ),
+    ]
@@ -1,6 +1,11 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from accounts.normalization import normalize_text
+
+from .import_parsing import IMPORTED_FIELDS, content_hash, import_key
 
 User = get_user_model()
 
@@ -80,15 +85,135 @@ class Event(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Import bookkeeping: the upsert key (external ID, else date + time + place)
+    # and a hash of the imported values, so unchanged rows can be skipped
+    external_id = models.CharField(
+        max_length=100,
+        blank=True,
+        null=True,
+        help_text="ID of the event in the scheduler it was imported from"
+    )
+    import_key = models.CharField(max_length=64, blank=True, null=True, unique=True, editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    # Tags the rows of a bulk insert until their ids are read back, on backends
+    # (MySQL) whose bulk inserts do not return primary keys
+    insert_token = models.CharField(max_length=48, blank=True, null=True, editable=False)
+    
+    # Normalized copies used by fuzzy (diacritic and hamza insensitive) matching
+    place_normalized = models.CharField(max_length=200, blank=True, default='', editable=False)
+    place_of_meeting_normalized = models.CharField(max_length=200, blank=True, default='', editable=False)
+    camera_man_normalized = models.CharField(max_length=100, blank=True, default='', editable=False)
+    
+    # Roster size, kept by the participant writes so lists need not load the roster
+    participant_count = models.PositiveIntegerField(default=0, editable=False)
+    confirmed_count = models.PositiveIntegerField(default=0, editable=False)
+    
+    NORMALIZED_FIELDS = {
+        'place': 'place_normalized',
+        'place_of_meeting': 'place_of_meeting_normalized',
+        'camera_man': 'camera_man_normalized',
+    }
+    COUNTER_FIELDS = ('participant_count', 'confirmed_count')
+    # Fields the import key is derived from
+    IMPORT_KEY_FIELDS = ('external_id', 'date', 'time', 'place')
+    
     class Meta:
         db_table = 'events'
         verbose_name = 'Event'
         verbose_name_plural = 'Events'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at'], name='events_updated_at_idx'),
+            # Default date/time sort, date range filters, upcoming and past lists
+            models.Index(fields=['date', 'time'], name='events_date_time_idx'),
+            # Status filter combined with the date/time sort
+            models.Index(fields=['status', 'date', 'time'], name='events_status_date_time_idx'),
+            # Events by status, newest first
+            models.Index(fields=['status', 'created_at'], name='events_status_created_idx'),
+            # Default model ordering and sort_by=created
+            models.Index(fields=['created_at'], name='events_created_at_idx'),
+            # sort_by=time
+            models.Index(fields=['time'], name='events_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.day} Event - {self.date} at {self.place}"
     
+    def normalize_fields(self):
+        """Refresh the normalized columns, bulk writes must call this themselves"""
+        for source, target in self.NORMALIZED_FIELDS.items():
+            setattr(self, target, normalize_text(getattr(self, source)))
+    
+    def natural_import_key(self):
+        """The import key this event's external ID, or date, time and place, give it"""
+        event_date = self._meta.get_field('date').to_python(self.date)
+        event_time = self._meta.get_field('time').to_python(self.time)
+        if not self.external_id and (event_date is None or event_time is None or not self.place):
+            return None
+        return import_key(self.external_id, event_date, event_time, self.place)
+    
+    def refresh_import_key(self):
+        """
+        Recompute the import key, so upserts find events however they were
+        written. Like imports, a key another event already holds is left off.
+        """
+        key = self.natural_import_key()
+        if key != self.import_key:
+            taken = key is not None and Event.objects.filter(import_key=key).exclude(pk=self.pk).exists()
+            self.import_key = None if taken else key
+    
+    def refresh_content_hash(self):
+        """
+        Hash the imported fields as an import row would, so an upsert skips
+        the event only while it still holds the values of the row.
+        """
+        self.content_hash = content_hash({
+            name: self._meta.get_field(name).to_python(getattr(self, name)) for name in IMPORTED_FIELDS
+        })
+    
+    def save(self, *args, **kwargs):
+        self.normalize_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & set(self.IMPORT_KEY_FIELDS):
+            self.refresh_import_key()
+        if update_fields is None or set(update_fields) & set(IMPORTED_FIELDS):
+            self.refresh_content_hash()
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {
+                target for source, target in self.NORMALIZED_FIELDS.items() if source in update_fields
+            }
+            if set(update_fields) & set(self.IMPORT_KEY_FIELDS):
+                kwargs['update_fields'].add('import_key')
+            if set(update_fields) & set(IMPORTED_FIELDS):
+                kwargs['update_fields'].add('content_hash')
+        elif not self._state.adding and not kwargs.get('force_insert'):
+            # The counters may have moved since this instance was loaded
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
+    @staticmethod
+    def participant_counts():
+        """update() expressions recounting participant_count and confirmed_count from the roster"""
+        participants = EventParticipant.objects.filter(event=OuterRef('pk')).order_by().values('event')
+        return {
+            'participant_count': Coalesce(
+                Subquery(participants.annotate(count=Count('pk')).values('count')), 0
+            ),
+            'confirmed_count': Coalesce(
+                Subquery(participants.annotate(count=Count('pk', filter=Q(is_confirmed=True))).values('count')), 0
+            ),
+        }
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so saves can update the stats counters by delta
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
     @property
     def is_upcoming(self):
         """Check if event is in the future"""
@@ -180,12 +305,95 @@ class EventParticipant(models.Model):
         db_table = 'event_participants'
         verbose_name = 'Event Participant'
         verbose_name_plural = 'Event Participants'
+        ordering = ['id']
         unique_together = ['event', 'user']
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.event}"
 
 
+class EventDeletion(models.Model):
+    """Tombstones for deleted events, read by the delta sync endpoint"""
+    event_id = models.BigIntegerField(help_text="ID of the deleted event")
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        db_table = 'event_deletions'
+        verbose_name = 'Event Deletion'
+        verbose_name_plural = 'Event Deletions'
+        ordering = ['deleted_at']
+    
+    def __str__(self):
+        return f"Event {self.event_id} deleted at {self.deleted_at}"
+
+
+class EventSearchDocument(models.Model):
+    """Searchable text of an event, FULLTEXT indexed on MySQL"""
+    event = models.OneToOneField(
+        Event,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document',
+        help_text="Indexed event"
+    )
+    content = models.TextField(help_text="Event, song and participant text")
+    
+    class Meta:
+        db_table = 'event_search_documents'
+        verbose_name = 'Event Search Document'
+        verbose_name_plural = 'Event Search Documents'
+    
+    def __str__(self):
+        return f"Search document - {self.event_id}"
+
+
+class EventSearchToken(models.Model):
+    """Inverted token index used for search on databases without FULLTEXT"""
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        related_name='search_tokens',
+        help_text="Indexed event"
+    )
+    token = models.CharField(max_length=64, help_text="Normalized search token")
+    weight = models.PositiveIntegerField(default=1, help_text="Ranking weight of the token")
+    
+    class Meta:
+        db_table = 'event_search_tokens'
+        verbose_name = 'Event Search Token'
+        verbose_name_plural = 'Event Search Tokens'
+        unique_together = ['event', 'token']
+        indexes = [
+            models.Index(fields=['token', 'event'], name='event_search_token_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.token} - {self.event_id}"
+
+
+class EventTrigram(models.Model):
+    """Trigram postings of an event's normalized place, meeting place and camera man"""
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        related_name='trigrams',
+        help_text="Indexed event"
+    )
+    trigram = models.CharField(max_length=3)
+    
+    class Meta:
+        db_table = 'event_trigrams'
+        verbose_name = 'Event Trigram'
+        verbose_name_plural = 'Event Trigrams'
+        unique_together = ['event', 'trigram']
+        indexes = [
+            models.Index(fields=['trigram', 'event'], name='event_trigram_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.trigram} - {self.event_id}"
+
+
 class EventStats(models.Model):
     """Event statistics for dashboard"""
     total_events = models.PositiveIntegerField(default=0)
@@ -218,13 +426,38 @@ class EventStats(models.Model):
                 'total_users': 0,
             }
         )
+        if created:
+            # Counters are maintained by delta from here on
+            stats.update_stats()
         return stats
     
-    def update_stats(self):
-        """Update statistics from actual data"""
+    @classmethod
+    def status_counter(cls, status):
+        """Name of the counter field tracking events with `status`"""
+        if status in dict(Event.STATUS_CHOICES):
+            return f'{status}_events'
+        return None
+    
+    @classmethod
+    def apply_delta(cls, deltas):
+        """Adjust counters in place, e.g. apply_delta({'total_events': 1})"""
+        deltas = {field: delta for field, delta in deltas.items() if field and delta}
+        if not deltas:
+            return
+        from django.utils import timezone
+        
+        updates = {
+            field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()
+        }
+        updates['updated_at'] = timezone.now()
+        if not cls.objects.filter(pk=1).update(**updates):
+            # First write ever: build the row from real data instead
+            cls.get_or_create_stats()
+    
+    def compute_stats(self):
+        """Count statistics from actual data without saving them"""
         from django.db.models import Count, Q
         
-        # Update event counts
         event_counts = Event.objects.aggregate(
             total=Count('id'),
             pending=Count('id', filter=Q(status='pending')),
@@ -233,13 +466,74 @@ class EventStats(models.Model):
             cancelled=Count('id', filter=Q(status='cancelled')),
         )
         
-        self.total_events = event_counts['total']
-        self.pending_events = event_counts['pending']
-        self.confirmed_events = event_counts['confirmed']
-        self.completed_events = event_counts['completed']
-        self.cancelled_events = event_counts['cancelled']
-        
-        # Update user count
-        self.total_users = User.objects.count()
+        return {
+            'total_events': event_counts['total'],
+            'pending_events': event_counts['pending'],
+            'confirmed_events': event_counts['confirmed'],
+            'completed_events': event_counts['completed'],
+            'cancelled_events': event_counts['cancelled'],
+            'total_users': User.objects.count(),
+        }
+    
+    def update_stats(self):
+        """Rebuild statistics from actual data"""
+        for field, value in self.compute_stats().items():
+            setattr(self, field, value)
         
-        self.save()
\ No newline at end of file
+        self.save()
+
+
+class ImportJob(models.Model):
+    """An uploaded event import, processed in the background"""
+    MODE_CHOICES = [
+        ('create', 'Create'),
+        ('upsert', 'Upsert'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    file = models.FileField(upload_to='imports/', help_text="Uploaded import file")
+    original_name = models.CharField(max_length=255, help_text="Name of the uploaded file")
+    mode = models.CharField(
+        max_length=10,
+        choices=MODE_CHOICES,
+        default='create',
+        help_text="Create every row, or insert/update rows by external ID or date, time and place"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0, help_text="Rows imported so far")
+    updated_rows = models.PositiveIntegerField(default=0, help_text="Existing events updated so far (upsert)")
+    unchanged_rows = models.PositiveIntegerField(default=0, help_text="Rows matching an unchanged event (upsert)")
+    duplicate_rows = models.PositiveIntegerField(
+        default=0, help_text="Rows replaced by a later row for the same event (upsert)"
+    )
+    failed_rows = models.PositiveIntegerField(default=0, help_text="Rows rejected so far")
+    errors = models.JSONField(default=list, blank=True, help_text="First row errors")
+    message = models.TextField(blank=True, default='')
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='import_jobs',
+        help_text="User who uploaded the file"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Lease of the worker running the job: its token, and when it last reported progress
+    lease_token = models.CharField(max_length=32, blank=True, null=True, editable=False)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0, help_text="Times a worker has claimed the job")
+    
+    class Meta:
+        db_table = 'event_import_jobs'
+        verbose_name = 'Import Job'
+        verbose_name_plural = 'Import Jobs'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Import {self.original_name} ({self.status})"
@@ -0,0 +1,169 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def get_ordering(queryset):
+    """Return the queryset ordering as a tuple, always ending in a unique key"""
+    ordering = tuple(queryset.query.order_by) or tuple(queryset.model._meta.ordering)
+    if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+        descending = ordering[-1].startswith('-') if ordering else False
+        ordering += ('-id' if descending else 'id',)
+    return ordering
+
+
+def ordering_fields(queryset, ordering):
+    """The model field (or annotation output field) behind each sort key"""
+    fields = []
+    for field in ordering:
+        name = field.lstrip('-')
+        if name in queryset.query.annotations:
+            fields.append(queryset.query.annotations[name].output_field)
+            continue
+        model = queryset.model
+        for part in ('id' if name == 'pk' else name).split('__'):
+            target = model._meta.get_field(part)
+            model = target.related_model
+        fields.append(target)
+    return fields
+
+
+def keyset_filter(ordering, values):
+    """Build a Q object matching rows that sort strictly after `values`"""
+    condition = Q()
+    for index, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        clause = Q(**{f'{name}__{lookup}': values[index]})
+        for previous, value in zip(ordering[:index], values[:index]):
+            clause &= Q(**{previous.lstrip('-'): value})
+        condition |= clause
+    return condition
+
+
+def keyset_values(obj, ordering):
+    """Read the sort key of `obj` (a model instance or values() row) as JSON friendly values"""
+    values = []
+    for field in ordering:
+        name = field.lstrip('-')
+        if isinstance(obj, dict):
+            value = obj['id' if name == 'pk' else name]
+        else:
+            value = getattr(obj, name)
+        values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+    return values
+
+
+def iter_keyset_batches(queryset, batch_size=500):
+    """Yield the whole queryset in batches using keyset pagination"""
+    ordering = get_ordering(queryset)
+    queryset = queryset.order_by(*ordering)
+    values = None
+    while True:
+        batch_queryset = queryset
+        if values is not None:
+            batch_queryset = batch_queryset.filter(keyset_filter(ordering, values))
+        batch = list(batch_queryset[:batch_size])
+        if not batch:
+            return
+        yield batch
+        if len(batch) < batch_size:
+            return
+        values = keyset_values(batch[-1], ordering)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the full sort tuple of the queryset.
+
+    Unlike offset pagination each page is a single indexed range scan, so
+    walking every page costs time linear in the number of rows.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = get_ordering(queryset)
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        values = self.decode_cursor(request, queryset)
+        if values is not None:
+            queryset = queryset.filter(keyset_filter(self.ordering, values))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            ordering, values = payload['o'], payload['v']
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound('Invalid cursor')
+        if ordering != list(self.ordering) or not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound('Cursor does not match the requested sort order')
+        
+        # Cursors come from the client, so each value must parse as its sort field
+        try:
+            values = [
+                field.to_python(value)
+                for field, value in zip(ordering_fields(queryset, self.ordering), values)
+            ]
+        except (ValidationError, AttributeError, TypeError, ValueError, FieldDoesNotExist):
+            raise NotFound('Invalid cursor')
+        if any(value is None for value in values):
+            raise NotFound('Invalid cursor')
+        return values
+
+    def encode_cursor(self, values):
+        payload = json.dumps({'o': list(self.ordering), 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        cursor = self.encode_cursor(keyset_values(self.page[-1], self.ordering))
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,218 @@
+"""
+Full-text search over events.
+
+MySQL answers queries from a FULLTEXT index on one document per event.
+Other databases use an inverted token table kept in step on save. Both
+index the event's own text plus its song titles and participant names, and
+both return an Event queryset annotated with `search_rank`.
+"""
+import re
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import (
+    Case, Expression, F, FloatField, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When,
+)
+
+from accounts.normalization import normalize_text
+
+from .fuzzy import index_event_trigrams
+from .models import Event, EventParticipant, EventSearchDocument, EventSearchToken, Song
+
+TOKEN_PATTERN = re.compile(r'\w+')
+MAX_TOKEN_LENGTH = 64
+MAX_QUERY_TERMS = 8
+
+# Ranking weight of each indexed source
+FIELD_WEIGHTS = (
+    ('place', 5),
+    ('participation_type', 3),
+    ('camera_man', 3),
+    ('place_of_meeting', 2),
+    ('event_reason', 2),
+    ('day', 1),
+    ('vehicle', 1),
+)
+SONG_WEIGHT = 2
+PARTICIPANT_WEIGHT = 3
+
+# InnoDB leaves words shorter than innodb_ft_min_token_size, and its default
+# stopwords, out of the FULLTEXT index, so they can never be required terms
+FULLTEXT_MIN_TOKEN_SIZE = 3
+FULLTEXT_STOPWORDS = frozenset((
+    'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en', 'for', 'from', 'how',
+    'i', 'in', 'is', 'it', 'la', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'what',
+    'when', 'where', 'who', 'will', 'with', 'und', 'www',
+))
+
+
+def tokenize(text):
+    """Split text into normalized (case, diacritic and hamza folded) word tokens"""
+    return [token[:MAX_TOKEN_LENGTH] for token in TOKEN_PATTERN.findall(normalize_text(text))]
+
+
+def query_terms(query):
+    """Distinct search terms of a user query, in order"""
+    terms = []
+    for token in tokenize(query):
+        if token not in terms:
+            terms.append(token)
+    return terms[:MAX_QUERY_TERMS]
+
+
+def collect_texts(event_ids):
+    """Map each event id to its (text, weight) pairs in three queries"""
+    texts = defaultdict(list)
+    field_names = [name for name, _ in FIELD_WEIGHTS]
+    for row in Event.objects.filter(pk__in=event_ids).values('pk', *field_names):
+        texts[row['pk']].extend((row[name], weight) for name, weight in FIELD_WEIGHTS)
+    for event_id, title in Song.objects.filter(event_id__in=event_ids).values_list('event_id', 'title'):
+        texts[event_id].append((title, SONG_WEIGHT))
+    participants = EventParticipant.objects.filter(event_id__in=event_ids).values_list(
+        'event_id', 'user__first_name', 'user__last_name'
+    )
+    for event_id, first_name, last_name in participants:
+        texts[event_id].append((f'{first_name} {last_name}', PARTICIPANT_WEIGHT))
+    return texts
+
+
+def boolean_query(terms):
+    """
+    MySQL boolean mode query requiring every indexable term, each as a
+    prefix. Returns None when no term is indexable.
+    """
+    indexable = [
+        term for term in terms
+        if len(term) >= FULLTEXT_MIN_TOKEN_SIZE and term not in FULLTEXT_STOPWORDS
+    ]
+    if not indexable:
+        return None
+    return ' '.join(f'+{term}*' for term in indexable)
+
+
+class MatchAgainst(Expression):
+    """MySQL relevance of a boolean mode FULLTEXT match"""
+    output_field = FloatField()
+
+    def __init__(self, expression, query):
+        super().__init__()
+        self.expression = expression
+        self.query = query
+
+    def get_source_expressions(self):
+        return [self.expression]
+
+    def set_source_expressions(self, exprs):
+        self.expression, = exprs
+
+    def as_sql(self, compiler, connection):
+        sql, params = compiler.compile(self.expression)
+        return f'MATCH ({sql}) AGAINST (%s IN BOOLEAN MODE)', [*params, self.query]
+
+
+class FulltextSearchEngine:
+    """Search backed by a MySQL FULLTEXT index"""
+
+    def index(self, event_ids):
+        texts = collect_texts(event_ids)
+        documents = [
+            EventSearchDocument(
+                event_id=event_id,
+                content='\n'.join(normalize_text(text) for text, _ in pairs if text),
+            )
+            for event_id, pairs in texts.items()
+        ]
+        with transaction.atomic():
+            EventSearchDocument.objects.filter(event_id__in=event_ids).delete()
+            EventSearchDocument.objects.bulk_create(documents)
+
+    def search(self, queryset, query):
+        terms = query_terms(query)
+        if not terms:
+            return queryset.none()
+        match = boolean_query(terms)
+        if match is None:
+            # Only short words or stopwords, which the index cannot answer: scan the documents
+            condition = Q()
+            for term in terms:
+                condition &= Q(search_document__content__contains=term)
+            return queryset.filter(condition).annotate(search_rank=Value(1.0, output_field=FloatField()))
+        return queryset.annotate(
+            search_rank=MatchAgainst(F('search_document__content'), match)
+        ).filter(search_rank__gt=0)
+
+
+class TokenSearchEngine:
+    """Search backed by the event_search_tokens inverted index"""
+
+    def index(self, event_ids):
+        texts = collect_texts(event_ids)
+        tokens = []
+        for event_id, pairs in texts.items():
+            weights = defaultdict(int)
+            for text, weight in pairs:
+                for token in tokenize(text):
+                    weights[token] += weight
+            tokens.extend(
+                EventSearchToken(event_id=event_id, token=token, weight=weight)
+                for token, weight in weights.items()
+            )
+        with transaction.atomic():
+            EventSearchToken.objects.filter(event_id__in=event_ids).delete()
+            EventSearchToken.objects.bulk_create(tokens, batch_size=1000)
+
+    def term_condition(self, term, prefix):
+        if prefix:
+            # Range rather than LIKE so every backend can use the token index
+            return Q(token__gte=term, token__lt=term + '\U0010ffff')
+        return Q(token=term)
+
+    def search(self, queryset, query):
+        terms = query_terms(query)
+        if not terms:
+            return queryset.none()
+
+        # The last term is still being typed, so it matches as a prefix
+        conditions = [
+            self.term_condition(term, prefix=index == len(terms) - 1)
+            for index, term in enumerate(terms)
+        ]
+        any_term = Q()
+        for condition in conditions:
+            any_term |= condition
+
+        matched = {
+            f'term_{index}': Max(Case(When(condition, then=1), default=0, output_field=IntegerField()))
+            for index, condition in enumerate(conditions)
+        }
+        ranked = (
+            EventSearchToken.objects.filter(any_term)
+            .values('event_id')
+            .annotate(rank=Sum('weight'), **matched)
+            .filter(**{name: 1 for name in matched})
+        )
+        return queryset.filter(pk__in=ranked.values('event_id')).annotate(
+            search_rank=Subquery(
+                ranked.filter(event_id=OuterRef('pk')).values('rank')[:1],
+                output_field=FloatField(),
+            )
+        )
+
+
+def get_search_engine():
+    if connection.vendor == 'mysql':
+        return FulltextSearchEngine()
+    return TokenSearchEngine()
+
+
+def index_events(event_ids):
+    """(Re)index the given events, call after bulk writes that skip signals"""
+    event_ids = list(event_ids)
+    if event_ids:
+        get_search_engine().index(event_ids)
+        index_event_trigrams(event_ids)
+
+
+def search_events(queryset, query):
+    """Filter `queryset` to events matching `query`, annotated with `search_rank`"""
+    return get_search_engine().search(queryset, query)
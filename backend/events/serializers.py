@@ -1,9 +1,17 @@
+from collections import defaultdict
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Event, Song, EventParticipant, EventStats, DressDetail
+from django.db import transaction
+from .models import Event, Song, EventParticipant, EventStats, DressDetail, ImportJob
+from .search import index_events
+from .signals import bulk_event_writes
 
 User = get_user_model()
 
+SONG_FIELDS = ('title', 'artist', 'duration')
+DRESS_DETAIL_FIELDS = ('description',)
+
 
 class SongSerializer(serializers.ModelSerializer):
     """Serializer for songs"""
@@ -49,9 +57,10 @@ class EventSerializer(serializers.ModelSerializer):
         model = Event
         fields = (
             'id', 'day', 'date', 'time', 'duration', 'place', 'number_of_participants',
-            'status', 'meeting_time', 'meeting_date', 'place_of_meeting', 'vehicle',
-            'camera_man', 'participation_type', 'event_reason', 'created_by', 'created_by_name',
-            'created_at', 'updated_at', 'songs', 'dress_details', 'participants', 'is_upcoming', 'is_past'
+            'participant_count', 'confirmed_count', 'status', 'meeting_time', 'meeting_date',
+            'place_of_meeting', 'vehicle', 'camera_man', 'participation_type', 'event_reason',
+            'created_by', 'created_by_name', 'created_at', 'updated_at', 'songs', 'dress_details',
+            'participants', 'is_upcoming', 'is_past'
         )
         read_only_fields = ('id', 'created_at', 'updated_at', 'created_by')
     
@@ -91,74 +100,172 @@ class EventCreateSerializer(serializers.ModelSerializer):
         )
     
     def create(self, validated_data):
-        print("EventCreateSerializer - Starting")
-        print("validated_data keys:", list(validated_data.keys()))
+        songs_data = validated_data.pop('songs_data', [])
+        dress_details_data = validated_data.pop('dress_details_data', [])
+        participants_data = validated_data.pop('participants_data', [])
         
-        try:
-            songs_data = validated_data.pop('songs_data', [])
-            dress_details_data = validated_data.pop('dress_details_data', [])
-            participants_data = validated_data.pop('participants_data', [])
-            
-            print("songs_data count:", len(songs_data))
-            print("dress_details_data count:", len(dress_details_data))
-            print("participants_data:", participants_data)
-            
-            # Set the created_by field from the request user
-            validated_data['created_by'] = self.context['request'].user
-            print("created_by set to:", validated_data['created_by'].username)
-            
-            print("Creating Event object...")
-            event = Event.objects.create(**validated_data)
-            print("Event created successfully with ID:", event.id)
-            
-            # Create songs
-            print("Creating songs...")
-            for i, song_data in enumerate(songs_data, 1):
-                Song.objects.create(
-                    event=event,
-                    title=song_data.get('title', ''),
-                    artist=song_data.get('artist', ''),
-                    duration=song_data.get('duration'),
-                    order=i
-                )
-            print("Songs created successfully")
-            
-            # Create dress details
-            print("Creating dress details...")
-            for i, dress_detail in enumerate(dress_details_data, 1):
-                if dress_detail.strip():  # Only create if not empty
-                    DressDetail.objects.create(
-                        event=event,
-                        description=dress_detail,
-                        order=i
-                    )
-            print("Dress details created successfully")
+        # Set the created_by field from the request user
+        validated_data['created_by'] = self.context['request'].user
+        
+        # Unknown user ids are skipped
+        users = User.objects.in_bulk(participants_data)
+        participant_ids = [user_id for user_id in dict.fromkeys(participants_data) if user_id in users]
+        
+        with transaction.atomic():
+            event = Event.objects.create(participant_count=len(participant_ids), **validated_data)
             
-            # Create participants
-            print("Creating participants...")
-            for user_id in participants_data:
-                try:
-                    user = User.objects.get(id=user_id)
-                    EventParticipant.objects.create(
-                        event=event,
-                        user=user,
-                        is_confirmed=False
-                    )
-                    print("Participant", user_id, "added successfully")
-                except User.DoesNotExist:
-                    print("User", user_id, "not found, skipping")
-                    continue
-            print("Participants created successfully")
+            Song.objects.bulk_create([
+                Song(event=event, order=order, **values) for order, values in song_items(songs_data)
+            ])
+            DressDetail.objects.bulk_create([
+                DressDetail(event=event, order=order, **values)
+                for order, values in dress_detail_items(dress_details_data)
+            ])
             
-            print("Event creation completed successfully")
-            return event
+            EventParticipant.objects.bulk_create([
+                EventParticipant(event=event, user=users[user_id], is_confirmed=False)
+                for user_id in participant_ids
+            ])
             
-        except Exception as e:
-            print(f"Error in EventCreateSerializer.create: {str(e)}")
-            print(f"Error type: {type(e)}")
-            import traceback
-            print(f"Traceback: {traceback.format_exc()}")
-            raise
+            # bulk_create skips the child save() signals; the event's own post_save
+            # indexed it before its songs and participants existed
+            if songs_data or participants_data:
+                index_events([event.pk])
+        
+        return event
+
+
+def delete_children(model, children):
+    """
+    Delete child rows with one bulk delete. Their per-row signals skip the
+    event touch, reindex and cache bump, so callers save the event afterwards.
+    """
+    with bulk_event_writes():
+        model.objects.filter(pk__in=[child.pk for child in children]).delete()
+
+
+def song_items(songs_data):
+    """(order, values) pairs for a songs_data list"""
+    return [
+        (i, {
+            'title': song_data.get('title', ''),
+            'artist': song_data.get('artist', ''),
+            'duration': song_data.get('duration'),
+        })
+        for i, song_data in enumerate(songs_data, 1)
+    ]
+
+
+def dress_detail_items(dress_details_data):
+    """(order, values) pairs for a dress_details_data list, skipping empty entries"""
+    return [
+        (i, {'description': dress_detail})
+        for i, dress_detail in enumerate(dress_details_data, 1)
+        if dress_detail.strip()
+    ]
+
+
+def sync_ordered_children(model, fields, wanted):
+    """
+    Make the songs or dress details of several events match `wanted`,
+    {event id: [(order, values), ...]}. Rows whose values are still wanted
+    are kept, and moved if their order changed; other rows are rewritten in
+    place, and only what remains is created or deleted. Every table write
+    covers all the events at once. Returns the ids of the events that changed.
+    """
+    existing = defaultdict(list)
+    for child in model.objects.filter(event_id__in=wanted).order_by('event_id', 'order'):
+        existing[child.event_id].append(child)
+    
+    changed, parked, created, removed = [], [], [], []
+    changed_events = set()
+    for event_id, items in wanted.items():
+        children = existing[event_id]
+        original_orders = {child.pk: child.order for child in children}
+        unused = defaultdict(list)
+        for child in children:
+            unused[tuple(getattr(child, field) for field in fields)].append(child)
+        
+        event_changed, unmatched = [], []
+        for order, values in items:
+            candidates = unused.get(tuple(values[field] for field in fields))
+            if candidates:
+                # Prefer the row already at this position
+                child = next((child for child in candidates if child.order == order), candidates[0])
+                candidates.remove(child)
+                if child.order != order:
+                    child.order = order
+                    event_changed.append(child)
+            else:
+                unmatched.append((order, values))
+        
+        leftovers = sorted((child for group in unused.values() for child in group), key=lambda child: child.order)
+        for order, values in unmatched:
+            if leftovers:
+                child = leftovers.pop(0)
+                child.order = order
+                for field, value in values.items():
+                    setattr(child, field, value)
+                event_changed.append(child)
+            else:
+                created.append(model(event_id=event_id, order=order, **values))
+                changed_events.add(event_id)
+        
+        # (event, order) is unique, so moved rows are parked past every order in use first
+        offset = max([*original_orders.values(), len(items)]) + 1
+        moved = [child for child in event_changed if child.order != original_orders[child.pk]]
+        parked.extend(model(pk=child.pk, order=offset + i) for i, child in enumerate(moved))
+        changed.extend(event_changed)
+        removed.extend(leftovers)
+        if event_changed or leftovers:
+            changed_events.add(event_id)
+    
+    if removed:
+        delete_children(model, removed)
+    if parked:
+        model.objects.bulk_update(parked, ['order'])
+    if changed:
+        model.objects.bulk_update(changed, ['order', *fields])
+    if created:
+        model.objects.bulk_create(created)
+    return changed_events
+
+
+def sync_participants(wanted):
+    """
+    Make the participants of several events the given users, with `wanted`
+    as {event id: user ids}. Staying participants keep their row, joined_at
+    and confirmation, and new user ids are resolved in one in_bulk query.
+    Returns the ids of the events that changed.
+    """
+    wanted = {event_id: dict.fromkeys(user_ids) for event_id, user_ids in wanted.items()}
+    existing = defaultdict(set)
+    removed = []
+    for participant in EventParticipant.objects.filter(event_id__in=wanted).only('pk', 'event_id', 'user_id'):
+        existing[participant.event_id].add(participant.user_id)
+        if participant.user_id not in wanted[participant.event_id]:
+            removed.append(participant)
+    
+    # Unknown user ids are skipped
+    users = User.objects.in_bulk({
+        user_id
+        for event_id, user_ids in wanted.items()
+        for user_id in user_ids if user_id not in existing[event_id]
+    })
+    created = [
+        EventParticipant(event_id=event_id, user=users[user_id], is_confirmed=False)
+        for event_id, user_ids in wanted.items()
+        for user_id in user_ids if user_id in users and user_id not in existing[event_id]
+    ]
+    
+    if removed:
+        delete_children(EventParticipant, removed)
+    if created:
+        EventParticipant.objects.bulk_create(created)
+    changed = {participant.event_id for participant in removed + created}
+    if changed:
+        Event.objects.filter(pk__in=changed).update(**Event.participant_counts())
+    return changed
 
 
 class EventUpdateSerializer(serializers.ModelSerializer):
@@ -193,56 +300,27 @@ class EventUpdateSerializer(serializers.ModelSerializer):
         dress_details_data = validated_data.pop('dress_details_data', None)
         participants_data = validated_data.pop('participants_data', None)
         
-        # Update event
-        event = super().update(instance, validated_data)
-        
-        # Update songs if provided
-        if songs_data is not None:
-            # Delete existing songs
-            event.songs.all().delete()
-            
-            # Create new songs
-            for i, song_data in enumerate(songs_data, 1):
-                Song.objects.create(
-                    event=event,
-                    title=song_data.get('title', ''),
-                    artist=song_data.get('artist', ''),
-                    duration=song_data.get('duration'),
-                    order=i
+        with transaction.atomic():
+            changed_events = set()
+            if songs_data is not None:
+                changed_events |= sync_ordered_children(
+                    Song, SONG_FIELDS, {instance.pk: song_items(songs_data)}
                 )
-        
-        # Update dress details if provided
-        if dress_details_data is not None:
-            # Delete existing dress details
-            event.dress_details.all().delete()
-            
-            # Create new dress details
-            for i, dress_detail in enumerate(dress_details_data, 1):
-                if dress_detail.strip():  # Only create if not empty
-                    DressDetail.objects.create(
-                        event=event,
-                        description=dress_detail,
-                        order=i
-                    )
-        
-        # Update participants if provided
-        if participants_data is not None:
-            # Delete existing participants
-            event.participants.all().delete()
+            if dress_details_data is not None:
+                changed_events |= sync_ordered_children(
+                    DressDetail, DRESS_DETAIL_FIELDS, {instance.pk: dress_detail_items(dress_details_data)}
+                )
+            if participants_data is not None:
+                changed_events |= sync_participants({instance.pk: participants_data})
             
-            # Create new participants
-            for user_id in participants_data:
-                try:
-                    user = User.objects.get(id=user_id)
-                    EventParticipant.objects.create(
-                        event=event,
-                        user=user,
-                        is_confirmed=False
-                    )
-                except User.DoesNotExist:
-                    continue
+            # Saving the event moves its updated_at, reindexes it and invalidates
+            # cached responses, for the child rows written above as well
+            if changed_events or any(
+                getattr(instance, field) != value for field, value in validated_data.items()
+            ):
+                instance = super().update(instance, validated_data)
         
-        return event
+        return instance
 
 
 class EventStatsSerializer(serializers.ModelSerializer):
@@ -256,6 +334,17 @@ class EventStatsSerializer(serializers.ModelSerializer):
         read_only_fields = ('updated_at',)
 
 
+class ImportJobSerializer(serializers.ModelSerializer):
+    """Serializer for background import jobs"""
+    class Meta:
+        model = ImportJob
+        fields = (
+            'id', 'original_name', 'mode', 'status', 'total_rows', 'processed_rows', 'updated_rows',
+            'unchanged_rows', 'duplicate_rows', 'failed_rows', 'errors', 'message', 'created_at', 'started_at', 'finished_at'
+        )
+        read_only_fields = fields
+
+
 class DashboardSerializer(serializers.Serializer):
     """Serializer for dashboard data"""
     stats = EventStatsSerializer()
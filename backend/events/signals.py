@@ -0,0 +1,147 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import schedule_bump
+from .search import index_events
+from .models import Event, Song, DressDetail, EventParticipant, EventStats, EventDeletion
+
+
+_bulk_writes = ContextVar('bulk_event_writes', default=False)
+
+
+@contextmanager
+def bulk_event_writes():
+    """
+    Skip the per-row stats, tombstone and cache work of event deletes, and
+    the touch and reindex of the parent event by child writes, inside the
+    block; the caller applies it once for all rows instead.
+    """
+    token = _bulk_writes.set(True)
+    try:
+        yield
+    finally:
+        _bulk_writes.reset(token)
+
+
+def is_cascade_from_event(origin):
+    return isinstance(origin, Event) or getattr(origin, 'model', None) is Event
+
+
+@receiver(post_save, sender=Event)
+def event_saved(sender, instance, created, raw=False, **kwargs):
+    """Keep the event counters in step with inserts and status changes"""
+    if raw:
+        return
+    previous_status = getattr(instance, '_loaded_status', None)
+    if created:
+        EventStats.apply_delta({
+            'total_events': 1,
+            EventStats.status_counter(instance.status): 1,
+        })
+    elif previous_status is not None and previous_status != instance.status:
+        EventStats.apply_delta({
+            EventStats.status_counter(previous_status): -1,
+            EventStats.status_counter(instance.status): 1,
+        })
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Event)
+def event_deleted(sender, instance, **kwargs):
+    if _bulk_writes.get():
+        return
+    status = getattr(instance, '_loaded_status', None) or instance.status
+    EventStats.apply_delta({
+        'total_events': -1,
+        EventStats.status_counter(status): -1,
+    })
+
+
+@receiver(post_delete, sender=Event)
+def record_event_deletion(sender, instance, **kwargs):
+    """Leave a tombstone for clients syncing through /events/changes/"""
+    if _bulk_writes.get():
+        return
+    EventDeletion.objects.create(event_id=instance.pk)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        EventStats.apply_delta({'total_users': 1})
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleted(sender, instance, **kwargs):
+    EventStats.apply_delta({'total_users': -1})
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=Song)
+@receiver(post_delete, sender=Song)
+@receiver(post_save, sender=DressDetail)
+@receiver(post_delete, sender=DressDetail)
+@receiver(post_save, sender=EventParticipant)
+@receiver(post_delete, sender=EventParticipant)
+def invalidate_event_cache(sender, raw=False, **kwargs):
+    """Any write to event data invalidates the cached event responses"""
+    if not raw and not _bulk_writes.get():
+        schedule_bump()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_event_cache_for_user(sender, raw=False, update_fields=None, **kwargs):
+    """User names and counts are embedded in event and dashboard responses"""
+    if raw or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    schedule_bump()
+
+
+@receiver(post_save, sender=Song)
+@receiver(post_delete, sender=Song)
+@receiver(post_save, sender=DressDetail)
+@receiver(post_delete, sender=DressDetail)
+@receiver(post_save, sender=EventParticipant)
+@receiver(post_delete, sender=EventParticipant)
+def touch_parent_event(sender, instance, raw=False, origin=None, **kwargs):
+    """Child writes move their event's updated_at so ETags and syncs see them"""
+    if raw or _bulk_writes.get() or is_cascade_from_event(origin):
+        # Skip children removed by a cascade from their own event
+        return
+    updates = {'updated_at': timezone.now()}
+    if sender is EventParticipant:
+        updates.update(Event.participant_counts())
+    Event.objects.filter(pk=instance.event_id).update(**updates)
+
+
+@receiver(post_save, sender=Event)
+def index_saved_event(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_events([instance.pk])
+
+
+@receiver(post_save, sender=Song)
+@receiver(post_delete, sender=Song)
+@receiver(post_save, sender=EventParticipant)
+@receiver(post_delete, sender=EventParticipant)
+def index_parent_event(sender, instance, raw=False, origin=None, **kwargs):
+    """Song titles and participant names are part of the event's search text"""
+    if raw or _bulk_writes.get() or is_cascade_from_event(origin):
+        return
+    index_events([instance.event_id])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def index_participant_events(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if created or raw or (update_fields and not {'first_name', 'last_name'} & set(update_fields)):
+        return
+    index_events(
+        EventParticipant.objects.filter(user=instance).values_list('event_id', flat=True)
+    )
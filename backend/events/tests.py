@@ -1,3 +1,1355 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import subprocess
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .batch import bulk_set_status
+from .exporting import TEMPLATE_HEADERS, TEMPLATE_SAMPLE_ROWS, excel_value
+from .fast_serializers import FastEventSerializer
+from .fuzzy import similar_events
+from .import_parsing import import_key, parse_rows
+from .importing import (
+    EventImporter, ImportFileError, bulk_insert_events, detect_import_format, open_csv_rows, open_excel_rows,
+    parse_rows_parallel,
+)
+from .jobs import IMPORT_LEASE, LeaseLost, claim_job, recover_stale_jobs, save_progress
+from .models import DressDetail, Event, EventParticipant, EventStats, ImportJob, Song
+from .search import boolean_query, search_events
+from .serializers import EventCreateSerializer, EventSerializer, EventUpdateSerializer
+
+User = get_user_model()
+
+# Test databases are rolled back, and so never bump the events generation, so
+# tests must not read responses cached by the configured (file) backend
+TEST_CACHE_SETTINGS = override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    EVENT_RESPONSE_CACHE=False,
+)
+
+
+def setUpModule():
+    TEST_CACHE_SETTINGS.enable()
+
+
+def tearDownModule():
+    TEST_CACHE_SETTINGS.disable()
+
+
+EVENT_DEFAULTS = {
+    'day': 'Friday', 'date': '2030-03-01', 'time': '20:00', 'duration': 90,
+    'place': 'Masjid', 'number_of_participants': 1,
+}
+
+
+def build_event(**overrides):
+    return Event(**{**EVENT_DEFAULTS, **overrides})
+
+
+def make_event(**overrides):
+    return Event.objects.create(**{**EVENT_DEFAULTS, **overrides})
+
+
+def workbook_file(sheets):
+    """An uploaded .xlsx file with a sheet of rows per {title: rows} entry"""
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in sheets.items():
+        sheet = workbook.create_sheet(title)
+        for row in rows:
+            sheet.append(row)
+    content = BytesIO()
+    workbook.save(content)
+    content.seek(0)
+    content.name = 'events.xlsx'
+    return content
+
+
+@contextmanager
+def concurrent_event_insert(created_by):
+    """
+    Make event bulk inserts return no ids, as on MySQL, with another
+    session's row landing between each insert and its id lookup.
+    """
+    bulk_create = Event.objects.bulk_create
+
+    def insert_with_concurrent_row(events, *args, **kwargs):
+        created = bulk_create(events, *args, **kwargs)
+        bulk_create([build_event(place='Other session', created_by=created_by)])
+        return created
+
+    with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False), \
+            mock.patch.object(Event.objects, 'bulk_create', side_effect=insert_with_concurrent_row):
+        yield
+
+
+class EventStatsTests(TestCase):
+    """Signals keep the dashboard counters in step, recompute_stats finds drift"""
+
+    COUNTERS = ('total_events', 'pending_events', 'confirmed_events')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+        # The stats row exists before the writes under test
+        EventStats.get_or_create_stats()
+
+    def counters(self):
+        return EventStats.objects.values_list(*self.COUNTERS).get()
+
+    def assertMoved(self, before, deltas):
+        self.assertEqual(self.counters(), tuple(value + delta for value, delta in zip(before, deltas)))
+
+    def test_writes_move_each_counter_by_one(self):
+        before = self.counters()
+        event = make_event(created_by=self.user)
+        self.assertMoved(before, (1, 1, 0))
+
+        before = self.counters()
+        event.status = 'confirmed'
+        event.save()
+        self.assertMoved(before, (0, -1, 1))
+
+        before = self.counters()
+        event.save()
+        self.assertMoved(before, (0, 0, 0))
+
+        before = self.counters()
+        event.delete()
+        self.assertMoved(before, (-1, 0, -1))
+
+    def test_dry_run_reports_drift_without_fixing_it(self):
+        make_event(created_by=self.user)
+        EventStats.objects.update(total_events=7)
+
+        out = StringIO()
+        call_command('recompute_stats', '--dry-run', stdout=out)
+        self.assertIn('total_events: stored 7, actual 1 (-6)', out.getvalue())
+        self.assertEqual(EventStats.objects.get().total_events, 7)
+
+        call_command('recompute_stats', stdout=StringIO())
+        self.assertEqual(EventStats.objects.get().total_events, 1)
+        out = StringIO()
+        call_command('recompute_stats', '--dry-run', stdout=out)
+        self.assertIn('no drift', out.getvalue())
+
+
+class EventCreateSerializerTests(TestCase):
+    """Nested writes of EventCreateSerializer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+        cls.participants = [User.objects.create_user(f'participant{i}', 'password') for i in range(40)]
+
+    def create_event(self, songs=0, dress_details=0, participants=0, extra_participant_ids=()):
+        request = APIRequestFactory().post('/api/events/')
+        request.user = self.user
+        serializer = EventCreateSerializer(data={
+            'day': 'Friday',
+            'date': '2030-01-15',
+            'time': '18:00',
+            'duration': 120,
+            'place': 'Masjid Al-Noor',
+            'number_of_participants': participants,
+            'songs_data': [
+                {'title': f'Song {i}', 'artist': 'Ahmed Ali', 'duration': 180} for i in range(songs)
+            ],
+            'dress_details_data': [f'Dress {i}' for i in range(dress_details)],
+            'participants_data': [user.id for user in self.participants[:participants]] + list(extra_participant_ids),
+        }, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as queries:
+            event = serializer.save()
+        return event, len(queries)
+
+    def test_query_count_does_not_grow_with_nested_lists(self):
+        # The first event creates the stats row
+        self.create_event(songs=1, dress_details=1, participants=1)
+        _, small_queries = self.create_event(songs=1, dress_details=1, participants=1)
+        event, large_queries = self.create_event(songs=15, dress_details=5, participants=40)
+
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(list(event.songs.values_list('order', flat=True)), list(range(1, 16)))
+        self.assertEqual(event.dress_details.count(), 5)
+        self.assertEqual(event.participants.count(), 40)
+
+    def test_skips_unknown_and_repeated_participants(self):
+        event, _ = self.create_event(participants=2, extra_participant_ids=[self.participants[0].id, 999999])
+        self.assertEqual(
+            sorted(event.participants.values_list('user_id', flat=True)),
+            [self.participants[0].id, self.participants[1].id]
+        )
+
+
+class EventUpdateSerializerTests(TestCase):
+    """Diff-based nested writes of EventUpdateSerializer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+        cls.participants = [User.objects.create_user(f'participant{i}', 'password') for i in range(5)]
+
+    def setUp(self):
+        request = APIRequestFactory().post('/api/events/')
+        request.user = self.user
+        serializer = EventCreateSerializer(data={
+            'day': 'Friday', 'date': '2030-01-15', 'time': '18:00', 'duration': 120,
+            'place': 'Masjid Al-Noor', 'number_of_participants': 5,
+            'songs_data': [{'title': f'Song {i}', 'artist': '', 'duration': None} for i in range(5)],
+            'dress_details_data': ['White thobe', 'Kufi'],
+            'participants_data': [user.id for user in self.participants],
+        }, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        self.event = serializer.save()
+
+    def update_event(self, data):
+        serializer = EventUpdateSerializer(self.event, data=data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as queries:
+            self.event = serializer.save()
+        return len(queries)
+
+    def songs(self):
+        return list(self.event.songs.order_by('order').values_list('id', 'title'))
+
+    def test_unchanged_lists_only_read(self):
+        queries = self.update_event({
+            'songs_data': [{'title': f'Song {i}', 'artist': '', 'duration': None} for i in range(5)],
+            'dress_details_data': ['White thobe', 'Kufi'],
+            'participants_data': [user.id for user in self.participants],
+        })
+        # One read per list, plus the savepoint of the update's atomic block
+        self.assertEqual(queries, 5)
+
+    def test_reordering_keeps_song_rows(self):
+        before = dict((title, song_id) for song_id, title in self.songs())
+        self.update_event({
+            'songs_data': [{'title': f'Song {i}', 'artist': '', 'duration': None} for i in reversed(range(5))],
+        })
+        self.assertEqual(self.songs(), [(before[f'Song {i}'], f'Song {i}') for i in reversed(range(5))])
+
+    def test_staying_participants_keep_their_rows(self):
+        EventParticipant.objects.filter(event=self.event, user=self.participants[0]).update(is_confirmed=True)
+        kept = EventParticipant.objects.get(event=self.event, user=self.participants[0])
+        self.update_event({'participants_data': [self.participants[0].id, self.participants[1].id]})
+
+        self.assertEqual(self.event.participants.count(), 2)
+        participant = EventParticipant.objects.get(event=self.event, user=self.participants[0])
+        self.assertEqual((participant.pk, participant.joined_at, participant.is_confirmed), (kept.pk, kept.joined_at, True))
+
+
+class FastEventSerializerTests(TestCase):
+    """FastEventSerializer renders the same bytes as EventSerializer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password', first_name='Ahmed', last_name='')
+        cls.participant = User.objects.create_user(
+            'participant', 'password', first_name='Omar', last_name='Yusuf', email='omar@example.com'
+        )
+        # One event with every optional field and child, one with none
+        full = make_event(
+            place='Masjid Al-Noor', meeting_time='18:30', meeting_date='2030-03-01', place_of_meeting='Gate',
+            vehicle='Bus', camera_man='Khalid', participation_type='Recitation', event_reason='Ramadan',
+            created_by=cls.user,
+        )
+        Song.objects.create(event=full, title='Surah Al-Fatiha', artist='', order=1)
+        Song.objects.create(event=full, title='Surah Al-Ikhlas', artist='Ahmed Ali', duration=180, order=2)
+        DressDetail.objects.create(event=full, description='White thobe', order=1)
+        EventParticipant.objects.create(event=full, user=cls.participant, is_confirmed=True)
+        make_event(date='2020-01-03', status='completed', created_by=cls.user)
+
+    def render(self):
+        """Render all events with both serializers, check the bytes match, return the fast rows"""
+        queryset = Event.objects.order_by('date', 'id')
+        slow = EventSerializer(queryset, many=True).data
+        fast = FastEventSerializer().serialize_queryset(queryset)
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(slow))
+        return fast
+
+    def test_renders_the_same_bytes(self):
+        self.render()
+
+    @override_settings(TIME_ZONE='Asia/Riyadh')
+    def test_renders_aware_datetimes_in_the_current_timezone(self):
+        with timezone.override('Asia/Riyadh'):
+            rendered = self.render()
+        self.assertTrue(rendered[0]['created_at'].endswith('+03:00'))
+
+
+class FieldSelectionTests(TestCase):
+    """?fields= and ?expand= on the event list"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+        event = make_event(created_by=cls.user)
+        Song.objects.create(event=event, title='Surah Al-Fatiha', order=1)
+        EventParticipant.objects.create(event=event, user=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/events/', params)
+        return response, len(queries)
+
+    def test_fields_limit_the_keys(self):
+        response, _ = self.get({'fields': 'place,id'})
+        self.assertEqual(list(response.data['results'][0]), ['id', 'place'])
+
+    def test_naming_a_relation_expands_it(self):
+        response, _ = self.get({'fields': 'id,participants'})
+        event = response.data['results'][0]
+        self.assertEqual(list(event), ['id', 'participants'])
+        self.assertEqual([row['user_id'] for row in event['participants']], [self.user.pk])
+
+        response, _ = self.get({'fields': 'id', 'expand': 'songs'})
+        self.assertEqual(list(response.data['results'][0]), ['id', 'songs'])
+
+    def test_unknown_names_are_refused(self):
+        self.assertEqual(self.get({'fields': 'id,secret'})[0].status_code, 400)
+        self.assertEqual(self.get({'expand': 'created_by'})[0].status_code, 400)
+
+    def test_unexpanded_relations_are_not_queried(self):
+        _, default_queries = self.get({})
+        _, plain_queries = self.get({'fields': 'id,place'})
+        # The default list expands songs and dress details, one query each
+        self.assertEqual(default_queries - plain_queries, 2)
+
+
+class EventBatchViewTests(TestCase):
+    """POST /api/events/batch/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+        cls.participants = [User.objects.create_user(f'participant{i}', 'password') for i in range(10)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_operations(self, count):
+        return [{
+            'op': 'create',
+            'data': {
+                'day': 'Friday', 'date': '2030-03-01', 'time': '20:00', 'duration': 90,
+                'place': f'Masjid {i}', 'number_of_participants': 10,
+                'songs_data': [{'title': 'Surah Al-Fatiha'}, {'title': 'Surah Al-Ikhlas'}],
+                'participants_data': [user.id for user in self.participants],
+            },
+        } for i in range(count)]
+
+    def post_batch(self, operations):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/events/batch/', {'operations': operations}, format='json')
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        self.post_batch(self.create_operations(1))
+        small, small_queries = self.post_batch(self.create_operations(2))
+        # Small enough that SQLite does not split any bulk insert by its variable limit
+        large, large_queries = self.post_batch(self.create_operations(10))
+
+        self.assertEqual(large.status_code, 200)
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(Event.objects.count(), 13)
+        self.assertEqual(EventStats.objects.get().total_events, 13)
+        self.assertEqual(len(large.data['results'][0]['event']['participants']), 10)
+        self.assertEqual(large.data['results'][0]['event']['participant_count'], 10)
+
+    def test_children_are_synced_to_their_own_events_without_returned_ids(self):
+        with concurrent_event_insert(self.user):
+            response, _ = self.post_batch(self.create_operations(3))
+
+        self.assertEqual(response.status_code, 200)
+        for result in response.data['results']:
+            event = Event.objects.get(pk=result['id'])
+            self.assertEqual(result['event']['place'], event.place)
+            self.assertEqual(event.songs.count(), 2)
+        self.assertFalse(Song.objects.filter(event__place='Other session').exists())
+
+    def test_invalid_operation_rejects_the_whole_batch(self):
+        event = make_event(created_by=self.user)
+        response, _ = self.post_batch(self.create_operations(2) + [
+            {'op': 'delete', 'id': event.pk},
+            {'op': 'update', 'id': 999999, 'data': {'place': 'Elsewhere'}},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][:3], [None, None, None])
+        self.assertEqual(response.data['errors'][3], {'id': ['Event not found']})
+        self.assertEqual(Event.objects.count(), 1)
+
+
+class EventBulkStatusViewTests(TestCase):
+    """POST /api/events/bulk-status/ and the complete_past_events command"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('coordinator', 'password', role='coordinator')
+        cls.member = User.objects.create_user('member', 'password')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.events = [
+            make_event(date=date, status=status, created_by=self.admin)
+            for date, status in [
+                ('2020-01-03', 'confirmed'), ('2020-01-10', 'pending'),
+                ('2030-01-03', 'confirmed'), ('2030-01-10', 'confirmed'),
+            ]
+        ]
+
+    def assertStatsMatch(self):
+        stats = EventStats.objects.get()
+        for field, value in stats.compute_stats().items():
+            self.assertEqual(getattr(stats, field), value, field)
+
+    def test_ids_move_in_bulk_and_stats_follow(self):
+        response = self.client.post('/api/events/bulk-status/', {
+            'status': 'cancelled', 'ids': [event.pk for event in self.events[:3]],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated_count'], 3)
+        self.assertEqual(Event.objects.filter(status='cancelled').count(), 3)
+        self.assertStatsMatch()
+
+    def test_filter_is_required_and_members_are_refused(self):
+        response = self.client.post('/api/events/bulk-status/', {'status': 'cancelled', 'filter': {}}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        self.client.force_authenticate(self.member)
+        response = self.client.post('/api/events/bulk-status/', {
+            'status': 'cancelled', 'filter': {'status': 'pending'},
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Event.objects.filter(status='cancelled').exists())
+
+    def test_command_completes_only_past_confirmed_events(self):
+        call_command('complete_past_events', stdout=StringIO())
+
+        self.assertEqual(
+            list(Event.objects.order_by('date').values_list('status', flat=True)),
+            ['completed', 'pending', 'confirmed', 'confirmed']
+        )
+        self.assertStatsMatch()
+
+
+class EventParticipationViewTests(TestCase):
+    """Join, leave and the bulk participants endpoint"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.coordinator = User.objects.create_user('coordinator', 'password', role='coordinator')
+        cls.users = [User.objects.create_user(f'participant{i}', 'password') for i in range(5)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.event = make_event(number_of_participants=5, created_by=self.coordinator)
+
+    def roster(self):
+        return dict(self.event.participants.values_list('user_id', 'is_confirmed'))
+
+    def test_join_twice_is_refused(self):
+        self.client.force_authenticate(self.users[0])
+        first = self.client.post(f'/api/events/{self.event.pk}/join/')
+        second = self.client.post(f'/api/events/{self.event.pk}/join/')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(self.roster(), {self.users[0].pk: False})
+
+    def test_leave_is_one_delete(self):
+        EventParticipant.objects.create(event=self.event, user=self.users[0])
+        self.client.force_authenticate(self.users[0])
+        response = self.client.delete(f'/api/events/{self.event.pk}/leave/')
+        again = self.client.delete(f'/api/events/{self.event.pk}/leave/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(again.status_code, 400)
+        self.assertEqual(self.roster(), {})
+
+    def test_bulk_add_remove_and_confirm(self):
+        EventParticipant.objects.create(event=self.event, user=self.users[0])
+        self.client.force_authenticate(self.coordinator)
+        response = self.client.post(f'/api/events/{self.event.pk}/participants/bulk/', {
+            'add': [self.users[1].pk, self.users[2].pk, 999999],
+            'remove': [self.users[0].pk],
+            'confirm': [self.users[1].pk],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {key: response.data[key] for key in ('added', 'removed', 'confirmed', 'unknown_users')},
+            {'added': 2, 'removed': 1, 'confirmed': 1, 'unknown_users': [999999]}
+        )
+        self.assertEqual(self.roster(), {self.users[1].pk: True, self.users[2].pk: False})
+
+    def test_bulk_add_counts_only_rows_it_inserted(self):
+        bulk_create = EventParticipant.objects.bulk_create
+
+        def insert_after_concurrent_join(participants, *args, **kwargs):
+            # users[1] joins in another session between the roster read and this insert
+            joined = EventParticipant.objects.create(event=self.event, user=self.users[1])
+            EventParticipant.objects.filter(pk=joined.pk).update(joined_at=timezone.now() - timedelta(seconds=1))
+            return bulk_create(participants, *args, **kwargs)
+
+        self.client.force_authenticate(self.coordinator)
+        with mock.patch.object(EventParticipant.objects, 'bulk_create', side_effect=insert_after_concurrent_join):
+            response = self.client.post(f'/api/events/{self.event.pk}/participants/bulk/', {
+                'add': [self.users[1].pk, self.users[2].pk],
+            }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['added'], 1)
+        self.assertEqual(self.roster(), {self.users[1].pk: False, self.users[2].pk: False})
+
+    def test_lists_leave_the_roster_to_detail_and_roster_endpoints(self):
+        for user in self.users:
+            EventParticipant.objects.create(event=self.event, user=user)
+        self.client.force_authenticate(self.coordinator)
+
+        listed = self.client.get('/api/events/').data['results'][0]
+        expanded = self.client.get('/api/events/?expand=participants').data['results'][0]
+        detail = self.client.get(f'/api/events/{self.event.pk}/').data
+        roster = self.client.get(f'/api/events/{self.event.pk}/participants/').data['results']
+
+        self.assertNotIn('participants', listed)
+        self.assertIn('songs', listed)
+        self.assertEqual(listed['participant_count'], 5)
+        self.assertEqual(len(expanded['participants']), 5)
+        self.assertEqual(len(detail['participants']), 5)
+        self.assertEqual(len(roster), 5)
+
+    def counts(self):
+        self.event.refresh_from_db()
+        return self.event.participant_count, self.event.confirmed_count
+
+    def test_counts_follow_join_leave_and_bulk_changes(self):
+        self.client.force_authenticate(self.users[0])
+        self.client.post(f'/api/events/{self.event.pk}/join/')
+        self.assertEqual(self.counts(), (1, 0))
+
+        self.client.force_authenticate(self.coordinator)
+        self.client.post(f'/api/events/{self.event.pk}/participants/bulk/', {
+            'add': [user.pk for user in self.users[1:4]], 'confirm': [self.users[0].pk, self.users[1].pk],
+        }, format='json')
+        self.assertEqual(self.counts(), (4, 2))
+
+        self.client.force_authenticate(self.users[0])
+        self.client.delete(f'/api/events/{self.event.pk}/leave/')
+        self.assertEqual(self.counts(), (3, 1))
+
+        # Saving a stale copy of the event leaves the counters alone
+        stale = Event.objects.get(pk=self.event.pk)
+        EventParticipant.objects.create(event=self.event, user=self.users[4])
+        stale.place = 'Elsewhere'
+        stale.save()
+        self.assertEqual(self.counts(), (4, 1))
+
+    def test_roster_pages_and_searches(self):
+        self.users[2].first_name = 'Yusuf'
+        self.users[2].save()
+        for user in self.users:
+            EventParticipant.objects.create(event=self.event, user=user)
+        self.client.force_authenticate(self.users[0])
+
+        first = self.client.get(f'/api/events/{self.event.pk}/participants/', {'page_size': 3})
+        second = self.client.get(first.data['next'])
+        self.assertEqual(
+            [row['user_id'] for row in first.data['results'] + second.data['results']],
+            [user.pk for user in self.users]
+        )
+        self.assertIsNone(second.data['next'])
+
+        found = self.client.get(f'/api/events/{self.event.pk}/participants/', {'search': 'yusuf'})
+        self.assertEqual([row['user_id'] for row in found.data['results']], [self.users[2].pk])
+        self.assertEqual(self.client.get('/api/events/999999/participants/').status_code, 404)
+
+    def test_bulk_is_refused_to_participants(self):
+        self.client.force_authenticate(self.users[0])
+        response = self.client.post(
+            f'/api/events/{self.event.pk}/participants/bulk/', {'add': [self.users[0].pk]}, format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class KeysetPaginationTests(TestCase):
+    """?cursor= on the event list"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+        for day in range(1, 6):
+            make_event(date=f'2030-01-0{day}', created_by=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def cursor(self, payload):
+        return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+    def test_pages_follow_the_cursor(self):
+        first = self.client.get('/api/events/', {'cursor': '', 'page_size': 3})
+        second = self.client.get(first.data['next'])
+        dates = [event['date'] for event in first.data['results'] + second.data['results']]
+        self.assertEqual(dates, [f'2030-01-0{day}' for day in range(1, 6)])
+
+    def test_tampered_cursors_are_not_found(self):
+        for payload in (
+            {'o': ['date', 'time', 'id'], 'v': ['x', '20:00:00', 1]},
+            {'o': ['date', 'time', 'id'], 'v': ['2030-01-01', None, 1]},
+            {'o': ['date', 'time', 'id'], 'v': 'abc'},
+            ['date', 'time', 'id'],
+            'cursor',
+        ):
+            response = self.client.get('/api/events/', {'cursor': self.cursor(payload)})
+            self.assertEqual(response.status_code, 404, payload)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    EVENT_RESPONSE_CACHE=True,
+)
+class CachedResponseTests(TestCase):
+    """Event responses cached on the events generation"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_event(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            make_event(created_by=self.user)
+
+    def test_writes_invalidate_cached_lists(self):
+        self.create_event()
+        self.assertEqual(len(self.client.get('/api/events/upcoming/').data), 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/events/upcoming/')
+        self.assertEqual(len(queries), 0)
+
+        self.create_event()
+        self.assertEqual(len(self.client.get('/api/events/upcoming/').data), 2)
+
+    @override_settings(EVENT_RESPONSE_CACHE=False)
+    def test_disabled_cache_always_renders(self):
+        self.client.get('/api/events/upcoming/')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/events/upcoming/')
+        self.assertGreater(len(queries), 0)
+
+
+class ConditionalResponseTests(TestCase):
+    """ETags of the event list and detail views"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password', first_name='Ahmed')
+        cls.event = make_event(created_by=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_unchanged_responses_are_not_modified(self):
+        for path in ('/api/events/', f'/api/events/{self.event.pk}/'):
+            etag = self.client.get(path)['ETag']
+            self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_user_renames_and_the_date_change_the_etag(self):
+        for path in ('/api/events/', f'/api/events/{self.event.pk}/'):
+            etag = self.client.get(path)['ETag']
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.first_name = f'{self.user.first_name}x'
+                self.user.save()
+            self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+            etag = self.client.get(path)['ETag']
+            tomorrow = timezone.now() + timedelta(days=1)
+            with mock.patch('events.conditional.timezone.now', return_value=tomorrow):
+                self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class EventSearchTests(TestCase):
+    """Token search ranking and index upkeep"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+
+    def create_event(self, place):
+        return make_event(place=place, created_by=self.user)
+
+    def search(self, query):
+        return list(search_events(Event.objects.all(), query).order_by('-search_rank', 'id'))
+
+    def test_place_matches_rank_above_song_matches(self):
+        by_song = self.create_event('Community Center')
+        Song.objects.create(event=by_song, title='Noor recitation', order=1)
+        by_place = self.create_event('Masjid Al-Noor')
+        self.create_event('Unrelated Hall')
+
+        self.assertEqual(self.search('noor'), [by_place, by_song])
+        # Every term must match, the last one as a prefix
+        self.assertEqual(self.search('masjid no'), [by_place])
+
+    def test_child_writes_reindex_their_event(self):
+        event = self.create_event('Community Center')
+        song = Song.objects.create(event=event, title='Surah Yasin', order=1)
+        self.assertEqual(self.search('yasin'), [event])
+
+        song.delete()
+        self.assertEqual(self.search('yasin'), [])
+
+    def test_fulltext_query_skips_terms_the_index_cannot_hold(self):
+        self.assertEqual(boolean_query(['masjid', 'al', 'the', 'noor']), '+masjid* +noor*')
+        self.assertIsNone(boolean_query(['al', 'of']))
+
+
+class SimilarEventsTests(TestCase):
+    """Fuzzy matching of places, meeting places and camera men"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+        cls.noor = make_event(place='مسجد النور', created_by=cls.user)
+        cls.huda = make_event(place='مسجد الهدى', created_by=cls.user)
+        cls.center = make_event(place='Community Center', camera_man='Abdulrahman', created_by=cls.user)
+
+    def similar(self, text, **kwargs):
+        return list(similar_events(Event.objects.all(), text, **kwargs))
+
+    def test_misspelled_text_ranks_the_right_event_first(self):
+        self.assertEqual(self.similar('مسجد النوور')[0], self.noor)
+        self.assertEqual(self.similar('Abdurahman')[0], self.center)
+
+    def test_events_below_the_threshold_are_left_out(self):
+        self.assertNotIn(self.center, self.similar('مسجد النوور'))
+        self.assertEqual(self.similar('مسجد النوور', min_similarity=0.99), [])
+
+
+class EventChangesViewTests(TestCase):
+    """GET /api/events/changes/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_changes_and_deletions_since_a_token(self):
+        event = make_event(created_by=self.user)
+        first = self.client.get('/api/events/changes/')
+        self.assertTrue(first.data['reset'])
+        self.assertEqual([row['id'] for row in first.data['events']], [event.pk])
+
+        event_id = event.pk
+        event.delete()
+        second = self.client.get('/api/events/changes/', {'since': first.data['next']})
+        self.assertFalse(second.data['reset'])
+        self.assertEqual(second.data['deleted'], [event_id])
+
+        self.assertEqual(self.client.get('/api/events/changes/', {'since': 'abc'}).status_code, 400)
+
+
+class BulkInsertEventsTests(TestCase):
+    """bulk_insert_events on backends that return no ids from bulk inserts"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+
+    def test_ids_ignore_rows_inserted_concurrently(self):
+        events = [build_event(place=f'Hall {i}', created_by=self.user) for i in range(3)]
+        with concurrent_event_insert(self.user):
+            ids = bulk_insert_events(events)
+
+        self.assertEqual(ids, [event.pk for event in events])
+        self.assertEqual(
+            list(Event.objects.filter(pk__in=ids).order_by('pk').values_list('place', 'insert_token')),
+            [('Hall 0', None), ('Hall 1', None), ('Hall 2', None)]
+        )
+
+    def test_importer_maps_rows_to_their_own_events(self):
+        columns = {header: index for index, header in enumerate(
+            ['Day', 'Date', 'Time', 'Duration (minutes)', 'Place', 'Number of Participants']
+        )}
+        rows = [(row_num, ['Friday', '2030-01-01', '20:00', 90, f'Hall {row_num}', 1]) for row_num in (2, 3, 5)]
+        with concurrent_event_insert(self.user):
+            importer = EventImporter(self.user).run(rows, columns)
+
+        places = dict(Event.objects.values_list('pk', 'place'))
+        self.assertEqual(
+            {row_num: places[pk] for row_num, pk in importer.row_ids.items()},
+            {2: 'Hall 2', 3: 'Hall 3', 5: 'Hall 5'}
+        )
+
+
+class ImportJobLeaseTests(TestCase):
+    """Leases let stale import jobs be recovered without running them twice"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('importer', 'password')
+
+    def claim(self, mode):
+        job = ImportJob.objects.create(file='imports/events.xlsx', original_name='events.xlsx', mode=mode, created_by=self.user)
+        return job, claim_job(job.pk)
+
+    def expire(self, job):
+        ImportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - IMPORT_LEASE - timedelta(seconds=1))
+
+    def test_job_is_claimed_once(self):
+        job, token = self.claim('upsert')
+        self.assertIsNotNone(token)
+        self.assertIsNone(claim_job(job.pk))
+
+    def test_stale_upsert_job_is_requeued_and_create_job_failed(self):
+        upsert_job, _ = self.claim('upsert')
+        create_job, _ = self.claim('create')
+        fresh_job, _ = self.claim('upsert')
+        self.expire(upsert_job)
+        self.expire(create_job)
+
+        self.assertEqual(recover_stale_jobs(), (1, 1))
+        self.assertEqual(ImportJob.objects.get(pk=upsert_job.pk).status, 'queued')
+        self.assertEqual(ImportJob.objects.get(pk=create_job.pk).status, 'failed')
+        self.assertEqual(ImportJob.objects.get(pk=fresh_job.pk).status, 'running')
+
+    def test_stale_job_fails_after_max_attempts(self):
+        job, _ = self.claim('upsert')
+        ImportJob.objects.filter(pk=job.pk).update(attempts=3)
+        self.expire(job)
+        self.assertEqual(recover_stale_jobs(), (0, 1))
+
+    def test_recovered_worker_loses_its_lease(self):
+        job, token = self.claim('upsert')
+        importer = mock.Mock(
+            total_rows=10, imported_count=5, updated_count=0, unchanged_count=0, duplicate_count=0,
+            error_count=0, errors=[]
+        )
+        save_progress(job, importer, token)
+        self.expire(job)
+        recover_stale_jobs()
+        with self.assertRaises(LeaseLost):
+            save_progress(job, importer, token)
+
+
+class ImportParsingIsolationTests(TestCase):
+    """Spawned import workers load import_parsing without setting up Django"""
+
+    def test_import_parsing_loads_without_django(self):
+        env = {key: value for key, value in os.environ.items() if key != 'DJANGO_SETTINGS_MODULE'}
+        script = (
+            'import sys, events.import_parsing; '
+            'print(sorted(name for name in sys.modules if name.startswith("django")))'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script], env=env, capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), '[]')
+
+
+class ParallelParsingTests(TestCase):
+    """parse_rows_parallel gives the same results as parse_rows"""
+
+    def test_matches_the_serial_parse(self):
+        columns = {header: index for index, header in enumerate(
+            ['Day', 'Date', 'Time', 'Duration (minutes)', 'Place', 'Number of Participants', 'Status']
+        )}
+        rows = [
+            (row_num, ['Friday', f'2030-03-{row_num:02d}', '20:00', 90, f'Hall {row_num}', 10, 'pending'])
+            for row_num in range(2, 10)
+        ]
+        rows[2] = (4, ['Friday', 'not a date', '20:00', 90, 'Hall', 10, 'pending'])
+        rows[6] = (8, ['Friday', '2030-03-08', '20:00', 'long', 'Hall', 10, 'unknown'])
+
+        serial = list(parse_rows(rows, columns))
+        self.assertEqual([row_num for row_num, _, error in serial if error], [4, 8])
+        # Small batches so several are in flight on each worker
+        self.assertEqual(list(parse_rows_parallel(rows, columns, processes=2, batch_size=3)), serial)
+
+
+class EventImportKeyTests(TestCase):
+    """Events written outside imports still get the key upserts match on"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+
+    def create(self, place='Masjid Al-Noor', **fields):
+        return make_event(place=place, created_by=self.user, **fields)
+
+    def natural_key(self, place):
+        start = datetime(2030, 3, 1, 20, 0)
+        return import_key(None, start.date(), start.time(), place)
+
+    def test_save_sets_and_refreshes_the_key(self):
+        event = self.create()
+        self.assertEqual(event.import_key, self.natural_key('Masjid Al-Noor'))
+
+        event.place = 'Masjid Al-Huda'
+        event.save(update_fields=['place'])
+        event.refresh_from_db()
+        self.assertEqual(event.import_key, self.natural_key('Masjid Al-Huda'))
+
+    def test_external_id_takes_precedence(self):
+        event = self.create(external_id='sched-7')
+        self.assertEqual(event.import_key, import_key('sched-7', None, None, None))
+
+    def test_duplicate_event_gets_no_key(self):
+        first = self.create()
+        second = self.create()
+        self.assertEqual(first.import_key, self.natural_key('Masjid Al-Noor'))
+        self.assertIsNone(second.import_key)
+
+    def test_batch_creates_and_updates_set_the_key(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        event = self.create()
+        response = client.post('/api/events/batch/', {'operations': [
+            {'op': 'update', 'id': event.pk, 'data': {'place': 'Masjid Al-Huda'}},
+            {'op': 'create', 'data': {
+                'day': 'Friday', 'date': '2030-03-01', 'time': '20:00', 'duration': 90,
+                'place': 'Masjid Al-Noor', 'number_of_participants': 1,
+            }},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            Event.objects.get(pk=event.pk).import_key, self.natural_key('Masjid Al-Huda')
+        )
+        self.assertEqual(
+            Event.objects.get(pk=response.data['results'][1]['id']).import_key,
+            self.natural_key('Masjid Al-Noor')
+        )
+
+
+class CsvImportTests(TestCase):
+    """CSV and TSV uploads, detected by name or by their content"""
+
+    HEADER = ['Day', 'Date', 'Time', 'Duration (minutes)', 'Place', 'Number of Participants']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+
+    def text(self, delimiter, *rows):
+        return '\r\n'.join(delimiter.join(row) for row in [self.HEADER, *rows]) + '\r\n'
+
+    def open(self, content, name):
+        upload = BytesIO(content)
+        self.assertEqual(detect_import_format(upload, name), 'csv')
+        return open_csv_rows(upload, name)
+
+    def run_import(self, content, name):
+        columns, rows, stream = self.open(content, name)
+        try:
+            return EventImporter(self.user).run(rows, columns)
+        finally:
+            stream.close()
+
+    def test_csv_upload(self):
+        importer = self.run_import(self.text(
+            ',', ['Friday', '2030-03-01', '20:00', '90', 'Masjid Al-Noor', '10'],
+            ['Friday', '2030-03-08', '20:00', '90', '"Hall, East"', '5'],
+        ).encode('utf-8'), 'events.csv')
+
+        self.assertEqual((importer.imported_count, importer.error_count), (2, 0))
+        self.assertEqual(sorted(Event.objects.values_list('place', flat=True)), ['Hall, East', 'Masjid Al-Noor'])
+
+    def test_tsv_is_detected_by_sniffing(self):
+        content = self.text('\t', ['Friday', '2030-03-01', '20:00', '90', 'Masjid, Al-Noor', '10']).encode('utf-8')
+        self.assertEqual(detect_import_format(BytesIO(b'\x00' + content), 'events'), None)
+
+        importer = self.run_import(content, 'events')
+        self.assertEqual(importer.imported_count, 1)
+        self.assertEqual(Event.objects.get().place, 'Masjid, Al-Noor')
+
+    def test_byte_order_mark_is_not_part_of_the_first_header(self):
+        row = ['Friday', '2030-03-01', '20:00', '90', 'مسجد النور', '10']
+        content = b'\xef\xbb\xbf' + self.text(';', row).encode('utf-8')
+        columns, _, stream = self.open(content, 'events.csv')
+        stream.close()
+        self.assertEqual(columns['Day'], 0)
+
+        self.assertEqual(self.run_import(content, 'events.csv').imported_count, 1)
+        self.assertEqual(Event.objects.get().place, 'مسجد النور')
+
+    def test_other_encodings_are_refused(self):
+        row = ['Friday', '2030-03-01', '20:00', '90', 'Café', '10']
+        with self.assertRaisesMessage(ImportFileError, 'UTF-8'):
+            self.open(self.text(',', row).encode('latin-1'), 'events.csv')
+
+        # Past the first decoded chunk the error surfaces while the rows are read
+        filler = [['Friday', '2030-03-01', '20:00', '90', f'Hall {i}', '1'] for i in range(400)]
+        content = self.text(',', *filler).encode('utf-8') + ','.join(row).encode('latin-1')
+        with self.assertRaisesMessage(ImportFileError, 'UTF-8'):
+            self.run_import(content, 'events.csv')
+
+
+class ChildSheetImportTests(TestCase):
+    """Songs, Dress Details and Participants sheets of an imported workbook"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+        cls.ahmed = User.objects.create_user('ahmed', 'password')
+
+    def test_children_attach_by_event_row_and_external_id(self):
+        content = workbook_file({
+            'Events': [
+                ['Day', 'Date', 'Time', 'Duration (minutes)', 'Place', 'Number of Participants', 'External ID'],
+                ['Friday', '2030-03-01', '20:00', 90, 'Masjid', 10, None],
+                ['Friday', '2030-03-08', '20:00', 90, 'Hall', 10, 'sched-9'],
+                ['Friday', 'not a date', '20:00', 90, 'Hall', 10, None],
+            ],
+            'Songs': [
+                ['Event Row', 'External ID', 'Title', 'Order'],
+                [2, None, 'Surah Al-Fatiha', 1],
+                [None, 'sched-9', 'Surah Yasin', None],
+                [None, 'sched-9', 'Surah Al-Mulk', None],
+                [4, None, 'Surah Al-Kahf', 1],
+                [None, 'sched-404', 'Surah Maryam', 1],
+            ],
+            'Dress Details': [
+                ['Event Row', 'External ID', 'Description', 'Order'],
+                [2, None, 'White thobe', None],
+                [None, 'sched-9', 'Kufi', None],
+            ],
+            'Participants': [
+                ['Event Row', 'External ID', 'Username', 'Confirmed'],
+                [2, None, 'ahmed', 'yes'],
+                [None, 'sched-9', 'ahmed', 'no'],
+                [2, None, 'nobody', 'yes'],
+            ],
+        })
+        columns, rows, workbook = open_excel_rows(content)
+        importer = EventImporter(self.user).run(rows, columns).run_children(workbook)
+        workbook.close()
+
+        masjid, hall = Event.objects.get(place='Masjid'), Event.objects.get(external_id='sched-9')
+        self.assertEqual(
+            list(Song.objects.order_by('event_id', 'order').values_list('event_id', 'order', 'title')),
+            [(masjid.pk, 1, 'Surah Al-Fatiha'), (hall.pk, 1, 'Surah Yasin'), (hall.pk, 2, 'Surah Al-Mulk')]
+        )
+        self.assertEqual(
+            list(DressDetail.objects.order_by('event_id').values_list('event_id', 'description')),
+            [(masjid.pk, 'White thobe'), (hall.pk, 'Kufi')]
+        )
+        self.assertEqual(
+            list(EventParticipant.objects.order_by('event_id').values_list('event_id', 'user_id', 'is_confirmed')),
+            [(masjid.pk, self.ahmed.pk, True), (hall.pk, self.ahmed.pk, False)]
+        )
+        self.assertEqual((masjid.participant_count, masjid.confirmed_count), (1, 1))
+
+        self.assertEqual(importer.errors[1:], [
+            'Songs row 5: Event row 4 was not imported',
+            'Songs row 6: No event matches this External ID or date, time and place',
+            'Participants row 4: Unknown username "nobody"',
+        ])
+        self.assertTrue(importer.errors[0].startswith('Row 4: '))
+        self.assertEqual(dict(importer.child_counts), {'songs': 3, 'dress_details': 2, 'participants': 2})
+
+
+class EventUpsertTests(TestCase):
+    """Upsert imports skip only the events that still hold the row's values"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+
+    def upsert(self, *rows):
+        columns = {header: index for index, header in enumerate(
+            ['Day', 'Date', 'Time', 'Duration (minutes)', 'Place', 'Number of Participants']
+        )}
+        numbered = [(row_num, list(row)) for row_num, row in enumerate(rows, start=2)]
+        result = EventImporter(self.user, mode='upsert').run(numbered, columns).result()
+        return [result.get(key, 0) for key in ('imported_count', 'updated_count', 'unchanged_count', 'duplicate_count')]
+
+    def test_unchanged_row_is_skipped(self):
+        row = ('Friday', '2030-03-01', '20:00', 90, 'Masjid', 10)
+        self.assertEqual(self.upsert(row), [1, 0, 0, 0])
+        self.assertEqual(self.upsert(row), [0, 0, 1, 0])
+
+        # Saving the event without changing it keeps the row's hash
+        Event.objects.get().save()
+        self.assertEqual(self.upsert(row), [0, 0, 1, 0])
+
+    def test_edited_events_are_overwritten(self):
+        row = ('Friday', '2030-03-01', '20:00', 90, 'Masjid', 10)
+        self.upsert(row)
+        event = Event.objects.get()
+
+        event.duration = 30
+        event.save()
+        self.assertEqual(self.upsert(row), [0, 1, 0, 0])
+        self.assertEqual(Event.objects.get().duration, 90)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.post('/api/events/batch/', {'operations': [
+            {'op': 'update', 'id': event.pk, 'data': {'number_of_participants': 3}},
+        ]}, format='json')
+        self.assertEqual(self.upsert(row), [0, 1, 0, 0])
+
+        bulk_set_status(Event.objects.all(), 'confirmed')
+        self.assertEqual(self.upsert(row), [0, 1, 0, 0])
+        self.assertEqual(Event.objects.get().status, 'pending')
+
+    def test_repeated_keys_are_reported(self):
+        self.assertEqual(self.upsert(
+            ('Friday', '2030-03-01', '20:00', 90, 'Masjid', 10),
+            ('Friday', '2030-03-01', '20:00', 60, 'Masjid', 10),
+        ), [1, 0, 0, 1])
+        self.assertEqual(Event.objects.get().duration, 60)
+
+
+class ExportRoundTripTests(TestCase):
+    """Exports re-import in upsert mode onto the events they came from"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+        cls.participant = User.objects.create_user('omar', 'password')
+        cls.scheduled = make_event(
+            place='Masjid Al-Noor', status='confirmed', external_id='sched-1', created_by=cls.user
+        )
+        cls.local = make_event(date='2030-03-08', place='مسجد الهدى', status='confirmed', created_by=cls.user)
+        make_event(date='2030-03-15', status='pending', created_by=cls.user)
+        Song.objects.create(event=cls.scheduled, title='Surah Al-Fatiha', artist='Ahmed Ali', order=1)
+        Song.objects.create(event=cls.scheduled, title='Surah Al-Ikhlas', duration=60, order=2)
+        Song.objects.create(event=cls.local, title='Surah Yasin', order=1)
+        EventParticipant.objects.create(event=cls.scheduled, user=cls.participant, is_confirmed=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, **params):
+        response = self.client.get('/api/events/export/', {'status': 'confirmed', **params})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_csv_export_reimports_unchanged(self):
+        content = self.export(file_type='csv')
+        self.assertTrue(content.startswith(b'\xef\xbb\xbf'))
+
+        columns, rows, stream = open_csv_rows(BytesIO(content), 'events.csv')
+        with stream:
+            result = EventImporter(self.user, mode='upsert').run(rows, columns).result()
+        self.assertEqual(
+            [result[key] for key in ('total_rows', 'imported_count', 'updated_count', 'unchanged_count')],
+            [2, 0, 0, 2]
+        )
+        self.assertEqual(Event.objects.count(), 3)
+
+    def test_xlsx_export_with_children_restores_them(self):
+        from openpyxl import load_workbook
+
+        content = self.export(file_type='xlsx', include='songs,participants')
+        workbook = load_workbook(BytesIO(content), read_only=True)
+        self.assertEqual(workbook.sheetnames, ['Events', 'Songs', 'Participants'])
+        songs = list(workbook['Songs'].iter_rows(values_only=True))
+        self.assertEqual(list(songs[0][:6]), ['Event ID', 'External ID', 'Date', 'Time', 'Place', 'Title'])
+        self.assertEqual([row[:2] for row in songs[1:]], [
+            (self.scheduled.pk, 'sched-1'), (self.scheduled.pk, 'sched-1'), (self.local.pk, None),
+        ])
+        workbook.close()
+
+        Song.objects.all().delete()
+        EventParticipant.objects.all().delete()
+        self.local.duration = 30
+        self.local.save()
+
+        columns, rows, workbook = open_excel_rows(BytesIO(content))
+        importer = EventImporter(self.user, mode='upsert').run(rows, columns).run_children(workbook)
+        workbook.close()
+        result = importer.result()
+
+        self.assertEqual(
+            [result[key] for key in (
+                'imported_count', 'updated_count', 'unchanged_count', 'songs_count', 'participants_count',
+            )],
+            [0, 1, 1, 3, 1]
+        )
+        self.assertNotIn('errors', result)
+        self.assertEqual(Event.objects.get(pk=self.local.pk).duration, 90)
+        self.assertEqual(
+            list(Song.objects.order_by('event_id', 'order').values_list('event_id', 'title', 'artist', 'duration')),
+            [(self.scheduled.pk, 'Surah Al-Fatiha', 'Ahmed Ali', None),
+             (self.scheduled.pk, 'Surah Al-Ikhlas', None, 60),
+             (self.local.pk, 'Surah Yasin', None, None)]
+        )
+        self.assertEqual(
+            list(EventParticipant.objects.values_list('event_id', 'user_id', 'is_confirmed')),
+            [(self.scheduled.pk, self.participant.pk, True)]
+        )
+
+
+class ImportTemplateTests(TestCase):
+    """GET /api/events/import/sample/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_template_sheets_import_cleanly(self):
+        from openpyxl import load_workbook
+
+        content = self.client.get('/api/events/import/sample/').content
+        workbook = load_workbook(BytesIO(content))
+        self.assertEqual(workbook.sheetnames, ['Events Import Template', 'Songs', 'Dress Details', 'Participants'])
+        self.assertEqual([cell.value for cell in workbook.worksheets[0][1]], TEMPLATE_HEADERS)
+        participants = workbook['Participants']
+        self.assertEqual(participants.max_row, 1)
+        self.assertIn('existing account', participants['C1'].comment.text)
+
+        upload = BytesIO(content)
+        upload.name = 'events_import_template.xlsx'
+        response = self.client.post('/api/events/import/?dry_run=1', {'file': upload, 'mode': 'create'})
+        summary = json.loads(b''.join(response.streaming_content).splitlines()[-1])['summary']
+        self.assertEqual(summary['valid_rows'], len(TEMPLATE_SAMPLE_ROWS))
+        self.assertEqual(
+            {title: sheet['failed_rows'] for title, sheet in summary['sheets'].items()},
+            {'Songs': 0, 'Dress Details': 0, 'Participants': 0}
+        )
+
+    def test_unchanged_template_is_not_modified(self):
+        response = self.client.get('/api/events/import/sample/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+        again = self.client.get('/api/events/import/sample/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+        self.assertEqual(
+            self.client.get('/api/events/import/sample/', HTTP_IF_NONE_MATCH='"stale"').status_code, 200
+        )
+
+
+class ExcelValueTests(TestCase):
+    """Aware datetimes are written to Excel in local time"""
+
+    @override_settings(TIME_ZONE='Asia/Riyadh')
+    def test_aware_datetime_is_converted_before_dropping_tzinfo(self):
+        value = datetime(2030, 3, 1, 17, 0, tzinfo=dt_timezone.utc)
+        self.assertEqual(excel_value(value), datetime(2030, 3, 1, 20, 0))
+
+    def test_other_values_are_unchanged(self):
+        self.assertEqual(excel_value(datetime(2030, 3, 1, 17, 0)), datetime(2030, 3, 1, 17, 0))
+        self.assertEqual(excel_value('Masjid'), 'Masjid')
+
+
+class ImportDryRunTests(TestCase):
+    """POST /api/events/import/?dry_run=1 validates rows as the model and the import would"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', 'password')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, sheets, mode='create'):
+        content = workbook_file(sheets)
+        response = self.client.post('/api/events/import/?dry_run=1', {'file': content, 'mode': mode})
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def event_rows(self, *rows):
+        header = ['Day', 'Date', 'Time', 'Duration (minutes)', 'Place', 'Number of Participants']
+        return [header] + [list(row) for row in rows]
+
+    def test_model_limits_are_checked(self):
+        lines = self.upload({'Events': self.event_rows(
+            ('Friday', '2030-03-01', '20:00', 90, 'Masjid', 10),
+            ('F' * 21, '2030-03-01', '20:00', 90, 'Masjid', 10),
+            ('Friday', '2030-03-01', '20:00', 600, 'P' * 201, 10),
+        )})
+
+        self.assertEqual([line['status'] for line in lines[:3]], ['ok', 'error', 'error'])
+        self.assertEqual([issue['column'] for issue in lines[1]['errors']], ['Day'])
+        self.assertEqual(
+            sorted(issue['column'] for issue in lines[2]['errors']), ['Duration (minutes)', 'Place']
+        )
+        self.assertEqual(lines[3]['summary']['failed_rows'], 2)
+        self.assertEqual(Event.objects.count(), 0)
+
+    def test_create_mode_warns_about_existing_events(self):
+        make_event(created_by=self.user)
+        lines = self.upload({'Events': self.event_rows(('Friday', '2030-03-01', '20:00', 90, 'Masjid', 10))})
+        self.assertEqual(lines[0]['status'], 'warning')
+        lines = self.upload({'Events': self.event_rows(('Friday', '2030-03-01', '20:00', 90, 'Masjid', 10))}, 'upsert')
+        self.assertEqual(lines[0]['status'], 'ok')
+
+    def test_child_rows_are_parsed_and_resolved(self):
+        User.objects.create_user('ahmed', 'password')
+        lines = self.upload({
+            'Events': self.event_rows(
+                ('Friday', '2030-03-01', '20:00', 90, 'Masjid', 10),
+                ('Friday', 'not a date', '20:00', 90, 'Masjid', 10),
+            ),
+            'Songs': [
+                ['Event Row', 'Title', 'Order'],
+                [2, 'Surah Al-Fatiha', 1],
+                [3, 'Surah Al-Ikhlas', 1],
+                [2, 'T' * 201, None],
+                [9, '', 'x'],
+            ],
+            'Participants': [
+                ['Event Row', 'Username'],
+                [2, 'ahmed'],
+                [2, 'nobody'],
+            ],
+        })
+        songs = [line for line in lines if line.get('sheet') == 'Songs']
+        participants = [line for line in lines if line.get('sheet') == 'Participants']
+
+        self.assertEqual([line['status'] for line in songs], ['ok', 'error', 'error', 'error'])
+        self.assertEqual([issue['column'] for issue in songs[1]['errors']], ['Event Row'])
+        self.assertEqual([issue['column'] for issue in songs[2]['errors']], ['Title'])
+        self.assertEqual(
+            sorted(issue['column'] for issue in songs[3]['errors']), ['Order', 'Title']
+        )
+        self.assertEqual([line['status'] for line in participants], ['ok', 'error'])
+        self.assertEqual(participants[1]['errors'][0]['column'], 'Username')
+        self.assertEqual(lines[-1]['summary']['sheets']['Songs']['failed_rows'], 3)
@@ -4,6 +4,11 @@ from . import views
 urlpatterns = [
     # Events
     path('events/', views.EventListView.as_view(), name='event_list'),
+    path('events/stream/', views.EventStreamView.as_view(), name='event_stream'),
+    path('events/export/', views.EventExportView.as_view(), name='event_export'),
+    path('events/batch/', views.EventBatchView.as_view(), name='event_batch'),
+    path('events/bulk-status/', views.EventBulkStatusView.as_view(), name='event_bulk_status'),
+    path('events/changes/', views.EventChangesView.as_view(), name='event_changes'),
     path('events/<int:pk>/', views.EventDetailView.as_view(), name='event_detail'),
     path('events/<int:pk>/status/', views.EventStatusUpdateView.as_view(), name='event_status_update'),
     path('events/status/<str:status>/', views.EventByStatusView.as_view(), name='events_by_status'),
@@ -12,6 +17,8 @@ urlpatterns = [
     path('events/past/', views.past_events_view, name='past_events'),
     path('events/<int:pk>/join/', views.join_event_view, name='join_event'),
     path('events/<int:pk>/leave/', views.leave_event_view, name='leave_event'),
+    path('events/<int:pk>/participants/', views.EventParticipantListView.as_view(), name='event_participants'),
+    path('events/<int:pk>/participants/bulk/', views.bulk_participants_view, name='bulk_participants'),
     
     # Dashboard and Stats
     path('dashboard/', views.DashboardView.as_view(), name='dashboard'),
@@ -20,4 +27,5 @@ urlpatterns = [
     # Excel Import/Export
     path('events/import/sample/', views.download_sample_excel, name='download_sample_excel'),
     path('events/import/', views.import_events_excel, name='import_events_excel'),
+    path('events/import/<int:job_id>/', views.import_job_status, name='import_job_status'),
 ]
@@ -2,73 +2,78 @@ from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.renderers import JSONRenderer
 from django.db.models import Q, Count
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
-from django.db import transaction
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils.decorators import method_decorator
 try:
     import openpyxl
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment
     OPENPYXL_AVAILABLE = True
 except ImportError:
     OPENPYXL_AVAILABLE = False
 from datetime import datetime, date, time
 import io
 import os
-from .models import Event, Song, EventParticipant, EventStats
+import tempfile
+from .models import Event, Song, EventParticipant, EventStats, EventDeletion, ImportJob
+from .pagination import KeysetPagination, iter_keyset_batches
+from .fast_serializers import LIST_EXPAND, FastEventSerializer, FastEventListMixin
+from .batch import (
+    MAX_BATCH_OPERATIONS, ROSTER_ACTIONS, EventBatch, bulk_set_status, remove_participants, update_roster,
+)
+from .exporting import (
+    CHILD_SHEETS, TEMPLATE_CACHE_SECONDS, TEMPLATE_VERSION, EventExporter, build_import_template
+)
+from .importing import IMPORT_MODES, ImportFileError, detect_import_format, open_import_rows
+from .import_report import REPORT_FORMATS, iter_ndjson_report, write_xlsx_report
+from .jobs import enqueue_import_job, revive_job
+from .cache import cached_response
+from .conditional import conditional_response, make_etag, queryset_validators, object_validators
+from . import sync
+from .search import search_events
+from .fuzzy import similar_events
+from accounts.normalization import normalize_text
 from .serializers import (
-    EventSerializer, EventCreateSerializer, EventUpdateSerializer,
-    EventStatsSerializer, DashboardSerializer
+    EventSerializer, EventCreateSerializer, EventUpdateSerializer, EventParticipantSerializer,
+    EventStatsSerializer, DashboardSerializer, ImportJobSerializer
 )
 
 User = get_user_model()
 
 
 
-class EventListView(generics.ListCreateAPIView):
-    """List and create events"""
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_serializer_class(self):
-        if self.request.method == 'POST':
-            return EventCreateSerializer
-        return EventSerializer
+def filter_events(queryset, params):
+    """Apply the status and date range filters of the event list endpoints"""
+    # Filter by status if provided
+    status_filter = params.get('status')
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
     
-    def create(self, request, *args, **kwargs):
-        print("EventListView.create - request.data:", request.data)
-        print("EventListView.create - request.user:", request.user)
-        
-        serializer = self.get_serializer(data=request.data)
-        print("EventListView.create - serializer.is_valid():", serializer.is_valid())
-        
-        if not serializer.is_valid():
-            print("EventListView.create - serializer.errors:", serializer.errors)
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        
-        event = serializer.save()
-        # Return the created event with all related data
-        return_serializer = EventSerializer(event)
-        return Response(return_serializer.data, status=status.HTTP_201_CREATED)
+    # Filter by date range if provided
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+    if start_date:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+    return queryset
+
+
+class EventFilterMixin:
+    """Filtering and sorting shared by the event list endpoints"""
     
     def get_queryset(self):
         queryset = Event.objects.select_related('created_by').prefetch_related('songs', 'dress_details', 'participants__user')
-        
-        # Filter by status if provided
-        status_filter = self.request.query_params.get('status')
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-        
-        # Filter by date range if provided
-        start_date = self.request.query_params.get('start_date')
-        end_date = self.request.query_params.get('end_date')
-        if start_date:
-            queryset = queryset.filter(date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(date__lte=end_date)
+        queryset = filter_events(queryset, self.request.query_params)
         
         # Sorting functionality
         sort_by = self.request.query_params.get('sort_by', 'date_time')
@@ -100,24 +105,201 @@ class EventListView(generics.ListCreateAPIView):
             queryset = queryset.order_by('date', 'time')
         
         return queryset
+
+
+@method_decorator(cached_response, name='get')
+@method_decorator(conditional_response(queryset_validators), name='get')
+class EventListView(FastEventListMixin, EventFilterMixin, generics.ListCreateAPIView):
+    """List and create events"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    @property
+    def paginator(self):
+        # ?cursor= switches the list to keyset pagination on the active sort
+        if not hasattr(self, '_paginator'):
+            if 'cursor' in self.request.query_params:
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+    
+    def get_serializer_class(self):
+        if self.request.method == 'POST':
+            return EventCreateSerializer
+        return EventSerializer
+    
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        event = serializer.save()
+        # Return the created event with all related data, in a fixed number of queries
+        data = FastEventSerializer().serialize_queryset(Event.objects.filter(pk=event.pk))[0]
+        return Response(data, status=status.HTTP_201_CREATED)
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
 
+@method_decorator(conditional_response(queryset_validators), name='get')
+class EventStreamView(EventFilterMixin, generics.GenericAPIView):
+    """Stream every matching event as one chunked JSON array"""
+    serializer_class = EventSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    batch_size = 500
+    
+    def get(self, request):
+        queryset = self.get_queryset()
+        fast = FastEventSerializer.from_request(request, default_expand=LIST_EXPAND)
+        return StreamingHttpResponse(
+            self.stream_events(queryset, fast),
+            content_type='application/json'
+        )
+    
+    def stream_events(self, queryset, fast):
+        renderer = JSONRenderer()
+        yield b'['
+        first = True
+        for batch in iter_keyset_batches(fast.values(queryset), self.batch_size):
+            # Render each batch as an array and splice its items into the stream
+            chunk = renderer.render(fast.serialize(batch))
+            yield chunk[1:-1] if first else b',' + chunk[1:-1]
+            first = False
+        yield b']'
+
+
+class EventExportView(EventFilterMixin, generics.GenericAPIView):
+    """Download the matching events as CSV or Excel (?file_type=csv|xlsx)"""
+    serializer_class = EventSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        file_type = request.query_params.get('file_type', 'xlsx')
+        if file_type not in ('xlsx', 'csv'):
+            return Response(
+                {'error': 'file_type must be xlsx or csv'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        include = [name for name in request.query_params.get('include', '').split(',') if name]
+        unknown = [name for name in include if name not in CHILD_SHEETS]
+        if unknown:
+            return Response(
+                {'error': f'Unknown include: {", ".join(unknown)}. Choose from {", ".join(CHILD_SHEETS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if include and file_type == 'csv':
+            return Response(
+                {'error': 'Songs, dress details and participants can only be included in xlsx exports'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        exporter = EventExporter(self.get_queryset(), include)
+        filename = f'events_export_{timezone.localdate().isoformat()}.{file_type}'
+        if file_type == 'csv':
+            response = StreamingHttpResponse(exporter.iter_csv(), content_type='text/csv; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+        
+        if not OPENPYXL_AVAILABLE:
+            return Response(
+                {'error': 'Excel functionality not available. Please install openpyxl.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        # A zip archive cannot be sent before it is finished, so spool it to disk
+        spool = tempfile.TemporaryFile()
+        exporter.write_xlsx(spool)
+        spool.seek(0)
+        return FileResponse(
+            spool,
+            as_attachment=True,
+            filename=filename,
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+
+
+class EventBatchView(APIView):
+    """Create, update and delete many events in one request and one transaction"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        operations = request.data.get('operations') if isinstance(request.data, dict) else request.data
+        if not isinstance(operations, list) or not operations:
+            return Response(
+                {'error': 'Send a non-empty list of operations'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return Response(
+                {'error': f'A batch can hold at most {MAX_BATCH_OPERATIONS} operations'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        batch = EventBatch(operations, request)
+        if not batch.is_valid():
+            # Nothing is applied unless every operation is valid
+            return Response({'errors': batch.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'results': batch.save()})
+
+
+class EventChangesView(APIView):
+    """Events changed and deleted since a sync token"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        # Take the next token before reading so nothing slips between the two
+        next_token = sync.next_token()
+        since = request.query_params.get('since')
+        
+        if since:
+            try:
+                since = sync.decode_token(since)
+            except sync.InvalidSyncToken as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        reset = not since or sync.requires_reset(since)
+        events = Event.objects.select_related('created_by').prefetch_related('songs', 'dress_details', 'participants__user')
+        deleted = []
+        
+        if not reset:
+            events = events.filter(updated_at__gt=since)
+            deleted = list(
+                EventDeletion.objects.filter(deleted_at__gt=since)
+                .values_list('event_id', flat=True)
+                .distinct()
+            )
+        
+        return Response({
+            'reset': reset,
+            'events': EventSerializer(events.order_by('updated_at', 'id'), many=True).data,
+            'deleted': deleted,
+            'next': next_token,
+        })
+
+
+@method_decorator(cached_response, name='get')
+@method_decorator(conditional_response(object_validators), name='get')
 class EventDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Event detail view"""
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Event.objects.select_related('created_by').prefetch_related('songs', 'participants__user')
+        # Responses are built by FastEventSerializer, which fetches children itself
+        return Event.objects.select_related('created_by')
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
             return EventUpdateSerializer
         return EventSerializer
     
+    def retrieve(self, request, *args, **kwargs):
+        fast = FastEventSerializer.from_request(request)
+        events = fast.serialize_queryset(self.get_queryset().filter(pk=self.kwargs['pk']))
+        if not events:
+            raise Http404
+        return Response(events[0])
+    
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
@@ -125,8 +307,8 @@ class EventDetailView(generics.RetrieveUpdateDestroyAPIView):
         serializer.is_valid(raise_exception=True)
         event = serializer.save()
         # Return the updated event with all related data
-        return_serializer = EventSerializer(event)
-        return Response(return_serializer.data)
+        data = FastEventSerializer().serialize_queryset(Event.objects.filter(pk=event.pk))[0]
+        return Response(data)
 
 
 class EventStatusUpdateView(APIView):
@@ -156,7 +338,7 @@ class EventStatusUpdateView(APIView):
             
             return Response({
                 'message': 'Event status updated successfully',
-                'event': EventSerializer(event).data
+                'event': FastEventSerializer().serialize_queryset(Event.objects.filter(pk=event.pk))[0]
             })
             
         except Event.DoesNotExist:
@@ -166,14 +348,62 @@ class EventStatusUpdateView(APIView):
             )
 
 
+class EventBulkStatusView(APIView):
+    """Move many events to one status, chosen by id or by the list filters"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        # Only admins and coordinators can update status
+        if not (request.user.is_admin or request.user.is_coordinator):
+            return Response(
+                {'error': 'Permission denied'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        new_status = request.data.get('status')
+        if new_status not in dict(Event.STATUS_CHOICES):
+            return Response(
+                {'error': 'Invalid status'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        ids = request.data.get('ids')
+        filters = request.data.get('filter')
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+                return Response(
+                    {'error': 'ids must be a list of event ids'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            queryset = Event.objects.filter(pk__in=ids)
+        elif isinstance(filters, dict) and any(filters.get(key) for key in ('status', 'start_date', 'end_date')):
+            try:
+                queryset = filter_events(Event.objects.all(), filters)
+            except ValidationError as e:
+                return Response({'error': e.messages}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            # Never move every event by accident
+            return Response(
+                {'error': 'Give ids, or a filter with status, start_date or end_date'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        updated_count = bulk_set_status(queryset, new_status)
+        return Response({
+            'message': f'Moved {updated_count} events to {new_status}',
+            'status': new_status,
+            'updated_count': updated_count,
+        })
+
+
+@method_decorator(cached_response, name='get')
 class DashboardView(APIView):
     """Dashboard data endpoint"""
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        # Get or create stats
+        # Counters are maintained by signals, so this is a single-row read
         stats = EventStats.get_or_create_stats()
-        stats.update_stats()
         
         # Get upcoming event (nearest event to current time, including pending)
         # First try to get future events
@@ -188,14 +418,11 @@ class DashboardView(APIView):
         # Get recent events
         recent_events = Event.objects.select_related('created_by').prefetch_related('songs')[:5]
         
-        # Get total users
-        total_users = User.objects.count()
-        
         dashboard_data = {
             'stats': EventStatsSerializer(stats).data,
             'upcoming_event': EventSerializer(upcoming_event).data if upcoming_event else None,
             'recent_events': EventSerializer(recent_events, many=True).data,
-            'total_users': total_users
+            'total_users': stats.total_users
         }
         
         return Response(dashboard_data)
@@ -206,14 +433,15 @@ class EventStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        # Get or create stats
+        # Counters are maintained by signals, so this is a single-row read
         stats = EventStats.get_or_create_stats()
-        stats.update_stats()
         
         return Response(EventStatsSerializer(stats).data)
 
 
-class EventByStatusView(generics.ListAPIView):
+@method_decorator(cached_response, name='get')
+@method_decorator(conditional_response(queryset_validators), name='get')
+class EventByStatusView(FastEventListMixin, generics.ListAPIView):
     """Get events by status"""
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -223,18 +451,31 @@ class EventByStatusView(generics.ListAPIView):
         return Event.objects.filter(status=status).select_related('created_by').prefetch_related('songs', 'participants__user').order_by('-created_at')
 
 
-class EventSearchView(generics.ListAPIView):
+@method_decorator(cached_response, name='get')
+@method_decorator(conditional_response(queryset_validators), name='get')
+class EventSearchView(FastEventListMixin, generics.ListAPIView):
     """Search events"""
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    @property
+    def paginator(self):
+        # Ranked full-text results are always paged with a keyset cursor
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('q') or params.get('similar') or 'cursor' in params:
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+    
     def get_queryset(self):
         queryset = Event.objects.select_related('created_by').prefetch_related('songs', 'dress_details', 'participants__user')
         
-        # Search by place
+        # Search by place, ignoring case, diacritics and hamza/alef variants
         place = self.request.query_params.get('place')
         if place:
-            queryset = queryset.filter(place__icontains=place)
+            queryset = queryset.filter(place_normalized__contains=normalize_text(place))
         
         # Search by day
         day = self.request.query_params.get('day')
@@ -249,11 +490,22 @@ class EventSearchView(generics.ListAPIView):
         if end_date:
             queryset = queryset.filter(date__lte=end_date)
         
+        # Full-text search across event text, song titles and participant names
+        query = self.request.query_params.get('q')
+        if query:
+            return search_events(queryset, query).order_by('-search_rank', 'id')
+        
+        # Typo tolerant lookup on place, meeting place and camera man
+        similar = self.request.query_params.get('similar')
+        if similar:
+            return similar_events(queryset, similar)
+        
         return queryset.order_by('-created_at')
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@cached_response
 def upcoming_events_view(request):
     """Get upcoming events"""
     events = Event.objects.filter(
@@ -261,79 +513,137 @@ def upcoming_events_view(request):
         status__in=['pending', 'confirmed']
     ).select_related('created_by').prefetch_related('songs').order_by('date', 'time')
     
-    return Response(EventSerializer(events, many=True).data)
+    fast = FastEventSerializer.from_request(request, default_expand=LIST_EXPAND)
+    return Response(fast.serialize_queryset(events))
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@cached_response
 def past_events_view(request):
     """Get past events"""
     events = Event.objects.filter(
         date__lt=timezone.now().date()
     ).select_related('created_by').prefetch_related('songs').order_by('-date', '-time')
     
-    return Response(EventSerializer(events, many=True).data)
+    fast = FastEventSerializer.from_request(request, default_expand=LIST_EXPAND)
+    return Response(fast.serialize_queryset(events))
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def join_event_view(request, pk):
     """Join an event"""
+    # A single INSERT; the unique (event, user) constraint catches repeat and concurrent joins
     try:
-        event = Event.objects.get(pk=pk)
-        
-        # Check if user is already a participant
-        if EventParticipant.objects.filter(event=event, user=request.user).exists():
+        with transaction.atomic():
+            participant = EventParticipant.objects.create(
+                event_id=pk,
+                user=request.user,
+                is_confirmed=False
+            )
+    except IntegrityError:
+        if not Event.objects.filter(pk=pk).exists():
             return Response(
-                {'error': 'Already joined this event'},
-                status=status.HTTP_400_BAD_REQUEST
+                {'error': 'Event not found'},
+                status=status.HTTP_404_NOT_FOUND
             )
-        
-        # Create participation
-        participant = EventParticipant.objects.create(
-            event=event,
-            user=request.user,
-            is_confirmed=False
-        )
-        
-        return Response({
-            'message': 'Successfully joined the event',
-            'participant': {
-                'id': participant.id,
-                'user': request.user.get_full_name(),
-                'joined_at': participant.joined_at,
-                'is_confirmed': participant.is_confirmed
-            }
-        })
-        
-    except Event.DoesNotExist:
         return Response(
-            {'error': 'Event not found'},
-            status=status.HTTP_404_NOT_FOUND
+            {'error': 'Already joined this event'},
+            status=status.HTTP_400_BAD_REQUEST
         )
+    
+    return Response({
+        'message': 'Successfully joined the event',
+        'participant': {
+            'id': participant.id,
+            'user': request.user.get_full_name(),
+            'joined_at': participant.joined_at,
+            'is_confirmed': participant.is_confirmed
+        }
+    })
 
 
 @api_view(['DELETE'])
 @permission_classes([permissions.IsAuthenticated])
 def leave_event_view(request, pk):
     """Leave an event"""
-    try:
-        event = Event.objects.get(pk=pk)
-        participant = EventParticipant.objects.get(event=event, user=request.user)
-        participant.delete()
-        
+    if remove_participants(pk, [request.user.pk]):
         return Response({'message': 'Successfully left the event'})
-        
-    except Event.DoesNotExist:
+    
+    if not Event.objects.filter(pk=pk).exists():
         return Response(
             {'error': 'Event not found'},
             status=status.HTTP_404_NOT_FOUND
         )
-    except EventParticipant.DoesNotExist:
+    return Response(
+        {'error': 'Not participating in this event'},
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
+
+@method_decorator(cached_response, name='get')
+class EventParticipantListView(generics.ListAPIView):
+    """An event's participants, a cursor page at a time, optionally searched by name"""
+    serializer_class = EventParticipantSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    
+    def get_queryset(self):
+        if not Event.objects.filter(pk=self.kwargs['pk']).exists():
+            raise Http404('Event not found')
+        queryset = EventParticipant.objects.filter(event_id=self.kwargs['pk']).select_related('user')
+        
+        # Search by name or username, ignoring case, diacritics and hamza/alef variants
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = queryset.filter(user__name_normalized__contains=normalize_text(search))
+        
+        confirmed = self.request.query_params.get('confirmed')
+        if confirmed in ('true', 'false'):
+            queryset = queryset.filter(is_confirmed=confirmed == 'true')
+        return queryset
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_participants_view(request, pk):
+    """Add, remove or confirm many participants of an event at once"""
+    # Only admins and coordinators manage other users' participation
+    if not (request.user.is_admin or request.user.is_coordinator):
+        return Response(
+            {'error': 'Permission denied'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    actions = {}
+    for action in ROSTER_ACTIONS:
+        user_ids = request.data.get(action, [])
+        if not isinstance(user_ids, list) or not all(isinstance(user_id, int) for user_id in user_ids):
+            return Response(
+                {'error': f'{action} must be a list of user ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        actions[action] = user_ids
+    
+    if not any(actions.values()):
+        return Response(
+            {'error': f'Give at least one of {", ".join(ROSTER_ACTIONS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if set(actions['remove']) & set(actions['add'] + actions['confirm']):
         return Response(
-            {'error': 'Not participating in this event'},
+            {'error': 'A user cannot be removed and added or confirmed in the same request'},
             status=status.HTTP_400_BAD_REQUEST
         )
+    if not Event.objects.filter(pk=pk).exists():
+        return Response(
+            {'error': 'Event not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    result = update_roster(pk, **actions)
+    return Response({'message': 'Participants updated', **result})
 
 
 @api_view(['GET'])
@@ -346,84 +656,31 @@ def download_sample_excel(request):
             status=status.HTTP_503_SERVICE_UNAVAILABLE
         )
     
-    try:
-        # Create a new workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Events Import Template"
-        
-        # Define headers based on Event model
-        headers = [
-            'Day', 'Date', 'Time', 'Duration (minutes)', 'Place', 'Number of Participants',
-            'Status', 'Meeting Time', 'Meeting Date', 'Place of Meeting', 'Vehicle',
-            'Camera Man', 'Participation Type', 'Event Reason'
-        ]
-        
-        # Add headers with styling
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # Add sample data
-        sample_data = [
-            ['Friday', '2024-01-15', '18:00', '120', 'Masjid Al-Noor', '25',
-             'pending', '17:30', '2024-01-15', 'Main Hall', 'Bus #123',
-             'Ahmed Ali', 'Recitation', 'Weekly Quran Recitation Session'],
-            ['Saturday', '2024-01-20', '19:30', '90', 'Community Center', '15',
-             'confirmed', '19:00', '2024-01-20', 'Conference Room', 'Van #456',
-             'Omar Hassan', 'Listening', 'Special Event for New Muslims']
-        ]
-        
-        for row, data in enumerate(sample_data, 2):
-            for col, value in enumerate(data, 1):
-                ws.cell(row=row, column=col, value=value)
-        
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Create response
+    # The template only changes with the column definition, so browsers may keep it
+    etag = make_etag(TEMPLATE_VERSION)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        try:
+            content = build_import_template()
+        except Exception as e:
+            return Response(
+                {'error': f'Failed to generate sample Excel: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
         response = HttpResponse(
+            content,
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
         response['Content-Disposition'] = 'attachment; filename="events_import_template.xlsx"'
-        
-        # Save workbook to response
-        wb.save(response)
-        return response
-        
-    except Exception as e:
-        return Response(
-            {'error': f'Failed to generate sample Excel: {str(e)}'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=TEMPLATE_CACHE_SECONDS)
+    return response
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def import_events_excel(request):
-    """Import events from Excel file"""
-    if not OPENPYXL_AVAILABLE:
-        return Response(
-            {'error': 'Excel functionality not available. Please install openpyxl.'},
-            status=status.HTTP_503_SERVICE_UNAVAILABLE
-        )
-    
+    """Queue an Excel, CSV or TSV file of events for import, or only validate it with ?dry_run=1"""
     try:
         if 'file' not in request.FILES:
             return Response(
@@ -433,188 +690,101 @@ def import_events_excel(request):
         
         excel_file = request.FILES['file']
         
-        # Validate file type
-        if not excel_file.name.endswith(('.xlsx', '.xls')):
+        # Validate file type by extension, or by content for unknown extensions
+        import_format = detect_import_format(excel_file, excel_file.name)
+        if import_format is None:
             return Response(
-                {'error': 'Invalid file type. Please upload an Excel file (.xlsx or .xls)'},
+                {'error': 'Invalid file type. Please upload an Excel (.xlsx or .xls) or CSV/TSV file'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if import_format == 'excel' and not OPENPYXL_AVAILABLE:
+            return Response(
+                {'error': 'Excel functionality not available. Please install openpyxl.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
         
-        # Read Excel file using openpyxl
-        try:
-            workbook = openpyxl.load_workbook(excel_file)
-            worksheet = workbook.active
-            
-            # Get headers from first row
-            headers = []
-            for cell in worksheet[1]:
-                headers.append(cell.value)
-            
-            # Validate required columns
-            required_columns = [
-                'Day', 'Date', 'Time', 'Duration (minutes)', 'Place', 'Number of Participants'
-            ]
-            missing_columns = [col for col in required_columns if col not in headers]
-            
-            if missing_columns:
-                return Response(
-                    {'error': f'Missing required columns: {", ".join(missing_columns)}'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Create column mapping
-            col_map = {header: idx + 1 for idx, header in enumerate(headers)}
-            
-        except Exception as e:
+        # upsert updates events matched by External ID or date, time and place
+        mode = request.data.get('mode', 'create')
+        if mode not in IMPORT_MODES:
             return Response(
-                {'error': f'Failed to read Excel file: {str(e)}'},
+                {'error': f'Invalid mode. Choose from {", ".join(IMPORT_MODES)}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Process events
-        imported_count = 0
-        errors = []
+        if request.query_params.get('dry_run') in ('1', 'true'):
+            return import_dry_run(request, excel_file, mode)
         
-        with transaction.atomic():
-            for row_num in range(2, worksheet.max_row + 1):  # Skip header row
-                try:
-                    # Helper function to get cell value safely
-                    def get_cell_value(column_name, default=''):
-                        col_idx = col_map.get(column_name)
-                        if col_idx:
-                            cell_value = worksheet.cell(row=row_num, column=col_idx).value
-                            return str(cell_value).strip() if cell_value is not None else default
-                        return default
-                    
-                    # Parse and validate data
-                    day = get_cell_value('Day')
-                    if not day:
-                        errors.append(f'Row {row_num}: Day is required')
-                        continue
-                    
-                    # Parse date
-                    date_str = get_cell_value('Date')
-                    try:
-                        if isinstance(date_str, datetime):
-                            event_date = date_str.date()
-                        else:
-                            event_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                    except:
-                        errors.append(f'Row {row_num}: Invalid date format. Use YYYY-MM-DD')
-                        continue
-                    
-                    # Parse time
-                    time_str = get_cell_value('Time')
-                    try:
-                        if isinstance(time_str, datetime):
-                            event_time = time_str.time()
-                        else:
-                            event_time = datetime.strptime(time_str, '%H:%M').time()
-                    except:
-                        errors.append(f'Row {row_num}: Invalid time format. Use HH:MM')
-                        continue
-                    
-                    # Parse duration
-                    duration_str = get_cell_value('Duration (minutes)')
-                    try:
-                        duration = int(duration_str)
-                    except:
-                        errors.append(f'Row {row_num}: Invalid duration. Must be a number')
-                        continue
-                    
-                    place = get_cell_value('Place')
-                    if not place:
-                        errors.append(f'Row {row_num}: Place is required')
-                        continue
-                    
-                    # Parse participants
-                    participants_str = get_cell_value('Number of Participants')
-                    try:
-                        participants = int(participants_str) if participants_str else 0
-                    except:
-                        participants = 0
-                    
-                    # Optional fields
-                    status = get_cell_value('Status', 'pending').lower()
-                    if status not in ['pending', 'confirmed', 'completed', 'cancelled']:
-                        status = 'pending'
-                    
-                    # Parse meeting time
-                    meeting_time = None
-                    meeting_time_str = get_cell_value('Meeting Time')
-                    if meeting_time_str:
-                        try:
-                            if isinstance(meeting_time_str, datetime):
-                                meeting_time = meeting_time_str.time()
-                            else:
-                                meeting_time = datetime.strptime(meeting_time_str, '%H:%M').time()
-                        except:
-                            pass  # Skip invalid meeting time
-                    
-                    # Parse meeting date
-                    meeting_date = None
-                    meeting_date_str = get_cell_value('Meeting Date')
-                    if meeting_date_str:
-                        try:
-                            if isinstance(meeting_date_str, datetime):
-                                meeting_date = meeting_date_str.date()
-                            else:
-                                meeting_date = datetime.strptime(meeting_date_str, '%Y-%m-%d').date()
-                        except:
-                            pass  # Skip invalid meeting date
-                    
-                    place_of_meeting = get_cell_value('Place of Meeting') or None
-                    vehicle = get_cell_value('Vehicle') or None
-                    camera_man = get_cell_value('Camera Man') or None
-                    participation_type = get_cell_value('Participation Type') or None
-                    event_reason = get_cell_value('Event Reason') or None
-                    
-                    # Create event
-                    event = Event.objects.create(
-                        day=day,
-                        date=event_date,
-                        time=event_time,
-                        duration=duration,
-                        place=place,
-                        number_of_participants=participants,
-                        status=status,
-                        meeting_time=meeting_time,
-                        meeting_date=meeting_date,
-                        place_of_meeting=place_of_meeting,
-                        vehicle=vehicle,
-                        camera_man=camera_man,
-                        participation_type=participation_type,
-                        event_reason=event_reason,
-                        created_by=request.user
-                    )
-                    
-                    imported_count += 1
-                    
-                except Exception as e:
-                    errors.append(f'Row {row_num}: {str(e)}')
-                    continue
-        
-        # Update statistics
-        try:
-            stats = EventStats.get_or_create_stats()
-            stats.update_stats()
-        except:
-            pass  # Don't fail import if stats update fails
-        
-        response_data = {
-            'message': f'Successfully imported {imported_count} events',
-            'imported_count': imported_count,
-            'total_rows': worksheet.max_row - 1  # Subtract header row
-        }
-        
-        if errors:
-            response_data['errors'] = errors[:10]  # Limit to first 10 errors
-            response_data['error_count'] = len(errors)
+        # Store the upload and let a background worker parse and insert it
+        job = ImportJob.objects.create(
+            file=excel_file,
+            original_name=excel_file.name,
+            mode=mode,
+            created_by=request.user
+        )
+        enqueue_import_job(job)
         
-        return Response(response_data, status=status.HTTP_200_OK)
+        return Response({
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': request.build_absolute_uri(reverse('import_job_status', args=[job.id])),
+        }, status=status.HTTP_202_ACCEPTED)
         
     except Exception as e:
         return Response(
             {'error': f'Import failed: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+
+def import_dry_run(request, upload, mode):
+    """Validate every row of an upload without writing, and report on each row"""
+    report_format = request.query_params.get('report', 'ndjson')
+    if report_format not in REPORT_FORMATS:
+        return Response(
+            {'error': f'Invalid report. Choose from {", ".join(REPORT_FORMATS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if report_format == 'xlsx' and not OPENPYXL_AVAILABLE:
+        return Response(
+            {'error': 'Excel functionality not available. Please install openpyxl.'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    
+    try:
+        columns, rows, source = open_import_rows(upload, upload.name)
+    except ImportFileError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if report_format == 'ndjson':
+        return StreamingHttpResponse(
+            iter_ndjson_report(rows, columns, mode, source),
+            content_type='application/x-ndjson'
+        )
+    
+    spool = tempfile.TemporaryFile()
+    try:
+        write_xlsx_report(rows, columns, mode, spool, source)
+    finally:
+        source.close()
+    spool.seek(0)
+    name = os.path.splitext(os.path.basename(upload.name))[0]
+    return FileResponse(
+        spool,
+        as_attachment=True,
+        filename=f'{name}_import_report.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def import_job_status(request, job_id):
+    """Progress and result of an import job"""
+    jobs = ImportJob.objects.all()
+    if not request.user.is_admin:
+        jobs = jobs.filter(created_by=request.user)
+    job = get_object_or_404(jobs, pk=job_id)
+    if job.status in ('queued', 'running'):
+        revive_job(job)
+        job.refresh_from_db()
+    return Response(ImportJobSerializer(job).data)
@@ -221,6 +221,37 @@ CORS_ALLOW_METHODS = [
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
+# Cache Configuration
+# CACHE_BACKEND selects local memory (per process), file (shared on one host)
+# or redis (shared between hosts and uWSGI workers)
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHE_BACKEND = config('CACHE_BACKEND', default='file')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': config('CACHE_LOCATION', default='') or str(BASE_DIR / 'cache'),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+        'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='ayat'),
+    }
+}
+# Cached event responses are invalidated by a generation counter in the cache.
+# locmem keeps one counter per process, so a write in one uWSGI worker would
+# leave the others serving stale responses; response caching is off there
+EVENT_RESPONSE_CACHE = config('EVENT_RESPONSE_CACHE', default=CACHE_BACKEND != 'locmem', cast=bool)
+
+# Event imports run in the background: 'thread' uses a pool inside each web
+# worker, 'command' leaves jobs for `manage.py process_import_jobs`
+EVENT_IMPORT_WORKER = config('EVENT_IMPORT_WORKER', default='thread')
+EVENT_IMPORT_THREADS = config('EVENT_IMPORT_THREADS', default=1, cast=int)
+# A running job whose worker has not reported progress for this long is requeued or failed
+EVENT_IMPORT_LEASE_SECONDS = config('EVENT_IMPORT_LEASE_SECONDS', default=300, cast=int)
+# Processes process_import_jobs uses to parse rows of large files
+EVENT_IMPORT_PROCESSES = config('EVENT_IMPORT_PROCESSES', default=1, cast=int)
+
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = config('STATIC_URL', default='/static/')
 STATIC_ROOT = BASE_DIR / config('STATIC_ROOT', default='staticfiles')
@@ -197,8 +197,10 @@ sudo ln -sf /etc/uwsgi/apps-available/ayat_app.ini /etc/uwsgi/apps-enabled/
 # Configure systemd service
 echo -e "${YELLOW}⚙️ Configuring systemd service...${NC}"
 sudo cp $PROJECT_DIR/ayat-app.service /etc/systemd/system/
+sudo cp $PROJECT_DIR/ayat-import-worker.service /etc/systemd/system/
 sudo systemctl daemon-reload
 sudo systemctl enable ayat-app
+sudo systemctl enable ayat-import-worker
 
 # Configure Nginx
 echo -e "${YELLOW}🌐 Configuring Nginx...${NC}"
@@ -226,6 +228,7 @@ sudo chmod +x $BACKEND_DIR/uwsgi.ini
 # Start services
 echo -e "${YELLOW}🔄 Starting services...${NC}"
 sudo systemctl start ayat-app
+sudo systemctl start ayat-import-worker
 sudo systemctl restart nginx
 
 # Enable services to start on boot
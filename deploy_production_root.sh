@@ -187,8 +187,10 @@ ln -sf /etc/uwsgi/apps-available/ayat_app.ini /etc/uwsgi/apps-enabled/
 # Configure systemd service
 echo -e "${YELLOW}⚙️ Configuring systemd service...${NC}"
 cp $PROJECT_DIR/ayat-app.service /etc/systemd/system/
+cp $PROJECT_DIR/ayat-import-worker.service /etc/systemd/system/
 systemctl daemon-reload
 systemctl enable ayat-app
+systemctl enable ayat-import-worker
 
 # Configure Nginx
 echo -e "${YELLOW}🌐 Configuring Nginx...${NC}"
@@ -216,6 +218,7 @@ chmod +x $BACKEND_DIR/uwsgi.ini
 # Start services
 echo -e "${YELLOW}🔄 Starting services...${NC}"
 systemctl start ayat-app
+systemctl start ayat-import-worker
 systemctl restart nginx
 
 # Enable services to start on boot
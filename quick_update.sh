@@ -19,6 +19,7 @@ cp -r dist/* ../frontend/
 
 # Restart services
 systemctl restart ayat-app
+systemctl restart ayat-import-worker
 systemctl restart nginx
 
 echo "✅ Quick Update Complete!"
@@ -37,6 +37,9 @@ interface Event {
   event_reason?: string;
   songs?: Array<{id: number; title: string; artist?: string; duration?: number; order: number; created_at: string}>;
   dress_details?: Array<{id: number; description: string; order: number; created_at: string}>;
+  // Lists carry only the roster size, the roster itself comes with the event's detail
+  participant_count?: number;
+  confirmed_count?: number;
   participants?: Array<{id: number; user: string; user_id: number; user_name: string; joined_at: string; is_confirmed: boolean}>;
 }
 
@@ -112,6 +115,7 @@ export default function ManageEvents() {
   const [importDialogOpen, setImportDialogOpen] = useState(false);
   const [importing, setImporting] = useState(false);
   const [selectedFile, setSelectedFile] = useState<File | null>(null);
+  const [importMode, setImportMode] = useState<'create' | 'upsert'>('create');
   const [currentPage, setCurrentPage] = useState(1);
   const [pageSize, setPageSize] = useState(10);
 
@@ -150,9 +154,9 @@ export default function ManageEvents() {
 
   const fetchEvents = async () => {
     try {
-      // Fetch all pages to ensure all events are displayed
+      // Fetch every event in one streamed response (paginated responses are still followed)
       let aggregated: Event[] = [];
-      let nextUrl: string | null = '/events/';
+      let nextUrl: string | null = '/events/stream/';
 
       while (nextUrl) {
         // Normalize absolute URLs from API pagination to relative paths for our api helper
@@ -470,7 +474,7 @@ export default function ManageEvents() {
         case 'dress_count':
           return event.dress_details ? event.dress_details.length : 0;
         case 'selected_participants':
-          return event.participants ? event.participants.length : 0;
+          return event.participant_count ?? 0;
         case 'status':
           return event.status;
         case 'created':
@@ -625,12 +629,12 @@ export default function ManageEvents() {
   const handleFileSelect = (event: React.ChangeEvent<HTMLInputElement>) => {
     const file = event.target.files?.[0];
     if (file) {
-      if (file.name.endsWith('.xlsx') || file.name.endsWith('.xls')) {
+      if (/\.(xlsx|xls|csv|tsv)$/i.test(file.name)) {
         setSelectedFile(file);
       } else {
         toast({
           title: "Invalid File Type",
-          description: "Please select an Excel file (.xlsx or .xls)",
+          description: "Please select an Excel (.xlsx or .xls) or CSV/TSV file",
           variant: "destructive",
         });
       }
@@ -642,15 +646,37 @@ export default function ManageEvents() {
 
     setImporting(true);
     try {
-      const response = await apiUploadFile('/events/import/', selectedFile);
+      const response = await apiUploadFile('/events/import/', selectedFile, { mode: importMode });
 
       if (response.error) {
         throw new Error(response.error);
       }
 
+      // The import runs in the background; poll the job until it finishes,
+      // backing off between polls and giving up after a deadline
+      let job = response.data;
+      let delay = 1000;
+      const deadline = Date.now() + 10 * 60 * 1000;
+      while (job && (job.status === 'queued' || job.status === 'running')) {
+        if (Date.now() > deadline) {
+          throw new Error("The import is taking too long. Check back later to see if it finished.");
+        }
+        await new Promise(resolve => setTimeout(resolve, delay));
+        delay = Math.min(delay * 2, 10000);
+        const jobResponse = await apiGet(`/events/import/${job.job_id ?? job.id}/`);
+        if (jobResponse.error) {
+          throw new Error(jobResponse.error);
+        }
+        job = jobResponse.data;
+      }
+
+      if (job?.status === 'failed') {
+        throw new Error(job.message);
+      }
+
       toast({
         title: t.importSuccessful,
-        description: response.data?.message || "Events imported successfully",
+        description: job?.message || "Events imported successfully",
       });
       
       // Refresh events list
@@ -662,7 +688,7 @@ export default function ManageEvents() {
     } catch (error) {
       toast({
         title: "Import Failed",
-        description: "Network error during import",
+        description: error instanceof Error && error.message ? error.message : "Network error during import",
         variant: "destructive",
       });
     } finally {
@@ -703,7 +729,22 @@ export default function ManageEvents() {
     }
   };
 
-  const handleEditEvent = (event: Event) => {
+  // List responses leave out the roster, so dialogs that show or edit it load the event itself
+  const loadEventDetail = async (event: Event): Promise<Event> => {
+    const response = await apiGet(`/events/${event.id}/`);
+    if (response.error || !response.data) {
+      toast({
+        title: "Error",
+        description: "Failed to load the event's participants",
+        variant: "destructive",
+      });
+      return event;
+    }
+    return response.data;
+  };
+
+  const handleEditEvent = async (listedEvent: Event) => {
+    const event = await loadEventDetail(listedEvent);
     setEditingEvent(event);
     
     // Map dress details from array format to object format
@@ -791,14 +832,16 @@ export default function ManageEvents() {
     setCancelConfirmOpen(false);
   };
 
-  const handleViewEvent = (event: Event) => {
+  const handleViewEvent = async (event: Event) => {
     setEventToView(event);
     setViewEventOpen(true);
+    setEventToView(await loadEventDetail(event));
   };
 
-  const handleViewParticipants = (event: Event) => {
+  const handleViewParticipants = async (event: Event) => {
     setParticipantsEvent(event);
     setIsParticipantsDialogOpen(true);
+    setParticipantsEvent(await loadEventDetail(event));
   };
 
   const resetForm = () => {
@@ -2024,17 +2067,9 @@ ${event.dress_details && event.dress_details.length > 0 ? `- Dress: ${event.dres
                             >
                               {event.number_of_participants}
                             </p>
-                            {event.participants && event.participants.length > 0 && (
+                            {!!event.participant_count && (
                               <div className="text-xs text-muted-foreground mt-1">
-                                {event.participants.slice(0, 2).map((participant, index) => (
-                                  <span key={participant.id}>
-                                    {participant.user_name}
-                                    {index < Math.min(event.participants.length, 2) - 1 && ', '}
-                                  </span>
-                                ))}
-                                {event.participants.length > 2 && (
-                                  <span> +{event.participants.length - 2} more</span>
-                                )}
+                                {event.participant_count} selected, {event.confirmed_count ?? 0} confirmed
                               </div>
                             )}
                           </div>
@@ -2669,7 +2704,7 @@ ${event.dress_details && event.dress_details.length > 0 ? `- Dress: ${event.dres
               <Input
                 id="excel-file"
                 type="file"
-                accept=".xlsx,.xls"
+                accept=".xlsx,.xls,.csv,.tsv"
                 onChange={handleFileSelect}
                 className="cursor-pointer"
               />
@@ -2680,6 +2715,24 @@ ${event.dress_details && event.dress_details.length > 0 ? `- Dress: ${event.dres
               )}
             </div>
             
+            <div className="space-y-2">
+              <Label htmlFor="import-mode">Import mode</Label>
+              <Select value={importMode} onValueChange={(value) => setImportMode(value as 'create' | 'upsert')}>
+                <SelectTrigger id="import-mode">
+                  <SelectValue />
+                </SelectTrigger>
+                <SelectContent>
+                  <SelectItem value="create">Create a new event for every row</SelectItem>
+                  <SelectItem value="upsert">Update matching events, create the rest</SelectItem>
+                </SelectContent>
+              </Select>
+              <p className="text-sm text-muted-foreground">
+                {importMode === 'upsert'
+                  ? 'Rows update the event with the same External ID, or else the same date, time and place.'
+                  : 'Re-uploading the same file creates the events again.'}
+              </p>
+            </div>
+            
             <div className="flex items-center justify-between p-3 bg-muted rounded-lg">
               <div className="flex items-center gap-2">
                 <Download className="h-4 w-4" />
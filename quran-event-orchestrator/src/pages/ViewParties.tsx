@@ -33,6 +33,9 @@ interface Event {
   event_reason?: string;
   songs?: Array<{id: number; title: string; artist?: string; duration?: number; order: number; created_at: string}>;
   dress_details?: Array<{id: number; description: string; order: number; created_at: string}>;
+  // Lists carry only the roster size, the roster itself comes with the event's detail
+  participant_count?: number;
+  confirmed_count?: number;
   participants?: Array<{id: number; user: string; user_id: number; user_name: string; joined_at: string; is_confirmed: boolean}>;
 }
 
@@ -65,9 +68,9 @@ export default function ViewParties() {
         return;
       }
 
-      // Fetch all pages to ensure all events are displayed
+      // Fetch every event in one streamed response (paginated responses are still followed)
       let aggregated: Event[] = [];
-      let nextUrl: string | null = '/events/';
+      let nextUrl: string | null = '/events/stream/';
 
       while (nextUrl) {
         // Normalize absolute URLs from API pagination to relative paths for our api helper
@@ -207,9 +210,14 @@ export default function ViewParties() {
     });
   };
 
-  const handleViewEvent = (event: Event) => {
+  const handleViewEvent = async (event: Event) => {
     setEventToView(event);
     setViewEventOpen(true);
+    // List responses leave out the roster, the event's detail has it
+    const response = await apiGet(`/events/${event.id}/`);
+    if (response.data && !response.error) {
+      setEventToView(response.data);
+    }
   };
 
   const generateEventContent = (event: Event) => {
@@ -307,20 +315,9 @@ Updated: ${formatDate(event.updated_at)}
         <div className={`flex items-center gap-2 text-sm text-muted-foreground ${isRTL ? 'flex-row-reverse' : ''}`}>
           <Users className="h-4 w-4" />
           <span className={isRTL ? 'text-right' : 'text-left'}>{event.number_of_participants} {t.participants}</span>
-          {event.participants && event.participants.length > 0 && (
+          {!!event.participant_count && (
             <div className={`text-primary ${isRTL ? 'text-right' : 'text-left'}`}>
-              <span className="text-xs">({event.participants.length} selected)</span>
-              <div className="text-xs mt-1">
-                {event.participants.slice(0, 3).map((participant, index) => (
-                  <span key={participant.id}>
-                    {participant.user_name}
-                    {index < Math.min(event.participants.length, 3) - 1 && ', '}
-                  </span>
-                ))}
-                {event.participants.length > 3 && (
-                  <span> +{event.participants.length - 3} more</span>
-                )}
-              </div>
+              <span className="text-xs">({event.participant_count} selected)</span>
             </div>
           )}
         </div>
@@ -70,6 +70,10 @@ echo -e "${YELLOW}🔄 Restarting services...${NC}"
 echo -e "${BLUE}  - Restarting uWSGI...${NC}"
 systemctl restart ayat-app
 
+# Restart the import worker so it runs the new code
+echo -e "${BLUE}  - Restarting import worker...${NC}"
+systemctl restart ayat-import-worker
+
 # Restart Nginx
 echo -e "${BLUE}  - Restarting Nginx...${NC}"
 systemctl restart nginx